@@ -5,20 +5,30 @@
 # --- Python standard library ---
 from __future__ import unicode_literals
 from __future__ import division
+from __future__ import annotations
 
 import sys
+import json
 import logging
+
+from typing import TYPE_CHECKING
     
 # --- Kodi stuff ---
 import xbmcaddon
 
 # AKL main imports
+# Only light modules are imported here. The scraper stack (akl.scrapers, akl.api and the
+# TGDB scraper with its platform tables) is imported by run_scraper() when it is needed, so
+# commands like update-settings start fast.
 from akl import constants, settings, addons
 from akl.utils import kodilogging, io, kodi
-from akl.scrapers import ScraperSettings, ScrapeStrategy
 
 # Local modules
-from resources.lib.scraper import TheGamesDB
+from resources.lib import capabilities
+
+if TYPE_CHECKING:
+    from akl.scrapers import ScraperSettings
+    from resources.lib.scraper import TheGamesDB
 
 kodilogging.config()
 logger = logging.getLogger(__name__)
@@ -28,6 +38,8 @@ addon = xbmcaddon.Addon()
 addon_id = addon.getAddonInfo('id')
 addon_version = addon.getAddonInfo('version')
 
+REPORT_FILENAME = 'TGDB_scrape_report.json'
+
 
 # ---------------------------------------------------------------------------------------------
 # This is the plugin entry point.
@@ -57,6 +69,8 @@ def run_plugin():
         run_scraper(parser)
     elif parser.parser.cmd == "update-settings":
         update_plugin_settings()
+    elif parser.parser.cmd == "refresh-cache":
+        run_cache_refresh(parser)
     else:
         kodi.dialog_OK(text=parser.get_help())
         
@@ -68,41 +82,246 @@ def run_plugin():
 # ---------------------------------------------------------------------------------------------
 def run_scraper(args: addons.AklAddonArguments):
     logger.debug('========== run_scraper() BEGIN ==================================================')
+    from akl.scrapers import ScraperSettings, ScrapeStrategy
+    from resources.lib.scraper import TheGamesDB
+
     pdialog = kodi.ProgressDialog()
     
     settings = ScraperSettings.from_settings_dict(args.get_settings())
+    scraper = TheGamesDB()
     scraper_strategy = ScrapeStrategy(
         args.get_webserver_host(),
         args.get_webserver_port(),
         settings,
-        TheGamesDB(),
+        scraper,
         pdialog)
     
-    if args.get_entity_type() == constants.OBJ_ROM:
-        logger.debug("Single ROM processing")
-        scraped_rom = scraper_strategy.process_single_rom(args.get_entity_id())
-        pdialog.endProgress()
-        pdialog.startProgress('Saving ROM in database ...')
-        scraper_strategy.store_scraped_rom(args.get_akl_addon_id(), args.get_entity_id(), scraped_rom)
-        pdialog.endProgress()
-    else:
-        logger.debug("Multiple ROM processing")
-        scraped_roms = scraper_strategy.process_roms(args.get_entity_type(), args.get_entity_id())
+    try:
+        if args.get_entity_type() == constants.OBJ_ROM:
+            logger.debug("Single ROM processing")
+            scraped_rom = scraper_strategy.process_single_rom(args.get_entity_id())
+            pdialog.endProgress()
+            pdialog.startProgress('Saving ROM in database ...')
+            scraper_strategy.store_scraped_rom(args.get_akl_addon_id(), args.get_entity_id(), scraped_rom)
+            pdialog.endProgress()
+        else:
+            logger.debug("Multiple ROM processing")
+            roms = plan_scraper_batch(get_roms_to_scrape(args), settings, scraper)
+            if roms is None:
+                logger.info('Scraping cancelled after reviewing the API cost.')
+                return
+            prefetch_scraper_data(roms, settings, scraper, pdialog)
+            scraped_roms = scraper_strategy.process_roms(args.get_entity_type(), args.get_entity_id())
+            pdialog.endProgress()
+            pdialog.startProgress('Saving ROMs in database ...')
+            scraper_strategy.store_scraped_roms(args.get_akl_addon_id(),
+                                                args.get_entity_type(),
+                                                args.get_entity_id(),
+                                                scraped_roms)
+            pdialog.endProgress()
+
+        write_scrape_report(scraper, show_summary=args.get_entity_type() != constants.OBJ_ROM)
+    finally:
+        # The capture writer thread must always be stopped, also when scraping is cancelled.
+        scraper.close_debug_capture()
+
+
+# Incremental refresh of the scraper caches with the TGDB updates feed. Only the cached games
+# updated on TGDB are retrieved again. When called for a ROM collection or source, the ROMs of
+# the updated games are scraped again from the refreshed caches and pushed to AKL.
+def run_cache_refresh(args: addons.AklAddonArguments):
+    logger.debug('========== run_cache_refresh() BEGIN ============================================')
+    from resources.lib.scraper import TheGamesDB
+
+    pdialog = kodi.ProgressDialog()
+    scraper = TheGamesDB()
+    status_dic = kodi.new_status_dic('Refresh was OK')
+    pdialog.startProgress('Refreshing cached TGDB games ...')
+    stale_candidates = scraper.refresh_from_updates(status_dic)
+    pdialog.endProgress()
+    if stale_candidates is None or not status_dic['status']:
+        logger.error(f'Cache refresh failed: {status_dic["msg"]}')
+        kodi.notify_error('TGDB cache refresh failed')
+        return
+
+    num_pushed = push_refreshed_roms(args, scraper, stale_candidates, pdialog)
+    scraper.flush_disk_cache()
+    scraper.compact_disk_cache()
+    write_scrape_report(scraper, show_summary=False)
+    scraper.close_debug_capture()
+    kodi.notify(f'Refreshed {len(stale_candidates)} cached ROMs, updated {num_pushed} ROMs in AKL')
+
+
+# Scrape the ROMs of the updated games again and push them to AKL, one by one, so unchanged
+# ROMs are not sent. Returns the number of ROMs pushed.
+def push_refreshed_roms(args: addons.AklAddonArguments, scraper: TheGamesDB,
+                        stale_candidates: dict, pdialog: kodi.ProgressDialog) -> int:
+    if not stale_candidates:
+        return 0
+    try:
+        has_rom_collection = args.get_entity_id() and args.get_entity_type() != constants.OBJ_ROM
+    except Exception:
+        has_rom_collection = False
+    if not has_rom_collection:
+        logger.debug('No ROM collection or source given. Refreshed ROMs are not pushed to AKL.')
+        return 0
+    from akl.scrapers import ScraperSettings, ScrapeStrategy
+
+    refreshed_rom_ids = []
+    for rom in get_roms_to_scrape(args):
+        platform = rom.get_platform()
+        if not scraper.check_candidates_cache(rom.get_identifier(), platform):
+            continue
+        candidate = scraper.retrieve_from_candidates_cache(rom.get_identifier(), platform)
+        if candidate and scraper.resolve_candidate(rom.get_identifier(), platform, candidate) in stale_candidates:
+            refreshed_rom_ids.append(rom.get_id())
+    logger.info(f'Cache refresh: pushing {len(refreshed_rom_ids)} ROMs to AKL')
+    if not refreshed_rom_ids:
+        return 0
+
+    settings = ScraperSettings.from_settings_dict(args.get_settings())
+    scraper_strategy = ScrapeStrategy(
+        args.get_webserver_host(),
+        args.get_webserver_port(),
+        settings,
+        scraper,
+        pdialog)
+    for rom_id in refreshed_rom_ids:
+        scraped_rom = scraper_strategy.process_single_rom(rom_id)
         pdialog.endProgress()
-        pdialog.startProgress('Saving ROMs in database ...')
-        scraper_strategy.store_scraped_roms(args.get_akl_addon_id(),
-                                            args.get_entity_type(),
-                                            args.get_entity_id(),
-                                            scraped_roms)
+        scraper_strategy.store_scraped_rom(args.get_akl_addon_id(), rom_id, scraped_rom)
+    return len(refreshed_rom_ids)
+
+
+# Planning pass for multi-ROM scrapes. Estimates the TGDB API calls still needed for the ROMs
+# and asks the user to confirm when they would use a large share of the last allowance seen.
+# If the batch does not fit in that allowance, only the cheapest ROMs that fit are
+# prefetched. The ScrapeStrategy still processes every ROM and stops when the allowance runs
+# out.
+# Returns the ROMs to prefetch, cheapest first, or None if the user cancelled.
+def plan_scraper_batch(roms: list, settings: ScraperSettings, scraper: TheGamesDB) -> list:
+    if not roms:
+        return roms
+    scrape_metadata = uses_online_scraper(settings.scrape_metadata_policy)
+    scrape_assets = uses_online_scraper(settings.scrape_assets_policy)
+    try:
+        plan = scraper.plan_batch(roms, scrape_metadata, scrape_assets)
+    except Exception as ex:
+        logger.warning('Planning failed. Continuing without API cost estimation.', exc_info=ex)
+        return roms
+
+    logger.info(f'TGDB batch plan:\n{plan.describe()}')
+    if not plan.needs_confirmation():
+        return roms
+    if not kodi.dialog_yesno(f'{plan.describe()}\n\nContinue scraping?'):
+        return None
+    return plan.roms_within_allowance()
+
+
+# Prefetch stage for multi-ROM scrapes. Resolves the candidates of the ROMs, searching the
+# uncached ones concurrently, and retrieves their metadata and asset lists in batches, so the
+# ScrapeStrategy only hits the disk caches.
+# Prefetching is an optimization only. Any failure is logged and the normal per-ROM scrape
+# runs as usual.
+# Only data that is always scraped online is prefetched. With LOCAL_AND_SCRAPE the
+# ScrapeStrategy first uses the local files and the prefetched data could never be used.
+def prefetch_scraper_data(roms: list, settings: ScraperSettings,
+                          scraper: TheGamesDB, pdialog: kodi.ProgressDialog):
+    prefetch_metadata = settings.scrape_metadata_policy == constants.SCRAPE_POLICY_SCRAPE_ONLY
+    prefetch_assets = settings.scrape_assets_policy == constants.SCRAPE_POLICY_SCRAPE_ONLY
+    # Images are only downloaded ahead when they are picked automatically.
+    prefetch_images = prefetch_assets and settings.asset_selection_mode == constants.SCRAPE_AUTOMATIC
+    if not prefetch_metadata and not prefetch_assets:
+        return
+    try:
+        pdialog.startProgress('Prefetching TGDB data ...')
+        status_dic = kodi.new_status_dic('Prefetch was OK')
+        candidates = {}
+        search_jobs = []
+        for rom in roms:
+            platform = rom.get_platform()
+            if scraper.check_candidates_cache(rom.get_identifier(), platform):
+                candidate = scraper.retrieve_from_candidates_cache(rom.get_identifier(), platform)
+                if candidate:
+                    # Let the scraper determine the cache key of the ROM.
+                    scraper.set_candidate(rom.get_identifier(), platform, candidate)
+                    candidates[scraper.cache_key] = candidate
+            elif settings.game_selection_mode == constants.SCRAPE_AUTOMATIC:
+                search_jobs.append((rom.get_identifier(), rom, platform))
+
+        # In automatic mode the ScrapeStrategy picks the first candidate, so do the same here.
+        # Searches without candidates are not cached and will be retried by the ScrapeStrategy.
+        candidate_lists = scraper.get_candidates_concurrently(search_jobs, status_dic)
+        for (search_term, rom, platform), candidate_list in zip(search_jobs, candidate_lists):
+            if not candidate_list:
+                continue
+            scraper.set_candidate(rom.get_identifier(), platform, candidate_list[0])
+            candidates[scraper.cache_key] = candidate_list[0]
+        logger.debug(f'Prefetch: {len(candidates)} of {len(roms)} ROMs have a resolved candidate')
+
+        if prefetch_metadata and status_dic['status']:
+            num_cached = scraper.prefetch_metadata(candidates, status_dic)
+            logger.debug(f'Prefetch: added {num_cached} entries to the metadata cache')
+        if prefetch_assets and status_dic['status']:
+            num_cached = scraper.prefetch_assets(candidates, status_dic)
+            logger.debug(f'Prefetch: added {num_cached} entries to the internal cache')
+        if prefetch_images and status_dic['status']:
+            pdialog.updateMessage('Downloading TGDB images ...')
+            num_images = scraper.prefetch_images(candidates, settings.asset_IDs_to_scrape)
+            logger.debug(f'Prefetch: {num_images} images in the image store')
+        if not status_dic['status']:
+            logger.warning(f'Prefetch stopped: {status_dic["msg"]}')
+        scraper.flush_disk_cache()
+    except Exception as ex:
+        logger.warning('Prefetch failed. Continuing without prefetched data.', exc_info=ex)
+    finally:
         pdialog.endProgress()
 
 
+# Writes the report of the scrape run as JSON next to the scraper caches, or in the addon data
+# directory without cache directory, and shows a short summary. Reporting never fails a scrape.
+def write_scrape_report(scraper: TheGamesDB, show_summary: bool):
+    try:
+        summary = scraper.describe_scrape_report()
+        logger.info(f'TGDB scrape report:\n{summary}')
+        report_dir = io.FileName(scraper.cache_dir_path, isdir=True) if scraper.cache_dir_path \
+            else kodi.getAddonDir()
+        report_file = report_dir.pjoin(REPORT_FILENAME)
+        report_file.saveStrToFile(json.dumps(scraper.get_scrape_report(), indent=2))
+        logger.info(f'TGDB scrape report written to "{report_file.getPath()}"')
+        if show_summary:
+            kodi.dialog_OK(text=summary, title='TGDB scrape report')
+    except Exception as ex:
+        logger.warning('Writing the scrape report failed.', exc_info=ex)
+
+
+# Only these policies use the online scraper. Title only and local only scrapes must never
+# spend TGDB quota.
+def uses_online_scraper(scrape_policy) -> bool:
+    return scrape_policy in [constants.SCRAPE_POLICY_LOCAL_AND_SCRAPE, constants.SCRAPE_POLICY_SCRAPE_ONLY]
+
+
+# Returns an empty list when the ROMs cannot be retrieved. The ScrapeStrategy retrieves the
+# ROMs again itself, so planning and prefetching are just skipped in that case.
+def get_roms_to_scrape(args: addons.AklAddonArguments) -> list:
+    from akl import api
+    try:
+        if args.get_entity_type() == constants.OBJ_SOURCE:
+            return api.client_get_roms_in_source(
+                args.get_webserver_host(), args.get_webserver_port(), args.get_entity_id())
+        return api.client_get_roms_in_collection(
+            args.get_webserver_host(), args.get_webserver_port(), args.get_entity_id())
+    except Exception as ex:
+        logger.warning('Cannot retrieve the ROMs to scrape.', exc_info=ex)
+        return []
+
+
 # ---------------------------------------------------------------------------------------------
 # UPDATE PLUGIN
 # ---------------------------------------------------------------------------------------------
 def update_plugin_settings():
-    supported_assets = '|'.join(TheGamesDB.supported_asset_list)
-    supported_metadata = '|'.join(TheGamesDB.supported_metadata_list)
+    supported_assets = '|'.join(capabilities.SUPPORTED_ASSET_LIST)
+    supported_metadata = '|'.join(capabilities.SUPPORTED_METADATA_LIST)
     
     settings.setSetting("akl.scraper.supported_assets", supported_assets)
     settings.setSetting("akl.scraper.supported_metadata", supported_metadata)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Asyncio interface to the TGDB scraper for scraping many ROMs at once.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import asyncio
+import functools
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+from akl import constants
+from akl.utils import kodi
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Async version of the scraper API: get_candidates(), get_metadata(), get_assets() and
+# download_image() are coroutines, so many ROMs can be in flight at once in a single Kodi
+# Python process.
+#
+# The standard library has no async HTTP client, so the blocking scraper calls run on a pool
+# of max_concurrency threads and the coroutines await them. The scraper rate limiter, caches
+# and allowance checks are shared with the blocking API, which keeps working as before for the
+# ScrapeStrategy. Unlike the blocking API, metadata and assets are requested for an explicit
+# candidate and cache key instead of the current candidate of the scraper.
+# ------------------------------------------------------------------------------------------------
+class AsyncScraper(object):
+
+    def __init__(self, scraper, max_concurrency: int = 4):
+        self.scraper = scraper
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def get_candidates(self, search_term: str, rom, platform: str, status_dic):
+        return await self._run_blocking(self.scraper.get_candidates, search_term, rom, platform, status_dic)
+
+    async def get_metadata(self, candidate, cache_key: str, status_dic):
+        return await self._run_blocking(self.scraper.get_metadata_for, candidate, cache_key, status_dic)
+
+    async def get_assets(self, candidate, cache_key: str, asset_info_id: str, status_dic):
+        return await self._run_blocking(self.scraper.get_assets_for, candidate, cache_key, asset_info_id, status_dic)
+
+    async def download_image(self, image_url: str, image_local_path):
+        return await self._run_blocking(self.scraper.download_image, image_url, image_local_path)
+
+    # Resolve the candidate of a ROM, from the candidates cache or with a search picking the
+    # first candidate, then get its metadata and the assets of asset_IDs concurrently.
+    # All the asset IDs are filtered from the same asset list of the game, so they are asked for
+    # one after another in a single job: the first one fills the caches and the others are cache
+    # hits. The trailer is part of the metadata and is asked for once the metadata is cached.
+    # Returns a dictionary with the candidates, candidate, cache_key, metadata and assets
+    # (asset ID -> list), or None if the ROM has no candidate. Errors are reported in status_dic.
+    async def scrape_rom(self, rom, asset_IDs: list, status_dic) -> dict:
+        identifier = rom.get_identifier()
+        platform = rom.get_platform()
+        if await self._run_blocking(self.scraper.check_candidates_cache, identifier, platform):
+            candidate = await self._run_blocking(self.scraper.retrieve_from_candidates_cache, identifier, platform)
+            candidate_list = [candidate] if candidate else []
+        else:
+            candidate_list = await self.get_candidates(identifier, rom, platform, status_dic)
+            candidate = candidate_list[0] if candidate_list else None
+        if not candidate or not status_dic['status']:
+            return None
+        cache_key = await self._run_blocking(self.scraper.resolve_candidate, identifier, platform, candidate)
+
+        image_asset_IDs = [asset_ID for asset_ID in asset_IDs if asset_ID != constants.ASSET_TRAILER_ID]
+        metadata, assets = await asyncio.gather(
+            self.get_metadata(candidate, cache_key, status_dic),
+            self._run_blocking(self._get_assets_of, candidate, cache_key, image_asset_IDs, status_dic))
+        if constants.ASSET_TRAILER_ID in asset_IDs:
+            assets[constants.ASSET_TRAILER_ID] = await self.get_assets(
+                candidate, cache_key, constants.ASSET_TRAILER_ID, status_dic)
+        return {
+            'candidates': candidate_list,
+            'candidate': candidate,
+            'cache_key': cache_key,
+            'metadata': metadata,
+            'assets': {asset_ID: assets[asset_ID] for asset_ID in asset_IDs}
+        }
+
+    # Scrape all the ROMs with at most max_concurrency ROMs in flight.
+    # Returns the result of scrape_rom() of every ROM in the same order as roms. status_dic
+    # receives the first error of any ROM.
+    async def scrape_roms(self, roms: list, asset_IDs: list, status_dic) -> list:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def scrape_job(rom):
+            async with semaphore:
+                rom_status_dic = kodi.new_status_dic('Scraping was OK')
+                return await self.scrape_rom(rom, asset_IDs, rom_status_dic), rom_status_dic
+
+        results = await asyncio.gather(*[scrape_job(rom) for rom in roms])
+        scraped_roms = []
+        for scraped_rom, rom_status_dic in results:
+            if not rom_status_dic['status'] and status_dic['status']:
+                status_dic.update(rom_status_dic)
+            scraped_roms.append(scraped_rom)
+        return scraped_roms
+
+    # Blocking wrapper of scrape_roms() for callers without an event loop.
+    def scrape_roms_sync(self, roms: list, asset_IDs: list, status_dic) -> list:
+        return asyncio.run(self.scrape_roms(roms, asset_IDs, status_dic))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _get_assets_of(self, candidate, cache_key: str, asset_IDs: list, status_dic) -> dict:
+        return {asset_ID: self.scraper.get_assets_for(candidate, cache_key, asset_ID, status_dic)
+                for asset_ID in asset_IDs}
+
+    async def _run_blocking(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(function, *args))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Single file key/value store for the scraper caches.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import json
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Key/value store of JSON data in a single SQLite file.
+# Entries are grouped by cache type, like the scraper disk caches, and looked up by
+# (cache type, key) on the primary key index. Many entries can be written in one transaction
+# with put_many(), and compact() gives the space of replaced entries back to the file system.
+# ------------------------------------------------------------------------------------------------
+class CacheStore(object):
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            # A cache can lose the last writes on power loss, but must not sync on every write.
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'cache_type TEXT, key TEXT, data TEXT, updated REAL, '
+                'PRIMARY KEY (cache_type, key)) WITHOUT ROWID')
+
+    # Entries older than max_age seconds are treated as missing.
+    def contains(self, cache_type: str, key: str, max_age: float = None) -> bool:
+        return self._select(cache_type, key, max_age) is not None
+
+    # Returns the decoded data or None if the key is not in the store or is too old.
+    def get(self, cache_type: str, key: str, max_age: float = None):
+        row = self._select(cache_type, key, max_age)
+        return json.loads(row[0]) if row else None
+
+    def put(self, cache_type: str, key: str, data):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries (cache_type, key, data, updated) VALUES (?, ?, ?, ?)',
+                (cache_type, key, json.dumps(data), time.time()))
+
+    # All the keys of a cache type, whatever their age.
+    def keys(self, cache_type: str) -> list:
+        with self.lock:
+            rows = self.conn.execute('SELECT key FROM entries WHERE cache_type = ?', (cache_type,)).fetchall()
+        return [row[0] for row in rows]
+
+    # Stores (key, data) items of a cache type in a single transaction.
+    def put_many(self, cache_type: str, items):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO entries (cache_type, key, data, updated) VALUES (?, ?, ?, ?)',
+                ((cache_type, key, json.dumps(data), now) for key, data in items))
+
+    def delete(self, cache_type: str, key: str):
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM entries WHERE cache_type = ? AND key = ?', (cache_type, key))
+
+    def count(self, cache_type: str) -> int:
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM entries WHERE cache_type = ?', (cache_type,)).fetchone()[0]
+
+    # Rewrite the database without the free pages of replaced and deleted entries and empty the
+    # write ahead log.
+    def compact(self):
+        with self.lock:
+            self.conn.execute('VACUUM')
+            self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _select(self, cache_type: str, key: str, max_age: float):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT data, updated FROM entries WHERE cache_type = ? AND key = ?', (cache_type, key)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return row
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Metadata and assets supported by the TGDB scraper.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# This module must stay light. It is imported by commands like update-settings which do not
+# load the scraper itself.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+from akl import constants
+
+SUPPORTED_METADATA_LIST = [
+    constants.META_TITLE_ID,
+    constants.META_YEAR_ID,
+    constants.META_GENRE_ID,
+    constants.META_DEVELOPER_ID,
+    constants.META_NPLAYERS_ID,
+    constants.META_ESRB_ID,
+    constants.META_PLOT_ID,
+    constants.META_TAGS_ID
+]
+SUPPORTED_ASSET_LIST = [
+    constants.ASSET_FANART_ID,
+    constants.ASSET_BANNER_ID,
+    constants.ASSET_CLEARLOGO_ID,
+    constants.ASSET_SNAP_ID,
+    constants.ASSET_BOXFRONT_ID,
+    constants.ASSET_BOXBACK_ID,
+    constants.ASSET_TRAILER_ID
+]
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Sampled capture of TGDB responses into rotating, compressed files.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Debug capture of TGDB responses.
+# Captured responses are written as JSON lines to a gzip file by a background thread, so the
+# scraping threads never wait for the disk. When the capture file is larger than its share of
+# max_bytes it is rotated, and only the last backup_count rotated files are kept.
+#
+# sample_rate is the fraction of the responses captured, between 0.0 and 1.0. Responses are
+# sampled evenly, so 0.1 captures every 10th response. When the writer cannot keep up the
+# responses are dropped instead of blocking the scraper.
+#
+# | Line field | Contents                                      |
+# |------------|-----------------------------------------------|
+# | time       | Capture time in seconds since the epoch       |
+# | name       | Dump file name, like "TGDB_get_metadata.json" |
+# | data       | Response JSON data                            |
+# ------------------------------------------------------------------------------------------------
+class DebugCapture(object):
+    FILE_NAME = 'TGDB_capture'
+    FILE_EXTENSION = '.jsonl.gz'
+    QUEUE_SIZE = 256
+    # Uncompressed bytes between two flushes of the compressor. The compressed size, which
+    # decides the rotation, is only known after a flush.
+    MAX_FLUSH_BYTES = 64 * 1024
+
+    def __init__(self, capture_dir: str, sample_rate: float = 1.0, max_bytes: int = 20 * 1024 * 1024,
+                 backup_count: int = 4):
+        self.capture_dir = capture_dir
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.backup_count = backup_count
+        self.max_file_bytes = max(max_bytes // (backup_count + 1), 1)
+        self.flush_bytes = min(max(self.max_file_bytes // 4, 1), DebugCapture.MAX_FLUSH_BYTES)
+        self.unflushed_bytes = 0
+        self.lock = threading.Lock()
+        self.sample_credit = 0.0
+        self.stats = {
+            'captured': 0,
+            'skipped': 0,
+            'dropped': 0,
+            'bytes_written': 0,
+            'rotations': 0
+        }
+        os.makedirs(capture_dir, exist_ok=True)
+        self.raw_file = None
+        self.capture_file = None
+        self.queue = queue.Queue(DebugCapture.QUEUE_SIZE)
+        self.writer = threading.Thread(target=self._write_loop, name='TGDBDebugCapture', daemon=True)
+        self.writer.start()
+
+    def get_path(self, index: int = 0) -> str:
+        suffix = '.{}'.format(index) if index > 0 else ''
+        return os.path.join(self.capture_dir, DebugCapture.FILE_NAME + suffix + DebugCapture.FILE_EXTENSION)
+
+    # Queue a response for the writer, if sampled. The data is serialized in the calling
+    # thread because the scraper may still change it after this call.
+    def capture(self, name: str, data):
+        with self.lock:
+            self.sample_credit += self.sample_rate
+            if self.sample_credit < 1.0:
+                self.stats['skipped'] += 1
+                return
+            self.sample_credit -= 1.0
+        line = json.dumps({'time': time.time(), 'name': name, 'data': data}) + '\n'
+        try:
+            self.queue.put_nowait(line.encode('utf-8'))
+        except queue.Full:
+            with self.lock:
+                self.stats['dropped'] += 1
+
+    # Wait for the writer to write the queued responses and flush the capture file, so it can
+    # be read up to here even if the process ends without close().
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return dict(self.stats)
+
+    # --- Writer thread --------------------------------------------------------------------------
+    def _write_loop(self):
+        while True:
+            line = self.queue.get()
+            try:
+                if line is None:
+                    self._close_file()
+                    return
+                self._write(line)
+                if self.capture_file is not None and self.queue.empty():
+                    self._flush_file()
+            except Exception as ex:
+                logger.warning('Debug capture write failed', exc_info=ex)
+            finally:
+                self.queue.task_done()
+
+    def _write(self, line: bytes):
+        if self.capture_file is None:
+            self.raw_file = open(self.get_path(), 'ab')
+            self.capture_file = gzip.GzipFile(fileobj=self.raw_file, mode='ab')
+        self.capture_file.write(line)
+        with self.lock:
+            self.stats['captured'] += 1
+            self.stats['bytes_written'] += len(line)
+        self.unflushed_bytes += len(line)
+        if self.unflushed_bytes >= self.flush_bytes:
+            self._flush_file()
+            if self.raw_file.tell() >= self.max_file_bytes:
+                self._rotate()
+
+    def _flush_file(self):
+        self.capture_file.flush(zlib.Z_SYNC_FLUSH)
+        self.unflushed_bytes = 0
+
+    # capture.jsonl.gz -> capture.1.jsonl.gz -> ... -> capture.<backup_count>.jsonl.gz
+    def _rotate(self):
+        self._close_file()
+        for index in range(self.backup_count, 0, -1):
+            source = self.get_path(index - 1)
+            if os.path.exists(source):
+                os.replace(source, self.get_path(index))
+        if self.backup_count == 0:
+            os.remove(self.get_path())
+        with self.lock:
+            self.stats['rotations'] += 1
+
+    def _close_file(self):
+        if self.capture_file is not None:
+            self.capture_file.close()
+            self.raw_file.close()
+        self.capture_file = None
+        self.raw_file = None
+        self.unflushed_bytes = 0
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Parallel image downloads into a content addressed store.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import hashlib
+import os
+import shutil
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Downloads images once into a content addressed store and copies them to the asset paths.
+# Regional variants and discs of the same game use the same TGDB image files. Each file is
+# stored under the hash of its TGDB path, so it is downloaded once however many ROMs use it.
+#
+# Images are queued with queue() and downloaded by run() on a bounded pool of workers. Files
+# are then copied to the asset paths. Hard links would share the stored file with the asset
+# files, so an asset edited or replaced in place would change the image of every other ROM.
+#
+# The store is bounded by max_bytes. After every run() the least recently used images, by
+# modification time, are removed until the store fits again.
+# ------------------------------------------------------------------------------------------------
+class AssetDownloader(object):
+
+    def __init__(self, transport, store_dir: str, max_workers: int = 4, max_bytes: int = 256 * 1024 * 1024):
+        self.transport = transport
+        self.store_dir = store_dir
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # url -> list of target paths (may be empty to only fill the store)
+        self.queued = {}
+        self.stats = {
+            'downloaded': 0,
+            'store_hits': 0,
+            'failed': 0,
+            'bytes_downloaded': 0,
+            'copied': 0,
+            'evicted': 0
+        }
+
+    # Path in the store of the image at url. The same TGDB image always gets the same path,
+    # whatever the CDN size folder or host are.
+    def get_store_path(self, url: str) -> str:
+        path = urlsplit(url).path
+        # https://cdn.thegamesdb.net/images/original/boxart/front/338-1.jpg -> boxart/front/338-1.jpg
+        for size_folder in ('/original/', '/large/', '/medium/', '/small/', '/thumb/'):
+            if size_folder in path:
+                size, image_path = size_folder.strip('/'), path.split(size_folder, 1)[1]
+                break
+        else:
+            size, image_path = '', path
+        digest = hashlib.sha1('{}:{}'.format(size, image_path).encode('utf-8')).hexdigest()
+        extension = os.path.splitext(image_path)[1].lower()
+        return os.path.join(self.store_dir, digest[:2], digest + extension)
+
+    def queue(self, url: str, target_path: str = None):
+        with self.lock:
+            targets = self.queued.setdefault(url, [])
+            if target_path and target_path not in targets:
+                targets.append(target_path)
+
+    # Download all the queued images in parallel and copy them to their targets.
+    # Returns a dictionary of url -> store path, or None if the download failed.
+    def run(self) -> dict:
+        with self.lock:
+            queued = self.queued
+            self.queued = {}
+        if not queued:
+            return {}
+
+        logger.debug(f'AssetDownloader: downloading {len(queued)} images with {self.max_workers} workers')
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            store_paths = dict(zip(queued.keys(), executor.map(self.fetch, queued.keys())))
+
+        for url, targets in queued.items():
+            if store_paths[url] is None:
+                continue
+            for target_path in targets:
+                self.copy_to(store_paths[url], target_path)
+        self.prune()
+        return store_paths
+
+    # Store path of the image at url if it is in the store, or None.
+    def get_stored_path(self, url: str) -> str:
+        store_path = self.get_store_path(url)
+        if not os.path.isfile(store_path):
+            return None
+        self._touch(store_path)
+        self._count('store_hits')
+        return store_path
+
+    # Make sure the image is in the store. Returns the store path or None on errors.
+    def fetch(self, url: str) -> str:
+        store_path = self.get_stored_path(url)
+        if store_path is not None:
+            return store_path
+
+        store_path = self.get_store_path(url)
+        image_data, http_code = self.transport.get_bytes(url)
+        if http_code != 200 or not image_data:
+            logger.error(f'AssetDownloader: failed downloading "{url}" (HTTP code {http_code})')
+            self._count('failed')
+            return None
+
+        os.makedirs(os.path.dirname(store_path), exist_ok=True)
+        # Write to a temporary file first, so other workers never see half written images.
+        temp_path = '{}.{}.tmp'.format(store_path, threading.get_ident())
+        with open(temp_path, 'wb') as image_file:
+            image_file.write(image_data)
+        os.replace(temp_path, store_path)
+        self._count('downloaded')
+        self._count('bytes_downloaded', len(image_data))
+        return store_path
+
+    # Copy a stored image to an asset path. The copy is written to a temporary file first, so
+    # the asset path always has either the old or the new complete image.
+    def copy_to(self, store_path: str, target_path: str):
+        target_dir = os.path.dirname(target_path)
+        if target_dir:
+            os.makedirs(target_dir, exist_ok=True)
+        temp_path = '{}.{}.tmp'.format(target_path, threading.get_ident())
+        shutil.copyfile(store_path, temp_path)
+        os.replace(temp_path, target_path)
+        self._count('copied')
+
+    # Remove the least recently used images until the store fits in max_bytes.
+    def prune(self):
+        stored = []
+        for dir_path, _, file_names in os.walk(self.store_dir):
+            for file_name in file_names:
+                if file_name.endswith('.tmp'):
+                    continue
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
+                    continue
+                stored.append((file_stat.st_mtime, file_stat.st_size, file_path))
+        total_bytes = sum(size for _, size, _ in stored)
+        if total_bytes <= self.max_bytes:
+            return
+        stored.sort()
+        for _, size, file_path in stored:
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue
+            total_bytes -= size
+            self._count('evicted')
+            if total_bytes <= self.max_bytes:
+                break
+        logger.debug(f'AssetDownloader: image store pruned to {total_bytes} bytes')
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return dict(self.stats)
+
+    # Store hits mark the image as recently used.
+    def _touch(self, store_path: str):
+        try:
+            os.utime(store_path)
+        except OSError:
+            pass
+
+    def _count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.stats[name] += amount
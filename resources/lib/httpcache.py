@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# On-disk cache of TGDB API responses keyed by URL.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Size bounded cache of HTTP responses stored in a single SQLite file.
+# Entries are keyed by URL (without the API key) and expire after the TTL given when they
+# are read, so every endpoint can use its own TTL. When the total size of the entries goes
+# over max_bytes the least recently used entries are evicted.
+#
+# Cache hits do not write to the database. Their access times are kept in memory and written
+# in batches, before evicting and when the cache is closed.
+# ------------------------------------------------------------------------------------------------
+class ResponseCache(object):
+    ACCESS_BATCH_SIZE = 64
+
+    def __init__(self, db_path: str, max_bytes: int, clock=time.time):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # key -> access time not written yet
+        self.pending_access = {}
+        with self.lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, data BLOB, size INTEGER, created REAL, accessed REAL)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+            self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+            'bytes_read': 0,
+            'bytes_written': 0
+        }
+
+    # Returns the cached data or None if not cached or older than ttl seconds.
+    def get(self, key: str, ttl: float) -> bytes:
+        now = self.clock()
+        with self.lock, self.conn:
+            row = self.conn.execute('SELECT data, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            data, created = row
+            if now - created > ttl:
+                self._delete(key, len(data))
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self.pending_access[key] = now
+            if len(self.pending_access) >= ResponseCache.ACCESS_BATCH_SIZE:
+                self._write_access_times()
+            self.stats['hits'] += 1
+            self.stats['bytes_read'] += len(data)
+        return bytes(data)
+
+    def put(self, key: str, data: bytes):
+        now = self.clock()
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        with self.lock, self.conn:
+            row = self.conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.total_bytes -= row[0]
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (key, data, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                (key, sqlite3.Binary(data), size, now, now))
+            self.pending_access.pop(key, None)
+            self.total_bytes += size
+            self.stats['bytes_written'] += size
+            self._evict()
+
+    def invalidate(self, key: str):
+        with self.lock, self.conn:
+            row = self.conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self._delete(key, row[0])
+
+    # Keys of the cached responses which contain the text, like an endpoint path.
+    def get_keys(self, text: str) -> list:
+        with self.lock:
+            rows = self.conn.execute('SELECT key FROM responses WHERE instr(key, ?) > 0', (text,)).fetchall()
+        return [row[0] for row in rows]
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            stats['total_bytes'] = self.total_bytes
+        return stats
+
+    def close(self):
+        with self.lock:
+            with self.conn:
+                self._write_access_times()
+            self.conn.close()
+
+    def _delete(self, key: str, size: int):
+        self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+        self.pending_access.pop(key, None)
+        self.total_bytes -= size
+
+    def _write_access_times(self):
+        if not self.pending_access:
+            return
+        self.conn.executemany('UPDATE responses SET accessed = ? WHERE key = ?',
+                              [(accessed, key) for key, accessed in self.pending_access.items()])
+        self.pending_access = {}
+
+    # Evict the least recently used entries until the cache fits in max_bytes.
+    def _evict(self):
+        if self.total_bytes > self.max_bytes:
+            self._write_access_times()
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute('SELECT key, size FROM responses ORDER BY accessed LIMIT 32').fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for key, size in rows:
+                self._delete(key, size)
+                self.stats['evictions'] += 1
+                if self.total_bytes <= self.max_bytes:
+                    return
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Compact lookup tables for the TGDB genres, developers and publishers.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+
+from array import array
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Read only table of integer IDs to names.
+# Instead of a dictionary with one Python string per entry, the table keeps a sorted array of
+# IDs, an array of offsets and one packed UTF-8 string table. Tables saved to disk are loaded
+# with mmap, so loading costs no parsing and the pages are only read when they are used.
+# Names are decoded on lookup, which is found with a binary search.
+#
+# | File layout | Type                 | Contents                               |
+# |-------------|----------------------|----------------------------------------|
+# | header      | 4s I I               | Magic, version and number of entries   |
+# | ids         | int32 * count        | Sorted TGDB IDs                        |
+# | offsets     | uint32 * (count + 1) | Start of every name in the strings     |
+# | strings     | bytes                | UTF-8 names, one after another         |
+#
+# All numbers are little endian.
+# ------------------------------------------------------------------------------------------------
+class CompactLookupTable(object):
+    MAGIC = b'TGLT'
+    VERSION = 1
+    HEADER = struct.Struct('<4sII')
+
+    def __init__(self, buffer):
+        magic, version, count = CompactLookupTable.HEADER.unpack_from(buffer, 0)
+        if magic != CompactLookupTable.MAGIC or version != CompactLookupTable.VERSION:
+            raise ValueError('Not a compact lookup table')
+        self.buffer = buffer
+        self.count = count
+
+        ids_start = CompactLookupTable.HEADER.size
+        offsets_start = ids_start + 4 * count
+        self.strings_start = offsets_start + 4 * (count + 1)
+        self.ids = self._int_view(buffer, ids_start, count, 'i')
+        self.offsets = self._int_view(buffer, offsets_start, count + 1, 'I')
+
+    # Build a table from a dictionary of IDs to names. IDs may be strings, like the keys
+    # of the TGDB JSON data.
+    @staticmethod
+    def from_mapping(mapping: dict):
+        return CompactLookupTable(CompactLookupTable.pack(mapping))
+
+    @staticmethod
+    def pack(mapping: dict) -> bytes:
+        items = sorted((int(id), name) for id, name in mapping.items())
+        ids = array('i', [id for id, _ in items])
+        offsets = array('I', [0])
+        strings = bytearray()
+        for _, name in items:
+            strings.extend(name.encode('utf-8'))
+            offsets.append(len(strings))
+        if sys.byteorder != 'little':
+            ids.byteswap()
+            offsets.byteswap()
+        header = CompactLookupTable.HEADER.pack(CompactLookupTable.MAGIC, CompactLookupTable.VERSION, len(items))
+        return header + ids.tobytes() + offsets.tobytes() + bytes(strings)
+
+    @staticmethod
+    def save(file_path: str, mapping: dict):
+        # Unique temporary file, so concurrent writers never replace the file with a partial one.
+        temp_path = '{}.{}.{}.tmp'.format(file_path, os.getpid(), threading.get_ident())
+        with open(temp_path, 'wb') as table_file:
+            table_file.write(CompactLookupTable.pack(mapping))
+        os.replace(temp_path, file_path)
+
+    @staticmethod
+    def load(file_path: str):
+        with open(file_path, 'rb') as table_file:
+            buffer = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return CompactLookupTable(buffer)
+
+    def get(self, id, default=None):
+        id = int(id)
+        index = bisect_left(self.ids, id)
+        if index == self.count or self.ids[index] != id:
+            return default
+        start = self.strings_start + self.offsets[index]
+        end = self.strings_start + self.offsets[index + 1]
+        return bytes(self.buffer[start:end]).decode('utf-8')
+
+    def __getitem__(self, id):
+        name = self.get(id)
+        if name is None:
+            raise KeyError(id)
+        return name
+
+    def __contains__(self, id):
+        return self.get(id) is not None
+
+    def __len__(self):
+        return self.count
+
+    # Zero copy view of the integers when the machine is little endian, like the file.
+    def _int_view(self, buffer, start: int, count: int, typecode: str):
+        view = memoryview(buffer)[start:start + 4 * count]
+        if sys.byteorder == 'little':
+            return view.cast(typecode)
+        values = array(typecode, view.tobytes())
+        values.byteswap()
+        return values
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# ROM manifests for batch scrapes outside Kodi.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import csv
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FILENAME_COLUMNS = ('filename', 'file', 'path')
+PLATFORM_COLUMN = 'platform'
+
+
+# ------------------------------------------------------------------------------------------------
+# Entry of a ROM manifest: the ROM file name and its AKL platform.
+# The identifier is the file name without directory and extension, like the AKL ROM scanner.
+# ------------------------------------------------------------------------------------------------
+class ManifestEntry(object):
+    __slots__ = ('index', 'filename', 'platform')
+
+    def __init__(self, index: int, filename: str, platform: str):
+        self.index = index
+        self.filename = filename
+        self.platform = platform
+
+    @property
+    def identifier(self) -> str:
+        return os.path.splitext(os.path.basename(self.filename.replace('\\', '/')))[0]
+
+
+# Generator of the entries of a CSV or JSONL manifest, read one line at a time so manifests of
+# any size use the same memory. JSONL manifests are detected by the .jsonl extension.
+#
+# CSV manifests have a header with a filename (or file or path) and a platform column.
+# JSONL manifests have one object per line with the same keys. Invalid entries are skipped
+# with a warning.
+def read_manifest(manifest_path: str):
+    with open(manifest_path, 'r', encoding='utf-8', newline='') as manifest_file:
+        if manifest_path.lower().endswith('.jsonl'):
+            rows = _read_JSONL_rows(manifest_file)
+        else:
+            rows = csv.DictReader(manifest_file)
+        index = 0
+        for line_number, row in enumerate(rows, start=1):
+            entry = _new_entry(index, row)
+            if entry is None:
+                logger.warning(f'Manifest entry {line_number} has no filename or platform. Skipped.')
+                continue
+            yield entry
+            index += 1
+
+
+def _read_JSONL_rows(manifest_file):
+    for line in manifest_file:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else {}
+
+
+def _new_entry(index: int, row: dict) -> ManifestEntry:
+    row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    filename = next((row[column] for column in FILENAME_COLUMNS if row.get(column)), None)
+    platform = row.get(PLATFORM_COLUMN)
+    if not filename or not platform:
+        return None
+    return ManifestEntry(index, str(filename).strip(), str(platform).strip())
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Fuzzy title matching used to rank the candidates returned by TGDB.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import re
+
+# Tags between brackets are not part of the title. No-Intro, TOSEC and Redump tags, like
+# "(USA, Europe)", "(Rev 1)", "(Disc 1)", "(1991)(Sega)" or "[!]".
+TAGS_REGEX = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+WORDS_REGEX = re.compile(r'\w+')
+
+
+# Normalized title used for comparisons: casefolded, without tags and punctuation.
+# "Sonic The Hedgehog (USA, Europe)" -> "sonic the hedgehog"
+def normalize_title(title: str) -> str:
+    return ' '.join(WORDS_REGEX.findall(TAGS_REGEX.sub(' ', title).casefold()))
+
+
+# ------------------------------------------------------------------------------------------------
+# Precomputed comparison keys of a single title.
+# ------------------------------------------------------------------------------------------------
+class TitleKey(object):
+    __slots__ = ('normalized', 'tokens', 'trigrams')
+
+    def __init__(self, title: str):
+        self.normalized = normalize_title(title)
+        self.tokens = frozenset(self.normalized.split())
+        # Pad the title so the first and last characters get their own trigrams.
+        padded = '  {} '.format(self.normalized)
+        self.trigrams = frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+# ------------------------------------------------------------------------------------------------
+# Scores titles against a search term.
+# The search term keys are computed once, so scoring a page of candidates only computes the
+# keys of the candidate titles.
+#
+# The confidence is a value between 0.0 (nothing in common) and 1.0 (same normalized title).
+# It is the average of the token set similarity, which ignores word order and extra words
+# like subtitles, and the trigram similarity, which tolerates small spelling differences.
+# ------------------------------------------------------------------------------------------------
+class TitleMatcher(object):
+
+    def __init__(self, search_term: str):
+        self.search_key = TitleKey(search_term)
+
+    def score(self, title: str) -> float:
+        return self.score_key(TitleKey(title))
+
+    def score_key(self, title_key: TitleKey) -> float:
+        if not self.search_key.normalized or not title_key.normalized:
+            return 0.0
+        if title_key.normalized == self.search_key.normalized:
+            return 1.0
+        token_score = dice_coefficient(self.search_key.tokens, title_key.tokens)
+        trigram_score = dice_coefficient(self.search_key.trigrams, title_key.trigrams)
+        # An exact match is the only way to reach 1.0.
+        return min((token_score + trigram_score) / 2, 0.99)
+
+
+def dice_coefficient(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
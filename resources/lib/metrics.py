@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Instrumentation of the TGDB requests and the scraper caches.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import threading
+import time
+
+from bisect import bisect_left
+
+
+# ------------------------------------------------------------------------------------------------
+# Thread safe counters of a scrape run.
+# Requests are recorded per TGDB endpoint with their latency histogram, bytes, error codes and
+# the last allowance reported. Cache lookups are recorded per cache tier as hits and misses.
+# ------------------------------------------------------------------------------------------------
+class ScrapeMetrics(object):
+    # Upper bounds in milliseconds of the latency histogram buckets. Slower requests are
+    # counted in the last bucket.
+    LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000]
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.started = clock()
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.caches = {}
+        self.last_allowance = None
+
+    # http_code is None for network errors.
+    def record_request(self, endpoint: str, seconds: float, num_bytes: int, http_code: int, allowance: int = None):
+        bucket = bisect_left(ScrapeMetrics.LATENCY_BUCKETS_MS, seconds * 1000)
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = {
+                    'requests': 0,
+                    'bytes': 0,
+                    'seconds': 0.0,
+                    'max_seconds': 0.0,
+                    'latency_histogram': [0] * (len(ScrapeMetrics.LATENCY_BUCKETS_MS) + 1),
+                    'errors': {}
+                }
+            stats['requests'] += 1
+            stats['bytes'] += num_bytes
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['latency_histogram'][bucket] += 1
+            if http_code != 200:
+                error_key = str(http_code) if http_code is not None else 'network'
+                stats['errors'][error_key] = stats['errors'].get(error_key, 0) + 1
+            if allowance is not None:
+                self.last_allowance = allowance
+
+    def record_cache(self, tier: str, hit: bool):
+        with self.lock:
+            stats = self.caches.setdefault(tier, {'hits': 0, 'misses': 0})
+            stats['hits' if hit else 'misses'] += 1
+
+    def get_report(self) -> dict:
+        with self.lock:
+            endpoints = {}
+            for endpoint, stats in self.endpoints.items():
+                endpoints[endpoint] = dict(stats, errors=dict(stats['errors']),
+                                           latency_histogram=list(stats['latency_histogram']),
+                                           mean_seconds=stats['seconds'] / stats['requests'])
+            caches = {}
+            for tier, stats in self.caches.items():
+                lookups = stats['hits'] + stats['misses']
+                caches[tier] = dict(stats, hit_rate=stats['hits'] / lookups if lookups else 0.0)
+            return {
+                'duration_seconds': self.clock() - self.started,
+                'latency_buckets_ms': list(ScrapeMetrics.LATENCY_BUCKETS_MS),
+                'endpoints': endpoints,
+                'caches': caches,
+                'remaining_allowance': self.last_allowance
+            }
+
+    # Short human readable summary of the report, for dialogs and the log.
+    def describe(self) -> str:
+        report = self.get_report()
+        requests = sum(stats['requests'] for stats in report['endpoints'].values())
+        errors = sum(sum(stats['errors'].values()) for stats in report['endpoints'].values())
+        seconds = sum(stats['seconds'] for stats in report['endpoints'].values())
+        lines = [
+            'Duration: {:.1f} s'.format(report['duration_seconds']),
+            'TGDB requests: {} ({} errors, {:.1f} s waiting)'.format(requests, errors, seconds)
+        ]
+        for endpoint, stats in sorted(report['endpoints'].items()):
+            lines.append('  {}: {} requests, {:.0f} ms mean'.format(
+                endpoint, stats['requests'], stats['mean_seconds'] * 1000))
+        for tier, stats in sorted(report['caches'].items()):
+            lines.append('Cache {}: {:.0%} hits of {}'.format(
+                tier, stats['hit_rate'], stats['hits'] + stats['misses']))
+        if report['remaining_allowance'] is not None:
+            lines.append('Remaining allowance: {}'.format(report['remaining_allowance']))
+        return '\n'.join(lines)
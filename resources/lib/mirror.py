@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Offline mirror of the TGDB public database dump.
+#
+# --- Information about the dump ---
+# https://cdn.thegamesdb.net/json/database-latest.json
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import json
+import sqlite3
+import threading
+
+from resources.lib.matching import normalize_title
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Local mirror of TGDB stored in a SQLite database.
+# The mirror is filled with import_dump() and returns games and images in the same shape as
+# the TGDB API, so TheGamesDB can parse them with the same code as online responses.
+#
+# | Table     | Contents                                                  |
+# |-----------|-----------------------------------------------------------|
+# | games     | One row per game with the game JSON as returned by TGDB   |
+# | games_fts | Full text index of the game titles (only if FTS5 exists)  |
+# | images    | One row per game with the list of image JSON dictionaries |
+# | info      | Key/value pairs, like the images base URLs                |
+#
+# The dump only includes the box art of the games. The images of a game in the mirror are
+# never the complete Games/Images list.
+# ------------------------------------------------------------------------------------------------
+class TGDBMirror(object):
+    # Maximum number of games returned by a search.
+    SEARCH_LIMIT = 100
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Searches may run on several worker threads. Serialize the access to the connection.
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_schema()
+        self.has_fts = self._table_exists('games_fts')
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # Import the TGDB JSON dump. dump_data is the decoded dump dictionary. Existing games are
+    # replaced. Returns the number of imported games.
+    def import_dump(self, dump_data: dict) -> int:
+        games = dump_data['data']['games']
+        boxart = dump_data.get('include', {}).get('boxart', {})
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO games (id, platform, game_title, title_key, data) VALUES (?, ?, ?, ?, ?)',
+                ((game['id'], game['platform'], game['game_title'],
+                  normalize_title(game['game_title']), json.dumps(game)) for game in games))
+            if self.has_fts:
+                self.conn.execute("INSERT INTO games_fts (games_fts) VALUES ('rebuild')")
+
+            if 'base_url' in boxart:
+                self.conn.execute('INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)',
+                                  ('base_url', json.dumps(boxart['base_url'])))
+            images = boxart.get('data', {})
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO images (game_id, data) VALUES (?, ?)',
+                ((int(game_id), json.dumps(image_list)) for game_id, image_list in images.items()))
+        logger.info(f'TGDBMirror: imported {len(games)} games and images of {len(images)} games')
+        return len(games)
+
+    # Search games by title. scraper_platforms is a TGDB platform ID or a sequence of IDs.
+    # 0 or an empty sequence means any platform.
+    # Returns a list of game dictionaries like the ones in the ByGameName data.games list.
+    # Exact title matches come first, then the best full text matches (shortest titles without
+    # FTS5), so the limit never drops the game searched for.
+    def search(self, search_term: str, scraper_platforms) -> list:
+        if isinstance(scraper_platforms, int):
+            scraper_platforms = [scraper_platforms]
+        scraper_platforms = [scraper_platform for scraper_platform in scraper_platforms if scraper_platform > 0]
+        words = normalize_title(search_term).split()
+        if not words:
+            return []
+
+        if self.has_fts:
+            query = ' '.join(['"{}"'.format(word) for word in words])
+            sql = 'SELECT g.data FROM games_fts f JOIN games g ON g.id = f.rowid WHERE games_fts MATCH ?'
+            params = [query]
+        else:
+            sql = 'SELECT g.data FROM games g WHERE ' + ' AND '.join(['g.title_key LIKE ?'] * len(words))
+            params = ['%{}%'.format(word) for word in words]
+        if scraper_platforms:
+            sql += ' AND g.platform IN ({})'.format(', '.join(['?'] * len(scraper_platforms)))
+            params.extend(scraper_platforms)
+        if self.has_fts:
+            sql += ' ORDER BY g.title_key = ? DESC, f.rank, g.id'
+        else:
+            sql += ' ORDER BY g.title_key = ? DESC, length(g.title_key), g.id'
+        params.append(' '.join(words))
+        sql += ' LIMIT {}'.format(TGDBMirror.SEARCH_LIMIT)
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    # Returns the game dictionary like in the ByGameID data.games list or None if the game
+    # is not in the mirror.
+    def get_game(self, game_id) -> dict:
+        with self.lock:
+            row = self.conn.execute('SELECT data FROM games WHERE id = ?', (int(game_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Returns the box art of a game as a Games/Images page data dictionary or None if there is
+    # no box art of the game in the mirror.
+    def get_images_page(self, game_id) -> dict:
+        with self.lock:
+            row = self.conn.execute('SELECT data FROM images WHERE game_id = ?', (int(game_id),)).fetchone()
+            base_url_row = self.conn.execute("SELECT value FROM info WHERE key = 'base_url'").fetchone()
+        if not row or not base_url_row:
+            return None
+        return {
+            'data': {
+                'base_url': json.loads(base_url_row[0]),
+                'images': {str(game_id): json.loads(row[0])}
+            },
+            'pages': {'next': None}
+        }
+
+    def count_games(self) -> int:
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM games').fetchone()[0]
+
+    def _create_schema(self):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS games ('
+                'id INTEGER PRIMARY KEY, platform INTEGER, game_title TEXT, title_key TEXT, data TEXT)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS games_platform ON games (platform)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS images (game_id INTEGER PRIMARY KEY, data TEXT)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)')
+            # Not every SQLite build has FTS5. Searches fall back to LIKE without it.
+            try:
+                self.conn.execute(
+                    'CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5('
+                    "game_title, content='games', content_rowid='id')")
+            except sqlite3.OperationalError:
+                logger.warning('TGDBMirror: SQLite FTS5 not available. Using slower title search.')
+
+    def _table_exists(self, name: str) -> bool:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?",
+                (name,)).fetchone()
+        return row is not None
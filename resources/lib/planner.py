@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Estimation of the TGDB API calls of a multi-ROM scrape.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import math
+
+
+# ------------------------------------------------------------------------------------------------
+# API cost estimation of a batch of ROMs.
+# TheGamesDB.plan_batch() adds every ROM with what is still missing in the disk caches. The
+# plan counts the searches, the batched ByGameID and Games/Images calls and the lookup table
+# calls, and compares them with the last allowance reported by TGDB.
+#
+# Searches are counted as a single page per search term, and the cost of ROMs is based on
+# this estimation. The worst case, with every search loading the maximum number of pages, is
+# reported too. ROMs without a resolved candidate are counted as a distinct game each, so the
+# estimation errs on the expensive side.
+# ------------------------------------------------------------------------------------------------
+class QuotaPlan(object):
+    # Plans using more than this share of the remaining allowance are confirmed by the user.
+    CONFIRM_ALLOWANCE_SHARE = 0.5
+
+    def __init__(self, allowance: int = None, metadata_batch_size: int = 1, images_batch_size: int = 1):
+        self.allowance = allowance
+        self.metadata_batch_size = metadata_batch_size
+        self.images_batch_size = images_batch_size
+
+        self.roms = []
+        self.num_cached_roms = 0
+        self.num_skipped_roms = 0
+        self.search_calls = 0
+        self.max_search_calls = 0
+        self.lookup_calls = 0
+        self.metadata_games = set()
+        self.images_games = set()
+        # Estimated cost of each ROM in the same order as self.roms.
+        self.rom_costs = []
+
+    # game_key identifies the TGDB game of the ROM. Use the candidate ID when known.
+    # search_calls is the expected number of search calls of the ROM and max_search_calls the
+    # worst case, which is search_calls if not given. skipped ROMs are known to have no TGDB
+    # game and will not be scraped. They cost nothing and are not counted as cached.
+    def add_rom(self, rom, search_calls: int, game_key, needs_metadata: bool, needs_images: bool,
+                max_search_calls: int = None, skipped: bool = False):
+        self.roms.append(rom)
+        if skipped:
+            self.num_skipped_roms += 1
+            self.rom_costs.append(0.0)
+            return
+        cost = float(search_calls)
+        self.search_calls += search_calls
+        self.max_search_calls += search_calls if max_search_calls is None else max_search_calls
+        if needs_metadata:
+            self.metadata_games.add(game_key)
+            cost += 1 / self.metadata_batch_size
+        if needs_images:
+            self.images_games.add(game_key)
+            cost += 1 / self.images_batch_size
+        if cost == 0:
+            self.num_cached_roms += 1
+        self.rom_costs.append(cost)
+
+    def add_lookup_table(self):
+        self.lookup_calls += 1
+
+    @property
+    def metadata_calls(self) -> int:
+        return math.ceil(len(self.metadata_games) / self.metadata_batch_size)
+
+    @property
+    def images_calls(self) -> int:
+        return math.ceil(len(self.images_games) / self.images_batch_size)
+
+    @property
+    def total_calls(self) -> int:
+        return self.search_calls + self.metadata_calls + self.images_calls + self.lookup_calls
+
+    def fits_allowance(self) -> bool:
+        return self.allowance is None or self.total_calls <= self.allowance
+
+    # True when the plan goes over the allowance or uses a large share of it. With an unknown
+    # allowance there is nothing to compare with and the plan is not confirmed.
+    def needs_confirmation(self) -> bool:
+        if self.allowance is None or self.total_calls == 0:
+            return False
+        return self.total_calls > self.allowance * QuotaPlan.CONFIRM_ALLOWANCE_SHARE
+
+    # ROMs ordered cheapest first and trimmed to the ones that fit in the allowance.
+    # ROMs with the same cost keep their original order.
+    def roms_within_allowance(self) -> list:
+        ordered = sorted(range(len(self.roms)), key=lambda index: self.rom_costs[index])
+        if self.allowance is None:
+            return [self.roms[index] for index in ordered]
+        budget = self.allowance - self.lookup_calls
+        selected = []
+        for index in ordered:
+            budget -= self.rom_costs[index]
+            if budget < 0:
+                break
+            selected.append(self.roms[index])
+        return selected
+
+    def describe(self) -> str:
+        lines = [
+            f'ROMs in batch: {len(self.roms)} ({self.num_cached_roms} fully cached)',
+            f'{self.num_skipped_roms} ROMs will not be scraped (not found on TGDB)',
+            f'Searches: {self.search_calls} (at most {self.max_search_calls})',
+            f'Metadata calls: {self.metadata_calls}',
+            f'Image list calls: {self.images_calls}',
+            f'Lookup table calls: {self.lookup_calls}',
+            f'Estimated API calls: {self.total_calls}'
+        ]
+        if self.allowance is None:
+            lines.append('Remaining allowance: unknown')
+        else:
+            lines.append(f'Remaining allowance: {self.allowance}')
+            if not self.fits_allowance():
+                lines.append(f'Only about {len(self.roms_within_allowance())} ROMs fit in the allowance.')
+        return '\n'.join(lines)
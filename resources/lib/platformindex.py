@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Precomputed index between AKL platforms and TGDB platform IDs.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Read only index from AKL platforms to TGDB platform IDs and back, built once from the
+# AKL compact name to TGDB ID mapping and the AKL platform list.
+# Both directions are plain dictionary lookups.
+#
+# * AKL platforms without a TGDB ID of their own use the ID of the platform they are an alias
+#   of. Unknown platforms use the default ID, which means any platform in TGDB.
+# * Several AKL platforms can share a TGDB ID, like MS-DOS and Windows. The first platform
+#   listed in the mapping is the primary platform of the ID and is returned for TGDB results.
+#   All the platforms of an ID, aliases included, are in its group.
+# * Searches of an AKL platform use the TGDB IDs of the platform and of its alias family: the
+#   platform it is an alias of and the other aliases of that platform.
+# * TGDB IDs without an AKL platform resolve to the unknown platform.
+# ------------------------------------------------------------------------------------------------
+class PlatformIndex(object):
+
+    def __init__(self, compact_to_tgdb: dict, akl_platforms: list, unknown_platform, default_tgdb_id: int = 0):
+        self.unknown_platform = unknown_platform
+        self.default_tgdb_id = default_tgdb_id
+        by_compact = {platform.compact_name: platform for platform in akl_platforms}
+
+        groups = {}
+        for compact_name, tgdb_id in compact_to_tgdb.items():
+            if compact_name not in by_compact:
+                logger.debug(f'PlatformIndex: no AKL platform "{compact_name}" for TGDB ID {tgdb_id}')
+                continue
+            groups.setdefault(tgdb_id, []).append(by_compact[compact_name])
+
+        long_name_to_tgdb = {}
+        for platform in akl_platforms:
+            if platform.compact_name in compact_to_tgdb:
+                tgdb_id = compact_to_tgdb[platform.compact_name]
+            elif platform.aliasof is not None and platform.aliasof in compact_to_tgdb:
+                tgdb_id = compact_to_tgdb[platform.aliasof]
+                if platform.aliasof in by_compact:
+                    groups[tgdb_id].append(platform)
+            else:
+                continue
+            long_name_to_tgdb[platform.long_name] = tgdb_id
+
+        aliases = {}
+        for platform in akl_platforms:
+            if platform.aliasof is not None:
+                aliases.setdefault(platform.aliasof, []).append(platform.compact_name)
+        long_name_to_tgdb_ids = {}
+        for platform in akl_platforms:
+            if platform.long_name not in long_name_to_tgdb:
+                continue
+            parent = platform.aliasof or platform.compact_name
+            family = [platform.compact_name, parent] + aliases.get(parent, [])
+            tgdb_ids = [long_name_to_tgdb[platform.long_name]]
+            tgdb_ids.extend(compact_to_tgdb[compact_name] for compact_name in family if compact_name in compact_to_tgdb)
+            long_name_to_tgdb_ids[platform.long_name] = tuple(dict.fromkeys(tgdb_ids))
+
+        self._long_name_to_tgdb = MappingProxyType(long_name_to_tgdb)
+        self._long_name_to_tgdb_ids = MappingProxyType(long_name_to_tgdb_ids)
+        self._tgdb_to_group = MappingProxyType({tgdb_id: tuple(group) for tgdb_id, group in groups.items()})
+        self._tgdb_to_platform = MappingProxyType({tgdb_id: group[0] for tgdb_id, group in groups.items()})
+
+    # TGDB platform ID of the AKL platform, by its long name.
+    def get_tgdb_id(self, platform_long_name: str) -> int:
+        return self._long_name_to_tgdb.get(platform_long_name, self.default_tgdb_id)
+
+    # TGDB platform IDs to search for the AKL platform, its own ID first. Empty for platforms
+    # without TGDB ID, which are searched on any platform.
+    def get_tgdb_ids(self, platform_long_name: str) -> tuple:
+        return self._long_name_to_tgdb_ids.get(platform_long_name, ())
+
+    # Primary AKL platform of the TGDB platform ID.
+    def get_platform(self, tgdb_id: int):
+        return self._tgdb_to_platform.get(tgdb_id, self.unknown_platform)
+
+    # All the AKL platforms which share the TGDB platform ID, the primary platform first.
+    def get_platform_group(self, tgdb_id: int) -> tuple:
+        return self._tgdb_to_group.get(tgdb_id, ())
+
+    def __len__(self):
+        return len(self._long_name_to_tgdb)
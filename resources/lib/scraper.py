@@ -23,16 +23,37 @@ from __future__ import division
 
 import logging
 import json
+import os
 import re
+import threading
+import time
 
-from urllib.parse import quote_plus
+from functools import lru_cache
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote_plus, urlsplit
 
 # --- AKL packages ---
 from akl import constants, platforms, settings
-from akl.utils import io, net, kodi
+from akl.utils import io, kodi
 from akl.scrapers import Scraper
 from akl.api import ROMObj
 
+from resources.lib import capabilities
+from resources.lib.cachestore import CacheStore
+from resources.lib.capture import DebugCapture
+from resources.lib.downloads import AssetDownloader
+from resources.lib.httpcache import ResponseCache
+from resources.lib.lookup import CompactLookupTable
+from resources.lib.matching import TitleMatcher, normalize_title
+from resources.lib.metrics import ScrapeMetrics
+from resources.lib.mirror import TGDBMirror
+from resources.lib.planner import QuotaPlan
+from resources.lib.platformindex import PlatformIndex
+from resources.lib.searchterms import search_term_cascade
+from resources.lib.throttle import RateLimiter
+from resources.lib.transport import HTTPTransport
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,25 +67,8 @@ logger = logging.getLogger(__name__)
 # ------------------------------------------------------------------------------------------------
 class TheGamesDB(Scraper):
     # --- Class variables ------------------------------------------------------------------------
-    supported_metadata_list = [
-        constants.META_TITLE_ID,
-        constants.META_YEAR_ID,
-        constants.META_GENRE_ID,
-        constants.META_DEVELOPER_ID,
-        constants.META_NPLAYERS_ID,
-        constants.META_ESRB_ID,
-        constants.META_PLOT_ID,
-        constants.META_TAGS_ID
-    ]
-    supported_asset_list = [
-        constants.ASSET_FANART_ID,
-        constants.ASSET_BANNER_ID,
-        constants.ASSET_CLEARLOGO_ID,
-        constants.ASSET_SNAP_ID,
-        constants.ASSET_BOXFRONT_ID,
-        constants.ASSET_BOXBACK_ID,
-        constants.ASSET_TRAILER_ID
-    ]
+    supported_metadata_list = capabilities.SUPPORTED_METADATA_LIST
+    supported_asset_list = capabilities.SUPPORTED_ASSET_LIST
     asset_name_mapping = {
         'screenshot': constants.ASSET_SNAP_ID,
         'boxart': constants.ASSET_BOXFRONT_ID,
@@ -76,19 +80,93 @@ class TheGamesDB(Scraper):
         'titlescreen': constants.ASSET_TITLE_ID
     }
     # This allows to change the API version easily.
-    URL_ByGameName = 'https://api.thegamesdb.net/v1/Games/ByGameName'
-    URL_ByGameID = 'https://api.thegamesdb.net/v1/Games/ByGameID'
-    URL_Platforms = 'https://api.thegamesdb.net/v1/Platforms'
-    URL_Genres = 'https://api.thegamesdb.net/v1/Genres'
-    URL_Developers = 'https://api.thegamesdb.net/v1/Developers'
-    URL_Publishers = 'https://api.thegamesdb.net/v1/Publishers'
-    URL_Images = 'https://api.thegamesdb.net/v1/Games/Images'
-
+    # Use set_API_URL() to redirect all the requests to another server, like a test server.
+    URL_API = 'https://api.thegamesdb.net/v1'
+    URL_ByGameName = URL_API + '/Games/ByGameName'
+    URL_ByGameID = URL_API + '/Games/ByGameID'
+    URL_Platforms = URL_API + '/Platforms'
+    URL_Genres = URL_API + '/Genres'
+    URL_Developers = URL_API + '/Developers'
+    URL_Publishers = URL_API + '/Publishers'
+    URL_Images = URL_API + '/Games/Images'
+    URL_Updates = URL_API + '/Games/Updates'
+
+    # Maximum number of game IDs requested in a single ByGameID call. TGDB returns ByGameID
+    # results in pages of 20 games, so larger batches only add pages.next round trips.
+    METADATA_BATCH_SIZE = 20
+    # Maximum number of game IDs requested in a single Games/Images call.
+    IMAGES_BATCH_SIZE = 20
+    # The offline mirror only has the box art of the games.
+    MIRROR_ASSET_IDS = [constants.ASSET_BOXFRONT_ID, constants.ASSET_BOXBACK_ID]
+
+    # Request rate shared by all the threads of this scraper (requests per second and burst size).
+    REQUESTS_PER_SECOND = 5
+    REQUESTS_BURST = 5
+    DEFAULT_SEARCH_WORKERS = 4
+    # Maximum number of ByGameName pages loaded for a single search.
+    MAX_SEARCH_PAGES = 10
+    # Minimum title confidence of the best candidate to stop the search term cascade.
+    CONFIDENT_MATCH = 0.8
+
+    # Genres and developers used to be cached as JSON in the global cache. They are now stored
+    # as compact lookup tables and the global caches are only read to migrate them.
     GLOBAL_CACHE_TGDB_GENRES = 'TGDB_genres'
     GLOBAL_CACHE_TGDB_DEVELOPERS = 'TGDB_developers'
 
+    # Time to live in seconds of the cached responses of every endpoint. Endpoints are matched
+    # on the URL path because the pages.next URLs do not include the API version.
+    RESPONSE_CACHE_TTLS = [
+        ('/Games/ByGameName', 24 * 3600),
+        ('/Games/ByGameID', 14 * 24 * 3600),
+        ('/Games/Images', 14 * 24 * 3600),
+        ('/Genres', 90 * 24 * 3600),
+        ('/Developers', 30 * 24 * 3600),
+        ('/Publishers', 30 * 24 * 3600),
+        ('/Platforms', 90 * 24 * 3600)
+    ]
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    RESPONSE_CACHE_FILENAME = 'TGDB_responses.db'
+    IMAGE_STORE_DIRNAME = 'TGDB_images'
+    IMAGE_STORE_MAX_BYTES = 256 * 1024 * 1024
+    GAME_CACHE_FILENAME = 'TGDB_games.db'
+    # ROM disk caches stored in a single file instead of the cache files of the base class.
+    DISK_CACHE_FILENAME = 'TGDB_cache.db'
+    STORED_CACHE_TYPES = [Scraper.CACHE_METADATA, Scraper.CACHE_INTERNAL]
+    # Pending ROM cache entries written in one transaction.
+    DISK_CACHE_BATCH_SIZE = 500
+    # Maximum number of keys remembered in the session sets of indexed ROMs and legacy cache
+    # misses. The sets only save lookups, so they are cleared when full to bound long batches.
+    SESSION_KEYS_MAX_ENTRIES = 10000
+    GAME_CACHE_METADATA = 'game_metadata'
+    GAME_CACHE_ASSETS = 'game_assets'
+    # Searches without any result, keyed by normalized search term and TGDB platform.
+    GAME_CACHE_NO_RESULTS = 'search_no_results'
+    DEFAULT_NEGATIVE_CACHE_DAYS = 7
+    CAPTURE_DIRNAME = 'TGDB_capture'
+    DEFAULT_CAPTURE_SAMPLE_PERCENT = 10
+    DEFAULT_CAPTURE_MAX_MB = 20
+    # ROM cache keys and candidates of every TGDB game, keyed by game ID, to find the ROMs of
+    # the games updated on TGDB.
+    GAME_CACHE_ROMS = 'game_roms'
+    # ROM disk cache entries of updated games, keyed by "<cache type>/<ROM cache key>".
+    GAME_CACHE_STALE = 'stale_entries'
+    GAME_CACHE_REFRESH = 'refresh_state'
+    # Maximum number of Games/Updates pages read in a single refresh. The next refresh
+    # continues after the last edit read.
+    MAX_UPDATE_PAGES = 10
+    # Edits of the last minutes read by the first refresh, when no edit was read before.
+    FIRST_REFRESH_MINUTES = 7 * 24 * 60
+
+    # Last allowance reported by TGDB, used to plan batches before spending quota.
+    GLOBAL_CACHE_TGDB_ALLOWANCE = 'TGDB_allowance'
+
+    LOOKUP_TGDB_GENRES = 'TGDB_genres'
+    LOOKUP_TGDB_DEVELOPERS = 'TGDB_developers'
+    LOOKUP_TGDB_PUBLISHERS = 'TGDB_publishers'
+
     # --- Constructor ----------------------------------------------------------------------------
-    def __init__(self):
+    # cache_dir overrides the cache directory setting, for scrapes outside Kodi.
+    def __init__(self, cache_dir: io.FileName = None):
         # --- This scraper settings ---
         # Make sure this is the public key (limited by IP) and not the private key.
         self.api_public_key = '828be1fb8f3182d055f1aed1f7d4da8bd4ebc160c3260eae8ee57ea823b42415'
@@ -99,6 +177,22 @@ class TheGamesDB(Scraper):
             logger.info('Applied embedded public API key')
         else:
             logger.info('Applied API key from settings')
+
+        self.search_workers = get_setting_as_int('search_workers', TheGamesDB.DEFAULT_SEARCH_WORKERS)
+        # Requests per endpoint and cache hits per cache tier of this run.
+        self.metrics = ScrapeMetrics()
+        self.disk_cache_lock = threading.RLock()
+        self.rate_limiter = RateLimiter(TheGamesDB.REQUESTS_PER_SECOND, TheGamesDB.REQUESTS_BURST)
+        # Keep-alive connections to the TGDB API and CDN, at most one per search worker.
+        self.transport = HTTPTransport(self.search_workers)
+
+        # --- Offline mirror of the TGDB database dump ---
+        # Games found in the mirror are scraped without any API call.
+        self.mirror = None
+        mirror_db_path = settings.getSetting('mirror_db_path')
+        if mirror_db_path and os.path.isfile(mirror_db_path):
+            self.mirror = TGDBMirror(mirror_db_path)
+            logger.info(f'Using offline TGDB mirror "{mirror_db_path}"')
             
         # --- Cached TGDB metadata ---
         self.cache_candidates = {}
@@ -106,17 +200,113 @@ class TheGamesDB(Scraper):
         self.cache_assets = {}
         self.all_asset_cache = {}
 
-        self.genres_cached = {}
-        self.developers_cached = {}
-        self.publishers_cached = {}
-
-        cache_dir = settings.getSettingAsFilePath('scraper_cache_dir')
+        # Lookup tables for genres, developers and publishers. Loaded on first use.
+        # Every table is loaded under its own lock, so concurrent scrapes retrieve it once.
+        self.lookup_tables = {}
+        self.lookup_table_locks = {
+            table_name: threading.Lock() for table_name in
+            [TheGamesDB.LOOKUP_TGDB_GENRES, TheGamesDB.LOOKUP_TGDB_DEVELOPERS, TheGamesDB.LOOKUP_TGDB_PUBLISHERS]
+        }
+
+        if cache_dir is None:
+            cache_dir = settings.getSettingAsFilePath('scraper_cache_dir')
+        self.cache_dir_path = cache_dir.getPath() if cache_dir else None
+
+        # --- Cache of TGDB responses keyed by URL ---
+        # Responses are shared by all ROMs, unlike the per-ROM disk caches.
+        response_cache_path = ':memory:'
+        if self.cache_dir_path and os.path.isdir(self.cache_dir_path):
+            response_cache_path = os.path.join(self.cache_dir_path, TheGamesDB.RESPONSE_CACHE_FILENAME)
+        self.response_cache = ResponseCache(response_cache_path, TheGamesDB.RESPONSE_CACHE_MAX_BYTES)
+
+        # --- Cache of metadata and assets per TGDB game ---
+        game_cache_path = ':memory:'
+        if self.cache_dir_path and os.path.isdir(self.cache_dir_path):
+            game_cache_path = os.path.join(self.cache_dir_path, TheGamesDB.GAME_CACHE_FILENAME)
+        self.game_cache = CacheStore(game_cache_path)
+        # (cache type, ROM cache key) of the disk cache entries of games updated on TGDB.
+        # These entries are treated as missing until they are retrieved again.
+        self.stale_entries = set(
+            tuple(key.split('/', 1)) for key in self.game_cache.keys(TheGamesDB.GAME_CACHE_STALE))
+        # (game ID, ROM cache key) already in the game ROMs index in this session.
+        self.indexed_roms = set()
+
+        # --- ROM metadata and asset list caches ---
+        # Writes are buffered and stored in batches by flush_disk_cache().
+        disk_cache_path = ':memory:'
+        if self.cache_dir_path and os.path.isdir(self.cache_dir_path):
+            disk_cache_path = os.path.join(self.cache_dir_path, TheGamesDB.DISK_CACHE_FILENAME)
+        self.disk_cache_store = CacheStore(disk_cache_path)
+        self.disk_cache_writes = {}
+        self.last_disk_cache_read = None
+        # Entries not found in the cache files of the base class in this session.
+        self.legacy_cache_misses = set()
+        self.disk_cache_stats = {
+            'migrated': 0,
+            'batches': 0,
+            'entries_written': 0
+        }
+
+        # --- Cache of searches without results ---
+        # Unmatched homebrew and hacks are not searched again until the entry expires.
+        # Zero days disables the cache.
+        self.negative_cache_days = get_setting_as_int(
+            'negative_cache_days', TheGamesDB.DEFAULT_NEGATIVE_CACHE_DAYS, minimum=0)
+        self.search_stats_lock = threading.Lock()
+        self.search_stats = {
+            'online_searches': 0,
+            'negative_cache_hits': 0,
+            'negative_cache_stored': 0
+        }
+
+        # --- Content addressed image store ---
+        # Without a cache directory images are downloaded straight to the asset paths.
+        self.asset_downloader = None
+        if self.cache_dir_path and os.path.isdir(self.cache_dir_path):
+            image_store_dir = os.path.join(self.cache_dir_path, TheGamesDB.IMAGE_STORE_DIRNAME)
+            self.asset_downloader = AssetDownloader(
+                self.transport, image_store_dir, self.search_workers, TheGamesDB.IMAGE_STORE_MAX_BYTES)
         
-        self.GLOBAL_CACHE_LIST.append(self.GLOBAL_CACHE_TGDB_GENRES)
-        self.GLOBAL_CACHE_LIST.append(self.GLOBAL_CACHE_TGDB_DEVELOPERS)
+        # --- Debug capture of TGDB responses ---
+        # Replaces the JSON debug dumps of the base class, which write every response
+        # synchronously and keep only the last one.
+        self.debug_capture = None
+        if get_setting_as_bool('debug_capture', False):
+            capture_dir = self.cache_dir_path if self.cache_dir_path and os.path.isdir(self.cache_dir_path) \
+                else kodi.getAddonDir().getPath()
+            sample_percent = get_setting_as_int('debug_capture_sample_percent', TheGamesDB.DEFAULT_CAPTURE_SAMPLE_PERCENT)
+            max_mb = get_setting_as_int('debug_capture_max_mb', TheGamesDB.DEFAULT_CAPTURE_MAX_MB)
+            self.debug_capture = DebugCapture(
+                os.path.join(capture_dir, TheGamesDB.CAPTURE_DIRNAME), min(sample_percent, 100) / 100, max_mb * 1024 * 1024)
+            logger.info(f'Capturing {sample_percent}% of the TGDB responses in "{self.debug_capture.capture_dir}"')
+
+        # GLOBAL_CACHE_LIST is shared by all the scraper instances. Register the caches once.
+        for global_cache_name in [self.GLOBAL_CACHE_TGDB_GENRES,
+                                  self.GLOBAL_CACHE_TGDB_DEVELOPERS,
+                                  self.GLOBAL_CACHE_TGDB_ALLOWANCE]:
+            if global_cache_name not in self.GLOBAL_CACHE_LIST:
+                self.GLOBAL_CACHE_LIST.append(global_cache_name)
+        # Total allowance reported in the last TGDB response of this session.
+        self.last_allowance = None
                 
         super(TheGamesDB, self).__init__(cache_dir)
     
+    # Redirect the TGDB API URLs to api_url, for example 'http://127.0.0.1:8080/v1'.
+    # Image URLs are not changed here because TGDB returns them in every Games/Images response.
+    @classmethod
+    def set_API_URL(cls, api_url: str):
+        api_url = api_url.rstrip('/')
+        logger.info(f'Using TGDB API at "{api_url}"')
+        cls.URL_API = api_url
+        cls.URL_ByGameName = api_url + '/Games/ByGameName'
+        cls.URL_ByGameID = api_url + '/Games/ByGameID'
+        cls.URL_Platforms = api_url + '/Platforms'
+        cls.URL_Genres = api_url + '/Genres'
+        cls.URL_Developers = api_url + '/Developers'
+        cls.URL_Publishers = api_url + '/Publishers'
+        cls.URL_Images = api_url + '/Games/Images'
+        cls.URL_Updates = api_url + '/Games/Updates'
+
     # --- Base class abstract methods ------------------------------------------------------------
     def get_name(self):
         return 'TheGamesDB'
@@ -156,91 +346,374 @@ class TheGamesDB(Scraper):
 
         # Prepare data for scraping.
         # --- Get candidates ---
-        scraper_platform = convert_AKL_platform_to_TheGamesDB(platform)
+        scraper_platforms = convert_AKL_platform_to_TheGamesDB_IDs(platform)
         logger.debug('search_term         "{}"'.format(search_term))
         logger.debug('rom identifier      "{}"'.format(rom.get_identifier()))
         logger.debug('AKL platform        "{}"'.format(platform))
-        logger.debug('TheGamesDB platform "{}"'.format(scraper_platform))
-        candidate_list = self._search_candidates(search_term, platform, scraper_platform, status_dic)
-        if not status_dic['status']:
+        logger.debug('TheGamesDB platform "{}"'.format(format_platform_filter(scraper_platforms)))
+
+        # --- Search with progressively looser search terms ---
+        # Candidates are always scored against the first (cleaned) search term, so a looser
+        # search term like the main title without subtitle does not make a wrong game look
+        # like an exact match. Stop at the first confident candidate.
+        search_terms = search_term_cascade(search_term)
+        match_term = search_terms[0]
+        best_candidate_list = []
+        for cascade_term in search_terms:
+            logger.debug('Searching with search term "{}"'.format(cascade_term))
+            candidate_list = self._search_candidates(
+                cascade_term, platform, scraper_platforms, status_dic, match_term)
+            if not status_dic['status']:
+                return None
+            if not candidate_list:
+                continue
+            if not best_candidate_list or candidate_list[0]['order'] > best_candidate_list[0]['order']:
+                best_candidate_list = candidate_list
+            if candidate_list[0]['confidence'] >= TheGamesDB.CONFIDENT_MATCH:
+                break
+
+        return best_candidate_list
+
+    # Estimate the TGDB API calls needed to scrape a batch of ROMs, taking into account what
+    # is already in the disk caches and the offline mirror. Planning only reads the caches, the
+    # current candidate and the game cache are left untouched.
+    # ROMs without candidate are searched with every term of the search term cascade not known
+    # to return nothing. Each term is expected to cost one page and at most MAX_SEARCH_PAGES.
+    # Returns a QuotaPlan with the last allowance seen.
+    def plan_batch(self, roms: list, scrape_metadata: bool, scrape_assets: bool) -> QuotaPlan:
+        plan = QuotaPlan(self.get_last_allowance(), TheGamesDB.METADATA_BATCH_SIZE, TheGamesDB.IMAGES_BATCH_SIZE)
+        for rom in roms:
+            identifier = rom.get_identifier()
+            platform = rom.get_platform()
+            candidate = None
+            if self.check_candidates_cache(identifier, platform):
+                candidate = self.retrieve_from_candidates_cache(identifier, platform)
+                if not candidate:
+                    # Cached as not found. This ROM will not be scraped.
+                    plan.add_rom(rom, 0, None, False, False, skipped=True)
+                    continue
+
+            if candidate:
+                cache_key = self._get_candidate_cache_key(identifier, platform, candidate)
+                in_mirror = self.mirror is not None and self.mirror.get_game(candidate['id']) is not None
+                needs_metadata = scrape_metadata and not in_mirror and \
+                    not self._check_disk_cache(Scraper.CACHE_METADATA, cache_key) and \
+                    not self._check_game_cache(TheGamesDB.GAME_CACHE_METADATA, candidate)
+                needs_images = scrape_assets and \
+                    not self._check_disk_cache(Scraper.CACHE_INTERNAL, cache_key) and \
+                    not self._check_game_cache(TheGamesDB.GAME_CACHE_ASSETS, candidate)
+                plan.add_rom(rom, 0, str(candidate['id']), needs_metadata, needs_images)
+                continue
+
+            game_key = f'{platform}/{identifier}'
+            scraper_platforms = convert_AKL_platform_to_TheGamesDB_IDs(platform)
+            search_terms = search_term_cascade(identifier)
+            if self.mirror is not None and any(self.mirror.search(term, scraper_platforms) for term in search_terms):
+                plan.add_rom(rom, 0, game_key, False, scrape_assets)
+                continue
+            search_terms = [term for term in search_terms if not self._check_negative_cache(term, scraper_platforms)]
+            if not search_terms:
+                # Every search is known to return nothing. This ROM will not be scraped.
+                plan.add_rom(rom, 0, None, False, False, skipped=True)
+                continue
+            plan.add_rom(rom, len(search_terms), game_key, scrape_metadata, scrape_assets,
+                         len(search_terms) * TheGamesDB.MAX_SEARCH_PAGES)
+
+        if scrape_metadata:
+            for table_name, global_cache_name in [
+                    (TheGamesDB.LOOKUP_TGDB_GENRES, TheGamesDB.GLOBAL_CACHE_TGDB_GENRES),
+                    (TheGamesDB.LOOKUP_TGDB_DEVELOPERS, TheGamesDB.GLOBAL_CACHE_TGDB_DEVELOPERS)]:
+                table_path = self._get_lookup_table_path(table_name)
+                if table_name in self.lookup_tables or (table_path and os.path.isfile(table_path)):
+                    continue
+                if self._check_global_cache(global_cache_name):
+                    continue
+                plan.add_lookup_table()
+
+        logger.debug(f'Batch plan: {plan.total_calls} API calls, allowance {plan.allowance}')
+        return plan
+
+    # Last total allowance reported by TGDB, in this session or in a previous one.
+    # Returns None if unknown.
+    def get_last_allowance(self):
+        if self.last_allowance is not None:
+            return self.last_allowance
+        if self._check_global_cache(TheGamesDB.GLOBAL_CACHE_TGDB_ALLOWANCE):
+            return self._retrieve_global_cache(TheGamesDB.GLOBAL_CACHE_TGDB_ALLOWANCE)['allowance']
+        return None
+
+    # Remember the last allowance for the next sessions before writing the caches.
+    def flush_disk_cache(self, *args, **kwargs):
+        with self.disk_cache_lock:
+            if self.last_allowance is not None:
+                self._update_global_cache(TheGamesDB.GLOBAL_CACHE_TGDB_ALLOWANCE, {'allowance': self.last_allowance})
+            self._write_disk_cache_batch()
+            if self.debug_capture is not None:
+                self.debug_capture.flush()
+            return super(TheGamesDB, self).flush_disk_cache(*args, **kwargs)
+
+    # Give the space of replaced ROM cache entries back, for maintenance runs.
+    def compact_disk_cache(self):
+        with self.disk_cache_lock:
+            self._write_disk_cache_batch()
+            self.disk_cache_store.compact()
+
+    # The disk caches of the base class are not thread safe. Worker threads of the concurrent
+    # searches and the async engine share them, so all access goes through disk_cache_lock.
+    # The metadata and internal asset list caches are stored in disk_cache_store instead of
+    # the cache files of the base class.
+    def _check_disk_cache(self, cache_type, cache_key):
+        with self.disk_cache_lock:
+            if (cache_type, cache_key) in self.stale_entries:
+                return False
+            return self._has_disk_cache_entry(cache_type, cache_key)
+
+    def _retrieve_from_disk_cache(self, cache_type, cache_key):
+        with self.disk_cache_lock:
+            if cache_type not in TheGamesDB.STORED_CACHE_TYPES:
+                return super(TheGamesDB, self)._retrieve_from_disk_cache(cache_type, cache_key)
+            return self._read_stored_disk_cache(cache_type, cache_key)
+
+    def _update_disk_cache(self, cache_type, cache_key, data):
+        with self.disk_cache_lock:
+            if cache_type not in TheGamesDB.STORED_CACHE_TYPES:
+                super(TheGamesDB, self)._update_disk_cache(cache_type, cache_key, data)
+            else:
+                self.disk_cache_writes[(cache_type, cache_key)] = data
+                self.last_disk_cache_read = ((cache_type, cache_key), data)
+                if len(self.disk_cache_writes) >= TheGamesDB.DISK_CACHE_BATCH_SIZE:
+                    self._write_disk_cache_batch()
+            if (cache_type, cache_key) in self.stale_entries:
+                self.stale_entries.discard((cache_type, cache_key))
+                self.game_cache.delete(TheGamesDB.GAME_CACHE_STALE, f'{cache_type}/{cache_key}')
+
+    # Also true for stale entries.
+    def _has_disk_cache_entry(self, cache_type, cache_key) -> bool:
+        if cache_type not in TheGamesDB.STORED_CACHE_TYPES:
+            return super(TheGamesDB, self)._check_disk_cache(cache_type, cache_key)
+        return self._read_stored_disk_cache(cache_type, cache_key) is not None
+
+    # Looks in the pending writes, the last entry read and the store, in this order. Entries
+    # missing in the store are looked up once in the cache files of the base class and
+    # migrated to the store when found.
+    # Returns None if the entry is not cached.
+    def _read_stored_disk_cache(self, cache_type, cache_key):
+        entry = (cache_type, cache_key)
+        if entry in self.disk_cache_writes:
+            return self.disk_cache_writes[entry]
+        # _check_disk_cache() is followed by _retrieve_from_disk_cache() of the same entry.
+        if self.last_disk_cache_read is not None and self.last_disk_cache_read[0] == entry:
+            return self.last_disk_cache_read[1]
+        data = self.disk_cache_store.get(cache_type, cache_key)
+        if data is None and entry not in self.legacy_cache_misses:
+            data = self._migrate_legacy_disk_cache(cache_type, cache_key)
+        if data is not None:
+            self.last_disk_cache_read = (entry, data)
+        return data
+
+    def _migrate_legacy_disk_cache(self, cache_type, cache_key):
+        if not super(TheGamesDB, self)._check_disk_cache(cache_type, cache_key):
+            self._remember_session_key(self.legacy_cache_misses, (cache_type, cache_key))
             return None
-
-        # --- Deactivate this for now ---
-        # if len(candidate_list) == 0:
-        #     altered_search_term = self._cleanup_searchterm(search_term, rombase_noext, platform)
-        #     logger.debug('Cleaning search term. Before "{0}"'.format(search_term))
-        #     logger.debug('After "{0}"'.format(altered_search_term))
-        #     if altered_search_term != search_term:
-        #         logger.debug('No matches, trying again with altered search terms: {0}'.format(
-        #             altered_search_term))
-        #         return self._get_candidates(altered_search_term, rombase_noext, platform)
-
-        return candidate_list
+        logger.debug(f'Migrating {cache_type} cache entry "{cache_key}" to the cache store')
+        data = super(TheGamesDB, self)._retrieve_from_disk_cache(cache_type, cache_key)
+        self.disk_cache_writes[(cache_type, cache_key)] = data
+        self.disk_cache_stats['migrated'] += 1
+        return data
+
+    # Write the pending ROM cache entries in one transaction per cache type.
+    def _write_disk_cache_batch(self):
+        if not self.disk_cache_writes:
+            return
+        for cache_type in TheGamesDB.STORED_CACHE_TYPES:
+            items = [(cache_key, data) for (entry_type, cache_key), data in self.disk_cache_writes.items()
+                     if entry_type == cache_type]
+            if items:
+                self.disk_cache_store.put_many(cache_type, items)
+        self.disk_cache_stats['batches'] += 1
+        self.disk_cache_stats['entries_written'] += len(self.disk_cache_writes)
+        self.disk_cache_writes = {}
+
+    def get_disk_cache_stats(self) -> dict:
+        with self.disk_cache_lock:
+            return dict(self.disk_cache_stats)
+
+    # Remember the ROMs of every TGDB game, so refresh_from_updates() finds the ROMs of the
+    # updated games.
+    def set_candidate(self, rom_identifier, platform, candidate):
+        with self.disk_cache_lock:
+            super(TheGamesDB, self).set_candidate(rom_identifier, platform, candidate)
+            if candidate:
+                self._index_game_rom(self.cache_key, candidate)
+
+    # Disk cache key of a ROM and candidate, without changing the current candidate and cache
+    # key or indexing the ROM in the game cache.
+    def _get_candidate_cache_key(self, identifier: str, platform: str, candidate) -> str:
+        with self.disk_cache_lock:
+            current_candidate, current_cache_key = self.candidate, self.cache_key
+            try:
+                super(TheGamesDB, self).set_candidate(identifier, platform, candidate)
+                return self.cache_key
+            finally:
+                self.candidate, self.cache_key = current_candidate, current_cache_key
+
+    # Set the candidate of a ROM and return its disk cache key. The current candidate and cache
+    # key are shared by all threads, so they are only read while holding the lock.
+    def resolve_candidate(self, identifier: str, platform: str, candidate) -> str:
+        with self.disk_cache_lock:
+            self.set_candidate(identifier, platform, candidate)
+            return self.cache_key
+
+    # Concurrent version of get_candidates() for multi-ROM scrapes.
+    # search_jobs is a list of (search_term, rom, platform) tuples. The searches run on a bounded
+    # pool of worker threads which share the scraper rate limiter and scraper_disabled flag.
+    # If any worker detects overloading all the other workers stop before their next request.
+    #
+    # Returns a list with the result of get_candidates() for each job, in the same order as
+    # search_jobs. status_dic receives the first error found by any of the workers.
+    def get_candidates_concurrently(self, search_jobs: list, status_dic) -> list:
+        def search_job(job):
+            search_term, rom, platform = job
+            worker_status_dic = kodi.new_status_dic('Search was OK')
+            candidate_list = self.get_candidates(search_term, rom, platform, worker_status_dic)
+            return candidate_list, worker_status_dic
+
+        logger.debug(f'Searching {len(search_jobs)} candidates with {self.search_workers} workers')
+        with ThreadPoolExecutor(max_workers=self.search_workers) as executor:
+            results = list(executor.map(search_job, search_jobs))
+
+        candidate_lists = []
+        for candidate_list, worker_status_dic in results:
+            if not worker_status_dic['status'] and status_dic['status']:
+                status_dic.update(worker_status_dic)
+            candidate_lists.append(candidate_list)
+        return candidate_lists
     
     # This function may be called many times in the ROM Scanner. All calls to this function
     # must be cached. See comments for this function in the Scraper abstract class.
     def get_metadata(self, status_dic):
+        return self.get_metadata_for(self.candidate, self.cache_key, status_dic)
+
+    # Metadata of the candidate of the ROM with disk cache key cache_key. Does not use the
+    # current candidate set with set_candidate(), so it can be called from several threads.
+    def get_metadata_for(self, candidate, cache_key: str, status_dic):
         # --- If scraper is disabled return immediately and silently ---
         if self.scraper_disabled:
             logger.debug('Scraper disabled. Returning empty data.')
             return self._new_gamedata_dic()
 
         # --- Check if search term is in the cache ---
-        if self._check_disk_cache(Scraper.CACHE_METADATA, self.cache_key):
-            logger.debug(f'Metadata cache hit "{self.cache_key}"')
-            return self._retrieve_from_disk_cache(Scraper.CACHE_METADATA, self.cache_key)
+        if self._check_disk_cache(Scraper.CACHE_METADATA, cache_key):
+            logger.debug(f'Metadata cache hit "{cache_key}"')
+            self.metrics.record_cache('metadata', True)
+            return self._retrieve_from_disk_cache(Scraper.CACHE_METADATA, cache_key)
+        self.metrics.record_cache('metadata', False)
+
+        # --- Check if the game is in the cache of another ROM ---
+        if self._check_game_cache(TheGamesDB.GAME_CACHE_METADATA, candidate):
+            logger.debug(f'Game metadata cache hit "{self._get_game_cache_key(candidate)}"')
+            self.metrics.record_cache('game_metadata', True)
+            gamedata = self._retrieve_from_game_cache(TheGamesDB.GAME_CACHE_METADATA, candidate)
+            self._update_disk_cache(Scraper.CACHE_METADATA, cache_key, gamedata)
+            return gamedata
+        self.metrics.record_cache('game_metadata', False)
 
         # --- Request is not cached. Get candidates and introduce in the cache ---
-        logger.debug(f'Metadata cache miss "{self.cache_key}"')
-        fields = ['players', 'genres', 'overview', 'rating', 'coop',
-                  'youtube', 'hdd', 'video', 'sound']
-        fields_concat = '%2C'.join(fields)
-        id = self.candidate['id']
-        url_tail = f'?apikey={self._get_API_key()}&id={id}&fields={fields_concat}'
-        url = TheGamesDB.URL_ByGameID + url_tail
-        json_data = self._retrieve_URL_as_JSON(url, status_dic)
-        if not status_dic['status']:
-            return None
-        self._dump_json_debug('TGDB_get_metadata.json', json_data)
+        logger.debug(f'Metadata cache miss "{cache_key}"')
+        online_data = self.mirror.get_game(candidate['id']) if self.mirror else None
+        if online_data is None:
+            url = self._get_metadata_URL([candidate['id']])
+            json_data = self._retrieve_URL_as_JSON(url, status_dic)
+            if not status_dic['status']:
+                return None
+            self._dump_json_debug('TGDB_get_metadata.json', json_data)
+            online_data = json_data['data']['games'][0]
 
         # --- Parse game page data ---
         logger.debug('Parsing game metadata...')
-        online_data = json_data['data']['games'][0]
-        gamedata = self._new_gamedata_dic()
-        gamedata['title'] = self._parse_metadata_title(online_data)
-        gamedata['year'] = self._parse_metadata_year(online_data)
-        gamedata['genre'] = self._parse_metadata_genres(online_data, status_dic)
+        gamedata = self._parse_metadata(online_data, status_dic)
         if not status_dic['status']:
             return None
-        gamedata['developer'] = self._parse_metadata_developer(online_data, status_dic)
-        if not status_dic['status']:
-            return None
-        gamedata['nplayers'] = self._parse_metadata_nplayers(online_data)
-        gamedata['esrb'] = self._parse_metadata_esrb(online_data)
-        gamedata['plot'] = self._parse_metadata_plot(online_data)
-        gamedata['tags'] = self._parse_metadata_tags(online_data)
-        gamedata['trailer'] = self._parse_metadata_trailer(online_data)
 
         # --- Put metadata in the cache ---
-        logger.debug(f'Adding to metadata cache "{self.cache_key}"')
-        self._update_disk_cache(Scraper.CACHE_METADATA, self.cache_key, gamedata)
+        logger.debug(f'Adding to metadata cache "{cache_key}"')
+        self._update_disk_cache(Scraper.CACHE_METADATA, cache_key, gamedata)
+        self._update_game_cache(TheGamesDB.GAME_CACHE_METADATA, candidate, gamedata)
 
         logger.debug(f"Available metadata for the current scraped title: {json.dumps(gamedata)}")
         return gamedata
- 
+
+    # Retrieve the metadata of many candidates with as few ByGameID requests as possible.
+    # candidates is a dictionary of cache keys to candidate dictionaries, usually collected
+    # before a multi-ROM scrape. Cache keys already in the metadata cache are skipped and the
+    # parsed gamedata goes straight into the metadata disk cache, so the get_metadata() calls
+    # done later by the ScrapeStrategy are all cache hits.
+    #
+    # Returns the number of cache keys that were added to the metadata cache.
+    def prefetch_metadata(self, candidates: dict, status_dic) -> int:
+        if self.scraper_disabled:
+            logger.debug('Scraper disabled. Skipping metadata prefetch.')
+            return 0
+
+        # Several ROMs may resolve to the same TGDB game. Request every game only once.
+        pending_keys, pending_candidates, num_cached = self._group_pending_candidates(
+            candidates, Scraper.CACHE_METADATA, TheGamesDB.GAME_CACHE_METADATA)
+
+        for game_id in list(pending_keys.keys()):
+            candidate = pending_candidates[game_id]
+            online_data = self.mirror.get_game(game_id) if self.mirror else None
+            if online_data is None:
+                continue
+            gamedata = self._parse_metadata(online_data, status_dic)
+            if not status_dic['status']:
+                return num_cached
+            num_cached += self._store_game_data(
+                Scraper.CACHE_METADATA, TheGamesDB.GAME_CACHE_METADATA,
+                pending_keys.pop(game_id), candidate, gamedata)
+
+        game_ids = list(pending_keys.keys())
+        logger.debug(f'Prefetching metadata for {len(game_ids)} games')
+        for batch_start in range(0, len(game_ids), TheGamesDB.METADATA_BATCH_SIZE):
+            batch_ids = game_ids[batch_start:batch_start + TheGamesDB.METADATA_BATCH_SIZE]
+            url = self._get_metadata_URL(batch_ids)
+            for json_data in self._iter_pages(url, status_dic):
+                self._dump_json_debug('TGDB_get_metadata.json', json_data)
+
+                for online_data in json_data['data']['games']:
+                    game_id = str(online_data['id'])
+                    if game_id not in pending_keys:
+                        continue
+                    gamedata = self._parse_metadata(online_data, status_dic)
+                    if not status_dic['status']:
+                        return num_cached
+                    num_cached += self._store_game_data(
+                        Scraper.CACHE_METADATA, TheGamesDB.GAME_CACHE_METADATA,
+                        pending_keys.pop(game_id), pending_candidates[game_id], gamedata)
+            if not status_dic['status']:
+                return num_cached
+
+        if pending_keys:
+            logger.debug(f'No metadata returned for game IDs {", ".join(pending_keys.keys())}')
+        return num_cached
+
     # This function may be called many times in the ROM Scanner. All calls to this function
     # must be cached. See comments for this function in the Scraper abstract class.
     def get_assets(self, asset_info_id: str, status_dic):
+        return self.get_assets_for(self.candidate, self.cache_key, asset_info_id, status_dic)
+
+    # Assets of type asset_info_id of the candidate of the ROM with disk cache key cache_key.
+    # Like get_metadata_for() it does not use the current candidate.
+    def get_assets_for(self, candidate, cache_key: str, asset_info_id: str, status_dic):
         # --- If scraper is disabled return immediately and silently ---
         if self.scraper_disabled:
             logger.debug('Scraper disabled. Returning empty data.')
             return []
 
-        candidate_id = self.candidate['id']
+        candidate_id = candidate['id']
         logger.debug(f'Getting assets {asset_info_id} for candidate ID "{candidate_id}"')
 
         if asset_info_id == constants.ASSET_TRAILER_ID:
-            gamedata = self.get_metadata(status_dic)
+            gamedata = self.get_metadata_for(candidate, cache_key, status_dic)
             if gamedata and 'trailer' in gamedata and gamedata['trailer']:
                 logger.debug("Found trailer asset")
                 asset_data = self._new_assetdata_dic()
@@ -250,10 +723,21 @@ class TheGamesDB(Scraper):
                 asset_data['url'] = gamedata['trailer']
                 return [asset_data]
 
+        # --- Box art of the offline mirror ---
+        # The mirror list is not complete, so it is used for box art only and never cached.
+        if asset_info_id in TheGamesDB.MIRROR_ASSET_IDS and self.mirror is not None:
+            mirror_page_data = self.mirror.get_images_page(candidate_id)
+            if mirror_page_data is not None:
+                asset_list = [asset_dic for asset_dic in self._parse_assets(mirror_page_data, candidate_id)
+                              if asset_dic['asset_ID'] == asset_info_id]
+                if asset_list:
+                    logger.debug(f'Found {len(asset_list)} assets in offline mirror')
+                    return asset_list
+
         # --- Request is not cached. Get candidates and introduce in the cache ---
         # Get all assets for candidate. _scraper_get_assets_all() caches all assets for a
         # candidate. Then select asset of a particular type.
-        all_asset_list = self._retrieve_all_assets(self.candidate, status_dic)
+        all_asset_list = self._retrieve_all_assets(candidate, cache_key, status_dic)
         if not status_dic['status']:
             return None
         asset_list = [asset_dic for asset_dic in all_asset_list if asset_dic['asset_ID'] == asset_info_id]
@@ -294,86 +778,251 @@ class TheGamesDB(Scraper):
 
         return json_data
 
+    # Images are downloaded with the pooled transport, reusing the connections to the TGDB CDN.
+    # Images prefetched into the image store by a multi-ROM scrape are copied from the store.
+    # Any other image is written directly to the asset path.
     def download_image(self, image_url, image_local_path: io.FileName):
         if "plugin.video.youtube" in image_url:
             return image_url
-        return super(TheGamesDB, self).download_image(image_url, image_local_path)
+
+        store_path = self.asset_downloader.get_stored_path(image_url) if self.asset_downloader else None
+        if store_path is not None:
+            try:
+                self.asset_downloader.copy_to(store_path, image_local_path.getPath())
+                return image_local_path
+            except OSError as ex:
+                logger.warning(f'Cannot copy stored image "{store_path}". Downloading it.', exc_info=ex)
+
+        url_log = self._clean_URL_for_log(image_url)
+        image_data, http_code = self.transport.get_bytes(image_url, url_log)
+        if http_code != 200 or not image_data:
+            logger.error(f'Failed downloading image "{url_log}" (HTTP code {http_code})')
+            return None
+        image_local_path.writeAll(image_data, 'wb')
+        return image_local_path
+
+    def get_transport_stats(self) -> dict:
+        return self.transport.get_stats()
+
+    def get_response_cache_stats(self) -> dict:
+        return self.response_cache.get_stats()
+
+    def get_search_stats(self) -> dict:
+        with self.search_stats_lock:
+            return dict(self.search_stats)
+
+    # Report of this run: requests per endpoint, cache tiers and the statistics of the
+    # transport, response cache, image downloads and searches.
+    def get_scrape_report(self) -> dict:
+        report = self.metrics.get_report()
+        report['transport'] = self.get_transport_stats()
+        report['response_cache'] = self.get_response_cache_stats()
+        report['downloads'] = self.get_download_stats()
+        report['search'] = self.get_search_stats()
+        report['disk_cache'] = self.get_disk_cache_stats()
+        report['debug_capture'] = self.get_capture_stats()
+        return report
+
+    def describe_scrape_report(self) -> str:
+        return self.metrics.describe()
 
     # Always use the developer public key which is limited per IP address. This function
     # may return the private key during scraper development for debugging purposes.
     def _get_API_key(self):
         return self.api_key
 
+    # ids is a list of TGDB game IDs. ByGameID accepts a comma separated list of IDs.
+    def _get_metadata_URL(self, ids: list) -> str:
+        fields = ['players', 'genres', 'overview', 'rating', 'coop',
+                  'youtube', 'hdd', 'video', 'sound']
+        fields_concat = '%2C'.join(fields)
+        ids_concat = '%2C'.join([str(id) for id in ids])
+        url_tail = f'?apikey={self._get_API_key()}&id={ids_concat}&fields={fields_concat}'
+        return TheGamesDB.URL_ByGameID + url_tail
+
     # --- Retrieve list of games ---
-    def _search_candidates(self, search_term: str, platform: str, scraper_platform: int, status_dic):
+    # Candidates are scored against match_term, or against search_term if not set.
+    # scraper_platforms are the TGDB IDs of the AKL platform and its aliases, which are searched
+    # in a single request. No IDs means any platform.
+    def _search_candidates(self, search_term: str, platform: str, scraper_platforms: tuple, status_dic,
+                           match_term: str = None):
+        match_term = match_term or search_term
+        # --- Search the offline mirror first ---
+        # Only games missing in the mirror are searched online.
+        if self.mirror is not None:
+            games_json = self.mirror.search(search_term, scraper_platforms)
+            self.metrics.record_cache('mirror_search', bool(games_json))
+            if games_json:
+                logger.debug(f'Found {len(games_json)} titles in offline mirror')
+                candidate_list = self._parse_candidates(games_json, match_term, platform, scraper_platforms)
+                candidate_list.sort(key=lambda result: result['order'], reverse=True)
+                return candidate_list
+
+        # --- Searches known to return nothing ---
+        platform_filter = format_platform_filter(scraper_platforms)
+        if self._check_negative_cache(search_term, scraper_platforms):
+            logger.debug(f'Negative search cache hit "{search_term}" platform {platform_filter}')
+            self._count_search_stat('negative_cache_hits')
+            self.metrics.record_cache('negative_search', True)
+            return []
+        if self.negative_cache_days > 0:
+            self.metrics.record_cache('negative_search', False)
+
         # quote_plus() will convert the spaces into '+'. Note that quote_plus() requires an
         # UTF-8 encoded string and does not work with Unicode strings.
         # https://stackoverflow.com/questions/22415345/using-pythons-urllib-quote-plus-on-utf-8-strings-with-safe-arguments
         search_string_encoded = quote_plus(search_term)
         url_tail = '?apikey={}&name={}&filter[platform]={}'.format(
-            self._get_API_key(), search_string_encoded, scraper_platform)
+            self._get_API_key(), search_string_encoded, quote_plus(platform_filter))
         url = TheGamesDB.URL_ByGameName + url_tail
         # _retrieve_games_from_url() may load files recursively from several pages so this code
         # must be in a separate function.
+        self._count_search_stat('online_searches')
         candidate_list = self._retrieve_games_from_url(
-            url, search_term, platform, scraper_platform, status_dic)
+            url, match_term, platform, scraper_platforms, status_dic)
         if not status_dic['status']:
             return None
+        if len(candidate_list) == 0:
+            self._update_negative_cache(search_term, scraper_platforms)
 
         # --- Sort game list based on the score. High scored candidates go first ---
         candidate_list.sort(key=lambda result: result['order'], reverse=True)
 
         return candidate_list
 
+    # --- Negative search cache ---
+    # Keyed like the platform filter, so single platform keys did not change with the alias search.
+    def _get_negative_cache_key(self, search_term: str, scraper_platforms: tuple) -> str:
+        return '{}/{}'.format(format_platform_filter(scraper_platforms), normalize_title(search_term))
+
+    def _check_negative_cache(self, search_term: str, scraper_platforms: tuple) -> bool:
+        if self.negative_cache_days <= 0:
+            return False
+        return self.game_cache.contains(
+            TheGamesDB.GAME_CACHE_NO_RESULTS, self._get_negative_cache_key(search_term, scraper_platforms),
+            max_age=self.negative_cache_days * 24 * 3600)
+
+    def _update_negative_cache(self, search_term: str, scraper_platforms: tuple):
+        if self.negative_cache_days <= 0:
+            return
+        logger.debug('Adding to negative search cache "{}" platform {}'.format(
+            search_term, format_platform_filter(scraper_platforms)))
+        self.game_cache.put(
+            TheGamesDB.GAME_CACHE_NO_RESULTS, self._get_negative_cache_key(search_term, scraper_platforms), [])
+        self._count_search_stat('negative_cache_stored')
+
+    def _count_search_stat(self, name: str):
+        with self.search_stats_lock:
+            self.search_stats[name] += 1
+
     # Return a list of candiate games.
     # Return None if error/exception.
     # Return empty list if no candidates found.
-    def _retrieve_games_from_url(self, url, search_term: str, platform: str, scraper_platform: int, status_dic):
-        # --- Get URL data as JSON ---
-        json_data = self._retrieve_URL_as_JSON(url, status_dic)
+    #
+    # Pages are loaded one after another until pages.next is empty, MAX_SEARCH_PAGES pages
+    # were loaded or a page contains an exact title match on one of the requested platforms.
+    # Pages after an exact match would never be picked, so they are not loaded.
+    def _retrieve_games_from_url(self, url, search_term: str, platform: str, scraper_platforms: tuple, status_dic):
+        def exact_match_found(candidates):
+            return any(
+                candidate['confidence'] == 1.0 and candidate['scraper_platform'] in scraper_platforms
+                for candidate in candidates)
+
+        candidate_list = []
+        for candidates in self._iter_candidate_pages(url, search_term, platform, scraper_platforms, status_dic):
+            candidate_list.extend(candidates)
+            if exact_match_found(candidates):
+                logger.debug('Exact match found. Not loading more game pages.')
+                break
         # If status_dic mark an error there was an exception. Return None.
         if not status_dic['status']:
             return None
-        # If no games were found status_dic['status'] is True and json_data is None.
-        # Return empty list of candidates.
-        self._dump_json_debug('TGDB_get_candidates.json', json_data)
 
-        # --- Parse game list ---
-        games_json = json_data['data']['games']
+        return candidate_list
+
+    # Generator of the candidates in each page of a ByGameName search.
+    def _iter_candidate_pages(self, url, search_term: str, platform: str, scraper_platforms: tuple, status_dic):
+        pages = self._iter_pages(url, status_dic, TheGamesDB.MAX_SEARCH_PAGES)
+        for json_data in pages:
+            self._dump_json_debug('TGDB_get_candidates.json', json_data)
+            # --- Parse game list ---
+            candidates = self._parse_candidates(json_data['data']['games'], search_term, platform, scraper_platforms)
+            logger.debug(f'TheGamesDB:: Found {len(candidates)} titles with last request')
+            yield candidates
+
+    # Generator of the JSON data of all the pages of a TGDB response, following pages.next.
+    # Stops after max_pages pages if max_pages is set. On errors status_dic is marked and the
+    # generator stops.
+    def _iter_pages(self, url, status_dic, max_pages: int = None):
+        num_pages = 0
+        while url is not None:
+            json_data = self._retrieve_URL_as_JSON(url, status_dic)
+            if not status_dic['status']:
+                return
+            yield json_data
+
+            num_pages += 1
+            if max_pages is not None and num_pages >= max_pages:
+                logger.debug(f'Loaded maximum number of {max_pages} pages')
+                return
+            url = self._get_next_page_URL(json_data)
+            if url is not None:
+                logger.debug('Loading next page')
+
+    # Cached responses have no API key in their pages.next URL. It is added back here.
+    def _get_next_page_URL(self, json_data):
+        url = json_data['pages']['next'] if 'pages' in json_data else None
+        if url is None or 'apikey=' in url:
+            return url
+        return '{}{}apikey={}'.format(url, '&' if '?' in url else '?', self._get_API_key())
+
+    # Convert a list of games, as in the ByGameName data.games list, into candidates.
+    # Candidates are scored with the fuzzy title matcher. candidate['confidence'] is the title
+    # similarity between 0.0 and 1.0 and candidate['order'] adds a bonus for the platform.
+    def _parse_candidates(self, games_json: list, search_term: str, platform: str, scraper_platforms: tuple) -> list:
+        title_matcher = TitleMatcher(search_term)
+        platform_index = get_platform_index()
         candidate_list = []
         for item in games_json:
             title = item['game_title']
-            scraped_akl_platform = convert_TheGamesDB_platform_to_AKL_platform(item['platform'])
+            scraped_akl_platform = platform_index.get_platform(item['platform'])
             
             candidate = self._new_candidate_dic()
             candidate['id'] = item['id']
             candidate['display_name'] = '{} ({})'.format(title, scraped_akl_platform.long_name)
             candidate['platform'] = platform
-            # Candidate platform may be different from scraper_platform if scraper_platform = 0
+            # Candidate platform may be different from scraper_platforms if no platform is filtered
             # Always trust TGDB API about the platform of the returned candidates.
             candidate['scraper_platform'] = item['platform']
-            candidate['order'] = 1
             # Increase search score based on our own search.
-            if title.lower() == search_term.lower():
-                candidate['order'] += 2
-            if title.lower().find(search_term.lower()) != -1:
-                candidate['order'] += 1
-            if scraper_platform > 0 and platform == scraped_akl_platform.long_name:
+            candidate['confidence'] = title_matcher.score(title)
+            candidate['order'] = 1 + 3 * candidate['confidence']
+            # Compared by TGDB ID, so aliases and platforms sharing an ID get the bonus too.
+            if item['platform'] in scraper_platforms:
                 candidate['order'] += 1
             candidate_list.append(candidate)
 
-        logger.debug(f'TheGamesDB:: Found {len(candidate_list)} titles with last request')
-        # --- Recursively load more games ---
-        next_url = json_data['pages']['next']
-        if next_url is not None:
-            logger.debug('Recursively loading game page')
-            candidate_list = candidate_list + self._retrieve_games_from_url(
-                next_url, search_term, platform, scraper_platform, status_dic)
-            if not status_dic['status']:
-                return None
-
         return candidate_list
 
+    # Parse the JSON data of a single game returned by ByGameID into a gamedata dictionary.
+    # Returns None if genres or developers could not be retrieved.
+    def _parse_metadata(self, online_data, status_dic):
+        gamedata = self._new_gamedata_dic()
+        gamedata['title'] = self._parse_metadata_title(online_data)
+        gamedata['year'] = self._parse_metadata_year(online_data)
+        gamedata['genre'] = self._parse_metadata_genres(online_data, status_dic)
+        if not status_dic['status']:
+            return None
+        gamedata['developer'] = self._parse_metadata_developer(online_data, status_dic)
+        if not status_dic['status']:
+            return None
+        gamedata['nplayers'] = self._parse_metadata_nplayers(online_data)
+        gamedata['esrb'] = self._parse_metadata_esrb(online_data)
+        gamedata['plot'] = self._parse_metadata_plot(online_data)
+        gamedata['tags'] = self._parse_metadata_tags(online_data)
+        gamedata['trailer'] = self._parse_metadata_trailer(online_data)
+        return gamedata
+
     # Search for the game title.
     # "noms" : [
     #     { "text" : "Super Mario World", "region" : "ss" },
@@ -405,13 +1054,10 @@ class TheGamesDB(Scraper):
         # For some games genre_ids is None. In that case return an empty string (default DB value).
         if not genre_ids:
             return constants.DEFAULT_META_GENRE
-        # Convert integers to strings because the cached genres dictionary keys are strings.
-        # This is because a JSON limitation.
-        genre_ids = [str(id) for id in genre_ids]
         TGDB_genres = self._retrieve_genres(status_dic)
         if not status_dic['status']:
             return None
-        genre_list = [TGDB_genres[genre_id] for genre_id in genre_ids]
+        genre_list = [TGDB_genres[genre_id] for genre_id in genre_ids if genre_id in TGDB_genres]
         return ', '.join(genre_list)
 
     def _parse_metadata_developer(self, online_data, status_dic):
@@ -422,13 +1068,10 @@ class TheGamesDB(Scraper):
         # For some games developers_ids is None. In that case return an empty string (default DB value).
         if not developers_ids:
             return constants.DEFAULT_META_DEVELOPER
-        # Convert integers to strings because the cached genres dictionary keys are strings.
-        # This is because a JSON limitation.
-        developers_ids = [str(id) for id in developers_ids]
         TGDB_developers = self._retrieve_developers(status_dic)
         if not status_dic['status']:
             return None
-        developer_list = [TGDB_developers[dev_id] for dev_id in developers_ids]
+        developer_list = [TGDB_developers[dev_id] for dev_id in developers_ids if dev_id in TGDB_developers]
 
         return ', '.join(developer_list)
 
@@ -491,87 +1134,100 @@ class TheGamesDB(Scraper):
             return None
         return f'plugin://plugin.video.youtube/play/?video_id={trailer_id}'
 
-    # Get a dictionary of TGDB genres (integers) to AKL genres (strings).
-    # TGDB genres are cached in an object variable.
+    # Get a lookup table of TGDB genres (integers) to AKL genres (strings).
     def _retrieve_genres(self, status_dic):
-        # --- Cache hit ---
-        if self._check_global_cache(TheGamesDB.GLOBAL_CACHE_TGDB_GENRES):
-            logger.debug('Genres global cache hit.')
-            return self._retrieve_global_cache(TheGamesDB.GLOBAL_CACHE_TGDB_GENRES)
-
-        # --- Cache miss. Retrieve data ---
-        logger.debug('Genres global cache miss. Retrieving genres...')
-        url = TheGamesDB.URL_Genres + '?apikey={}'.format(self._get_API_key())
-        page_data = self._retrieve_URL_as_JSON(url, status_dic)
-        if not status_dic['status']:
-            return None
-        self._dump_json_debug('TGDB_get_genres.json', page_data)
-
-        # --- Update cache ---
-        genres = {}
-        # Keep genres dictionary keys as strings and not integers. Otherwise, Python json
-        # module will conver the integers to strings.
-        # https://stackoverflow.com/questions/1450957/pythons-json-module-converts-int-dictionary-keys-to-strings/34346202
-        for genre_id in page_data['data']['genres']:
-            genres[genre_id] = page_data['data']['genres'][genre_id]['name']
-        logger.debug('TheGamesDB._retrieve_genres() There are {} genres'.format(len(genres)))
-        self._update_global_cache(TheGamesDB.GLOBAL_CACHE_TGDB_GENRES, genres)
-
-        return genres
+        return self._retrieve_lookup_table(
+            TheGamesDB.LOOKUP_TGDB_GENRES, TheGamesDB.URL_Genres, 'genres',
+            TheGamesDB.GLOBAL_CACHE_TGDB_GENRES, status_dic)
 
     def _retrieve_developers(self, status_dic):
-        # --- Cache hit ---
-        if self._check_global_cache(TheGamesDB.GLOBAL_CACHE_TGDB_DEVELOPERS):
-            logger.debug('TheGamesDB._retrieve_developers() Genres global cache hit.')
-            return self._retrieve_global_cache(TheGamesDB.GLOBAL_CACHE_TGDB_DEVELOPERS)
-
-        # --- Cache miss. Retrieve data ---
-        logger.debug('TheGamesDB._retrieve_developers() Developers global cache miss. Retrieving developers...')
-        url = TheGamesDB.URL_Developers + '?apikey={}'.format(self._get_API_key())
-        page_data = self._retrieve_URL_as_JSON(url, status_dic)
-        if not status_dic['status']:
-            return None
-        self._dump_json_debug('TGDB_get_developers.json', page_data)
-
-        # --- Update cache ---
-        developers = {}
-        for developer_id in page_data['data']['developers']:
-            developers[developer_id] = page_data['data']['developers'][developer_id]['name']
-        logger.debug('TheGamesDB._retrieve_developers() There are {} developers'.format(len(developers)))
-        self._update_global_cache(TheGamesDB.GLOBAL_CACHE_TGDB_DEVELOPERS, developers)
-
-        return developers
+        return self._retrieve_lookup_table(
+            TheGamesDB.LOOKUP_TGDB_DEVELOPERS, TheGamesDB.URL_Developers, 'developers',
+            TheGamesDB.GLOBAL_CACHE_TGDB_DEVELOPERS, status_dic)
 
     # Publishers is not used in AKL at the moment.
-    # THIS FUNCTION CODE MUST BE UPDATED.
-    def _retrieve_publishers(self, publisher_ids):
-        if publisher_ids is None:
-            return ''
-        if self.publishers is None:
-            logger.debug('TheGamesDB. No cached publishers. Retrieving from online.')
-            url = TheGamesDB.URL_Publishers + '?apikey={}'.format(self._get_API_key())
-            publishers_json, http_code = net.get_URL(url, self._clean_URL_for_log(url), content_type=net.ContentType.JSON)
-            if http_code != 200:
-                logger.warning("Failure retrieving publishers data.")
-                return ""
+    def _retrieve_publishers(self, status_dic):
+        return self._retrieve_lookup_table(
+            TheGamesDB.LOOKUP_TGDB_PUBLISHERS, TheGamesDB.URL_Publishers, 'publishers', None, status_dic)
+
+    # Get a CompactLookupTable of TGDB IDs to names.
+    # Tables are kept in memory, then looked up in the scraper cache directory, then migrated
+    # from the old JSON global cache and finally retrieved from TGDB.
+    # Returns None if error/exception.
+    def _retrieve_lookup_table(self, table_name: str, url: str, json_key: str, global_cache_name: str, status_dic):
+        # --- Memory hit ---
+        table = self.lookup_tables.get(table_name)
+        if table is not None:
+            return table
+        # Another thread may be loading the table. Wait for it and check again.
+        with self.lookup_table_locks[table_name]:
+            if table_name in self.lookup_tables:
+                return self.lookup_tables[table_name]
+            return self._load_lookup_table(table_name, url, json_key, global_cache_name, status_dic)
+
+    def _load_lookup_table(self, table_name: str, url: str, json_key: str, global_cache_name: str, status_dic):
+        # --- Disk hit ---
+        table_path = self._get_lookup_table_path(table_name)
+        if table_path and os.path.isfile(table_path):
+            try:
+                table = CompactLookupTable.load(table_path)
+                logger.debug(f'Lookup table {table_name} cache hit. There are {len(table)} entries')
+                self.lookup_tables[table_name] = table
+                return table
+            except (OSError, ValueError) as ex:
+                logger.warning(f'Invalid lookup table file "{table_path}". Retrieving again.', exc_info=ex)
+
+        # --- Migrate old global cache ---
+        if global_cache_name and self._check_global_cache(global_cache_name):
+            logger.debug(f'Lookup table {table_name} migrated from the global cache.')
+            mapping = self._retrieve_global_cache(global_cache_name)
+        else:
+            # --- Cache miss. Retrieve data ---
+            logger.debug(f'Lookup table {table_name} cache miss. Retrieving {json_key}...')
+            page_data = self._retrieve_URL_as_JSON(url + '?apikey={}'.format(self._get_API_key()), status_dic)
+            if not status_dic['status']:
+                return None
+            self._dump_json_debug(f'TGDB_get_{json_key}.json', page_data)
+            items = page_data['data'][json_key]
+            mapping = {item_id: items[item_id]['name'] for item_id in items}
 
-            self.publishers_cached = {}
-            for publisher_id in publishers_json['data']['publishers']:
-                self.publishers_cached[int(publisher_id)] = publishers_json['data']['publishers'][publisher_id]['name']
-        publisher_names = [self.publishers_cached[publisher_id] for publisher_id in publisher_ids]
+        # --- Update cache ---
+        table = CompactLookupTable.from_mapping(mapping)
+        logger.debug(f'Lookup table {table_name} has {len(table)} entries')
+        self.lookup_tables[table_name] = table
+        if table_path:
+            try:
+                CompactLookupTable.save(table_path, mapping)
+            except OSError as ex:
+                logger.warning(f'Cannot write lookup table file "{table_path}"', exc_info=ex)
+        return table
 
-        return ' / '.join(publisher_names)
+    def _get_lookup_table_path(self, table_name: str) -> str:
+        if not self.cache_dir_path:
+            return None
+        return os.path.join(self.cache_dir_path, f'{table_name}.tbl')
 
     # Get ALL available assets for game.
     # Cache all assets in the internal disk cache.
-    def _retrieve_all_assets(self, candidate, status_dic):
+    def _retrieve_all_assets(self, candidate, cache_key: str, status_dic):
         # --- Cache hit ---
-        if self._check_disk_cache(Scraper.CACHE_INTERNAL, self.cache_key):
-            logger.debug(f'Internal cache hit "{self.cache_key}"')
-            return self._retrieve_from_disk_cache(Scraper.CACHE_INTERNAL, self.cache_key)
+        if self._check_disk_cache(Scraper.CACHE_INTERNAL, cache_key):
+            logger.debug(f'Internal cache hit "{cache_key}"')
+            self.metrics.record_cache('assets', True)
+            return self._retrieve_from_disk_cache(Scraper.CACHE_INTERNAL, cache_key)
+        self.metrics.record_cache('assets', False)
+
+        # --- Check if the game is in the cache of another ROM ---
+        if self._check_game_cache(TheGamesDB.GAME_CACHE_ASSETS, candidate):
+            logger.debug(f'Game assets cache hit "{self._get_game_cache_key(candidate)}"')
+            self.metrics.record_cache('game_assets', True)
+            asset_list = self._retrieve_from_game_cache(TheGamesDB.GAME_CACHE_ASSETS, candidate)
+            self._update_disk_cache(Scraper.CACHE_INTERNAL, cache_key, asset_list)
+            return asset_list
+        self.metrics.record_cache('game_assets', False)
 
         # --- Cache miss. Retrieve data and update cache ---
-        logger.debug(f'Internal cache miss "{self.cache_key}"')
+        logger.debug(f'Internal cache miss "{cache_key}"')
         url_tail = '?apikey={}&games_id={}'.format(self._get_API_key(), candidate['id'])
         url = TheGamesDB.URL_Images + url_tail
         asset_list = self._retrieve_assets_from_url(url, candidate['id'], status_dic)
@@ -581,23 +1237,262 @@ class TheGamesDB(Scraper):
             len(asset_list), candidate['id']))
 
         # --- Put metadata in the cache ---
-        logger.debug(f'Adding to internal cache "{self.cache_key}"')
-        self._update_disk_cache(Scraper.CACHE_INTERNAL, self.cache_key, asset_list)
+        self._store_game_data(Scraper.CACHE_INTERNAL, TheGamesDB.GAME_CACHE_ASSETS,
+                              [cache_key], candidate, asset_list)
 
         return asset_list
 
     def _retrieve_assets_from_url(self, url, candidate_id, status_dic):
-        # --- Read URL JSON data ---
-        page_data = self._retrieve_URL_as_JSON(url, status_dic)
+        assets_list = []
+        for page_data in self._iter_pages(url, status_dic):
+            self._dump_json_debug('TGDB_get_assets.json', page_data)
+            # --- Parse images page data ---
+            assets_list.extend(self._parse_assets(page_data, candidate_id))
         if not status_dic['status']:
             return None
-        self._dump_json_debug('TGDB_get_assets.json', page_data)
 
-        # --- Parse images page data ---
+        return assets_list
+
+    # Retrieve the assets of many candidates with as few Games/Images requests as possible.
+    # candidates is a dictionary of cache keys to candidate dictionaries, like in
+    # prefetch_metadata(). Games/Images accepts a comma separated list of game IDs and returns
+    # the images keyed per game. The response is split per game and stored in the internal
+    # disk cache under every cache key, so later get_assets() calls are all cache hits.
+    #
+    # Returns the number of cache keys that were added to the internal cache.
+    def prefetch_assets(self, candidates: dict, status_dic) -> int:
+        if self.scraper_disabled:
+            logger.debug('Scraper disabled. Skipping assets prefetch.')
+            return 0
+
+        pending_keys, pending_candidates, num_cached = self._group_pending_candidates(
+            candidates, Scraper.CACHE_INTERNAL, TheGamesDB.GAME_CACHE_ASSETS)
+
+        game_ids = list(pending_keys.keys())
+        logger.debug(f'Prefetching assets for {len(game_ids)} games')
+        for batch_start in range(0, len(game_ids), TheGamesDB.IMAGES_BATCH_SIZE):
+            batch_ids = game_ids[batch_start:batch_start + TheGamesDB.IMAGES_BATCH_SIZE]
+            url_tail = '?apikey={}&games_id={}'.format(self._get_API_key(), '%2C'.join(batch_ids))
+            url = TheGamesDB.URL_Images + url_tail
+
+            # Images of a single game may be spread over several pages.
+            batch_assets = {game_id: [] for game_id in batch_ids}
+            for page_data in self._iter_pages(url, status_dic):
+                self._dump_json_debug('TGDB_get_assets.json', page_data)
+                for game_id in batch_ids:
+                    batch_assets[game_id].extend(self._parse_assets(page_data, game_id))
+            if not status_dic['status']:
+                return num_cached
+
+            for game_id, asset_list in batch_assets.items():
+                logger.debug('A total of {0} assets found for candidate ID {1}'.format(
+                    len(asset_list), game_id))
+                num_cached += self._store_game_data(
+                    Scraper.CACHE_INTERNAL, TheGamesDB.GAME_CACHE_ASSETS,
+                    pending_keys[game_id], pending_candidates[game_id], asset_list)
+
+        return num_cached
+
+    # --- Game cache tier ---
+    # Several ROMs (discs, regions, revisions) resolve to the same TGDB game. Metadata and
+    # asset lists are cached per ROM cache key and also per TGDB game, so every ROM resolves
+    # through the game cache before anything is requested.
+    def _get_game_cache_key(self, candidate) -> str:
+        return '{}/{}'.format(candidate.get('scraper_platform', DEFAULT_PLAT_TGDB), candidate['id'])
+
+    def _check_game_cache(self, game_cache_type: str, candidate) -> bool:
+        return self.game_cache.contains(game_cache_type, self._get_game_cache_key(candidate))
+
+    def _retrieve_from_game_cache(self, game_cache_type: str, candidate):
+        return self.game_cache.get(game_cache_type, self._get_game_cache_key(candidate))
+
+    def _update_game_cache(self, game_cache_type: str, candidate, data):
+        self.game_cache.put(game_cache_type, self._get_game_cache_key(candidate), data)
+
+    # Store data of a game in the game cache and in the disk cache of every ROM cache key.
+    # Returns the number of ROM cache keys updated.
+    def _store_game_data(self, cache_type: str, game_cache_type: str, cache_keys: list, candidate, data) -> int:
+        self._update_game_cache(game_cache_type, candidate, data)
+        for cache_key in cache_keys:
+            logger.debug(f'Adding to {cache_type} cache "{cache_key}"')
+            self._update_disk_cache(cache_type, cache_key, data)
+        return len(cache_keys)
+
+    # Group the candidates missing in a ROM disk cache by TGDB game ID. Games already in the
+    # game cache of game_cache_type are copied to the ROM disk caches instead.
+    # Returns a dictionary of game ID -> list of ROM cache keys, a dictionary of
+    # game ID -> candidate and the number of ROM cache keys copied from the game cache.
+    def _group_pending_candidates(self, candidates: dict, cache_type: str, game_cache_type: str):
+        pending_keys = {}
+        pending_candidates = {}
+        for cache_key, candidate in candidates.items():
+            if not candidate:
+                continue
+            if self._check_disk_cache(cache_type, cache_key):
+                continue
+            game_id = str(candidate['id'])
+            pending_keys.setdefault(game_id, []).append(cache_key)
+            pending_candidates[game_id] = candidate
+
+        num_cached = 0
+        for game_id in list(pending_keys.keys()):
+            candidate = pending_candidates[game_id]
+            if not self._check_game_cache(game_cache_type, candidate):
+                continue
+            data = self._retrieve_from_game_cache(game_cache_type, candidate)
+            for cache_key in pending_keys.pop(game_id):
+                logger.debug(f'Adding to {cache_type} cache "{cache_key}"')
+                self._update_disk_cache(cache_type, cache_key, data)
+                num_cached += 1
+        return pending_keys, pending_candidates, num_cached
+
+    def _remember_session_key(self, session_keys: set, key):
+        if len(session_keys) >= TheGamesDB.SESSION_KEYS_MAX_ENTRIES:
+            session_keys.clear()
+        session_keys.add(key)
+
+    def _index_game_rom(self, cache_key: str, candidate):
+        game_id = str(candidate['id'])
+        if (game_id, cache_key) in self.indexed_roms:
+            return
+        self._remember_session_key(self.indexed_roms, (game_id, cache_key))
+        game_roms = self.game_cache.get(TheGamesDB.GAME_CACHE_ROMS, game_id) or {}
+        if game_roms.get(cache_key) != candidate:
+            game_roms[cache_key] = candidate
+            self.game_cache.put(TheGamesDB.GAME_CACHE_ROMS, game_id, game_roms)
+
+    # --- Incremental refresh --------------------------------------------------------------------
+    # Read the TGDB Games/Updates feed after the last edit read and mark the cached metadata and
+    # asset lists of the updated games as stale, in the ROM disk caches, the game cache and the
+    # response cache. With refetch the stale data is retrieved again in batches, otherwise the
+    # next scrape of the ROMs retrieves it.
+    # Only games of ROMs scraped before are refreshed. Edits of other games cost nothing.
+    #
+    # Returns a dictionary of ROM cache keys -> candidates of the updated games, or None if the
+    # feed could not be read. The last edit read is only stored when the feed was read.
+    def refresh_from_updates(self, status_dic, refetch: bool = True) -> dict:
+        refresh_state = self.game_cache.get(TheGamesDB.GAME_CACHE_REFRESH, 'updates') or {}
+        last_edit_id = refresh_state.get('last_edit_id')
+        url = TheGamesDB.URL_Updates + '?apikey={}&last_edit_id={}'.format(self._get_API_key(), last_edit_id or 0)
+        if last_edit_id is None:
+            url += '&time={}'.format(TheGamesDB.FIRST_REFRESH_MINUTES)
+
+        updated_game_ids = set()
+        new_last_edit_id = last_edit_id or 0
+        for json_data in self._iter_pages(url, status_dic, TheGamesDB.MAX_UPDATE_PAGES):
+            for update in json_data['data']['updates']:
+                updated_game_ids.add(str(update['game_id']))
+                new_last_edit_id = max(new_last_edit_id, update['edit_id'])
+        if not status_dic['status']:
+            return None
+        logger.info(f'TGDB updates: {len(updated_game_ids)} games updated after edit {last_edit_id}')
+
+        stale_candidates = {}
+        stale_game_ids = set()
+        for game_id in updated_game_ids:
+            game_roms = self.game_cache.get(TheGamesDB.GAME_CACHE_ROMS, game_id)
+            if not game_roms:
+                continue
+            self._invalidate_game(game_roms)
+            stale_candidates.update(game_roms)
+            stale_game_ids.add(game_id)
+        self._invalidate_cached_responses(stale_game_ids)
+        logger.info(f'TGDB updates: {len(stale_game_ids)} cached games and {len(stale_candidates)} ROMs are stale')
+
+        if refetch and stale_candidates:
+            with self.disk_cache_lock:
+                stale_metadata = {cache_key: candidate for cache_key, candidate in stale_candidates.items()
+                                  if (Scraper.CACHE_METADATA, cache_key) in self.stale_entries}
+                stale_assets = {cache_key: candidate for cache_key, candidate in stale_candidates.items()
+                                if (Scraper.CACHE_INTERNAL, cache_key) in self.stale_entries}
+            if stale_metadata:
+                self.prefetch_metadata(stale_metadata, status_dic)
+            if stale_assets and status_dic['status']:
+                self.prefetch_assets(stale_assets, status_dic)
+            self.flush_disk_cache()
+
+        self.game_cache.put(TheGamesDB.GAME_CACHE_REFRESH, 'updates', {
+            'last_edit_id': new_last_edit_id,
+            'timestamp': time.time()
+        })
+        return stale_candidates
+
+    # Mark the cached data of a game as stale. game_roms is a dictionary of ROM cache keys ->
+    # candidates of the game.
+    def _invalidate_game(self, game_roms: dict):
+        with self.disk_cache_lock:
+            for cache_key in game_roms.keys():
+                for cache_type in [Scraper.CACHE_METADATA, Scraper.CACHE_INTERNAL]:
+                    if not self._has_disk_cache_entry(cache_type, cache_key):
+                        continue
+                    self.stale_entries.add((cache_type, cache_key))
+                    self.game_cache.put(TheGamesDB.GAME_CACHE_STALE, f'{cache_type}/{cache_key}', True)
+        for candidate in game_roms.values():
+            for game_cache_type in [TheGamesDB.GAME_CACHE_METADATA, TheGamesDB.GAME_CACHE_ASSETS]:
+                self.game_cache.delete(game_cache_type, self._get_game_cache_key(candidate))
+
+    # Drop the cached ByGameID and Games/Images responses which include any of the games.
+    def _invalidate_cached_responses(self, game_ids: set):
+        if not game_ids:
+            return
+        for endpoint, id_param in [('/Games/ByGameID?', 'id'), ('/Games/Images?', 'games_id')]:
+            for cache_key in self.response_cache.get_keys(endpoint):
+                response_ids = parse_qs(urlsplit(cache_key).query).get(id_param, [''])[0].split(',')
+                if game_ids.intersection(response_ids):
+                    self.response_cache.invalidate(cache_key)
+
+    # Download the images that will be selected for many candidates into the image store, on
+    # a bounded pool of workers. candidates is a dictionary of cache keys to candidates, like
+    # in prefetch_assets(), whose asset lists must be in the internal cache already. For every
+    # asset ID the first asset is downloaded, which is the one picked in automatic mode. The
+    # download_image() calls done later by the ScrapeStrategy only copy the stored files.
+    #
+    # Returns the number of images in the store.
+    def prefetch_images(self, candidates: dict, asset_IDs: list) -> int:
+        if self.asset_downloader is None:
+            logger.debug('No image store. Skipping images prefetch.')
+            return 0
+
+        for cache_key in candidates.keys():
+            if not self._check_disk_cache(Scraper.CACHE_INTERNAL, cache_key):
+                continue
+            asset_list = self._retrieve_from_disk_cache(Scraper.CACHE_INTERNAL, cache_key)
+            for asset_ID in asset_IDs:
+                if asset_ID == constants.ASSET_TRAILER_ID:
+                    continue
+                selected = next((asset for asset in asset_list if asset['asset_ID'] == asset_ID), None)
+                if selected is not None:
+                    self.asset_downloader.queue(selected['url'])
+
+        store_paths = self.asset_downloader.run()
+        return len([path for path in store_paths.values() if path is not None])
+
+    def get_download_stats(self) -> dict:
+        return self.asset_downloader.get_stats() if self.asset_downloader else {}
+
+    # With debug capture on, responses are sampled into the capture files by a background
+    # writer instead of being dumped by the base class.
+    def _dump_json_debug(self, file_name, data_dic):
+        if self.debug_capture is None:
+            return super(TheGamesDB, self)._dump_json_debug(file_name, data_dic)
+        self.debug_capture.capture(file_name, data_dic)
+
+    def get_capture_stats(self) -> dict:
+        return self.debug_capture.get_stats() if self.debug_capture else {}
+
+    # Write the captured responses still queued and close the capture file.
+    def close_debug_capture(self):
+        if self.debug_capture is not None:
+            self.debug_capture.close()
+            self.debug_capture = None
+
+    # Parse the images of a single game in a Games/Images page into a list of asset
+    # dictionaries. Games without images are not present in the page data.
+    def _parse_assets(self, page_data, candidate_id) -> list:
         base_url_thumb = page_data['data']['base_url']['thumb']
         base_url = page_data['data']['base_url']['original']
         assets_list = []
-        for image_data in page_data['data']['images'][str(candidate_id)]:
+        for image_data in page_data['data']['images'].get(str(candidate_id), []):
             asset_name = '{0} ID {1}'.format(image_data['type'], image_data['id'])
             if image_data['type'] == 'boxart':
                 if image_data['side'] == 'front':
@@ -618,15 +1513,9 @@ class TheGamesDB(Scraper):
             asset_data['url_thumb'] = base_url_thumb + asset_fname
             asset_data['url'] = base_url + asset_fname
             if self.verbose_flag:
-                logger.debug('TheGamesDB. Found Asset {}'.format(asset_data['name']))
+                logger.debug('TheGamesDB. Found Asset {}'.format(asset_data['display_name']))
             assets_list.append(asset_data)
 
-        # --- Recursively load more assets ---
-        next_url = page_data['pages']['next']
-        if next_url is not None:
-            logger.debug('TheGamesDB._retrieve_assets_from_url() Recursively loading assets page')
-            assets_list = assets_list + self._retrieve_assets_from_url(next_url, candidate_id)
-
         return assets_list
 
     # TGDB URLs are safe for printing, however the API key is too long.
@@ -648,7 +1537,33 @@ class TheGamesDB(Scraper):
     # * When the API number of calls is exhausted TGDB ...
     # * When a game search is not succesfull TGDB returns valid JSON with an empty list.
     def _retrieve_URL_as_JSON(self, url, status_dic):
-        json_data, http_code = net.get_URL(url, self._clean_URL_for_log(url), content_type=net.ContentType.JSON)
+        # --- Response cache hit ---
+        cache_key = self._get_response_cache_key(url)
+        cache_ttl = self._get_response_cache_TTL(url)
+        if cache_ttl:
+            cached_data = self.response_cache.get(cache_key, cache_ttl)
+            self.metrics.record_cache('responses', cached_data is not None)
+            if cached_data is not None:
+                logger.debug(f'Response cache hit "{cache_key}"')
+                return json.loads(cached_data.decode('utf-8'))
+
+        # Wait for our turn. All worker threads share the same rate limiter, which is stopped
+        # as soon as the scraper is overloaded.
+        if self.scraper_disabled or not self.rate_limiter.acquire():
+            status_dic['status'] = False
+            status_dic['msg'] = 'TGDB scraper disabled.'
+            return None
+
+        start_time = time.monotonic()
+        json_data, http_code = self.transport.get_JSON(url, self._clean_URL_for_log(url))
+        self.metrics.record_request(
+            self._get_endpoint(url), time.monotonic() - start_time, self.transport.get_last_bytes_received(),
+            http_code, self._get_total_allowance(json_data))
+
+        # --- Check network errors ---
+        if http_code is None:
+            self._handle_error(status_dic, 'TGDB: Network error retrieving URL')
+            return None
 
         # --- Check HTTP error codes ---
         if http_code != 200:
@@ -660,10 +1575,9 @@ class TheGamesDB(Scraper):
             self._handle_error(status_dic, 'HTTP code {} message "{}"'.format(http_code, error_msg))
             return None
 
-        # If json_data is None at this point is because of an exception in net_get_URL()
-        # which is not urllib2.HTTPError.
+        # If json_data is None at this point is because the response was not valid JSON.
         if json_data is None:
-            self._handle_error(status_dic, 'TGDB: Network error in net_get_URL()')
+            self._handle_error(status_dic, 'TGDB: Invalid JSON data received')
             return None
 
         # Check for scraper overloading. Scraper is disabled if overloaded.
@@ -672,8 +1586,47 @@ class TheGamesDB(Scraper):
         if not status_dic['status']:
             return None
 
+        # --- Update response cache ---
+        if cache_ttl:
+            self.response_cache.put(cache_key, self._encode_cached_response(json_data))
+
         return json_data
 
+    # TGDB endpoint of a URL without the API version, like "/Games/ByGameName".
+    # The pages.next URLs do not include the API version.
+    def _get_endpoint(self, url: str) -> str:
+        path = urlsplit(url).path
+        api_path = urlsplit(TheGamesDB.URL_API).path
+        return path[len(api_path):] if api_path and path.startswith(api_path) else path
+
+    # Total allowance reported in a TGDB response, or None if not reported.
+    def _get_total_allowance(self, json_data):
+        if not isinstance(json_data, dict) or 'remaining_monthly_allowance' not in json_data:
+            return None
+        return json_data['remaining_monthly_allowance'] + (json_data.get('extra_allowance') or 0)
+
+    # The API key is never written to the response cache. It is removed from the pages.next
+    # URL, like from the cache keys.
+    def _encode_cached_response(self, json_data) -> bytes:
+        pages = json_data.get('pages')
+        if isinstance(pages, dict) and pages.get('next'):
+            json_data = dict(json_data, pages=dict(pages, next=self._get_response_cache_key(pages['next'])))
+        return json.dumps(json_data).encode('utf-8')
+
+    # URL without the API key, so the cached responses survive API key changes.
+    def _get_response_cache_key(self, url):
+        clean_url = self._clean_URL_for_log(url)
+        clean_url = clean_url.replace('apikey=***&', '').replace('?apikey=***', '?').replace('&apikey=***', '')
+        return clean_url
+
+    # Returns the TTL of the URL endpoint or None if the endpoint responses are not cached.
+    def _get_response_cache_TTL(self, url):
+        path = urlsplit(url).path
+        for endpoint, ttl in TheGamesDB.RESPONSE_CACHE_TTLS:
+            if path.endswith(endpoint):
+                return ttl
+        return None
+
     # Checks if TDGB scraper is overloaded (maximum number of API requests exceeded).
     # If the scraper is overloaded is immediately disabled.
     #
@@ -689,46 +1642,81 @@ class TheGamesDB(Scraper):
         logger.debug('Threshold check: remaining_monthly_allowance = {}'.format(remaining_monthly_allowance))
         logger.debug('Threshold check: extra_allowance = {}'.format(extra_allowance))
         total_allowance = remaining_monthly_allowance + extra_allowance
+        self.rate_limiter.update_allowance(total_allowance)
+        self.last_allowance = total_allowance
         
         if total_allowance > 0:
             return
         logger.error('Threshold check: remaining total allowance <= 0')
         logger.error('Disabling TGDB scraper.')
         self.scraper_disabled = True
+        self.rate_limiter.stop()
         status_dic['status'] = False
         status_dic['dialog'] = kodi.KODI_MESSAGE_DIALOG
         status_dic['msg'] = f'TGDB monthly/total allowance is {total_allowance}. Scraper disabled.'
         
 
+# Settings which are not set (or not available outside Kodi) use the default value.
+def get_setting_as_bool(key: str, default: bool) -> bool:
+    value = settings.getSetting(key)
+    if value in [True, 'true', 'True', '1']:
+        return True
+    if value in [False, 'false', 'False', '0']:
+        return False
+    return default
+
+
+# Settings which are not set (or not available outside Kodi) or below minimum use the default value.
+def get_setting_as_int(key: str, default: int, minimum: int = 1) -> int:
+    value = settings.getSetting(key)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value >= minimum else default
+
+
 # ------------------------------------------------------------------------------------------------
 # TheGamesDB supported platforms mapped to AKL platforms.
 # ------------------------------------------------------------------------------------------------
 DEFAULT_PLAT_TGDB = 0
 
 
+# The index is built on first use and shared by all scraper instances.
+@lru_cache(maxsize=None)
+def get_platform_index() -> PlatformIndex:
+    return PlatformIndex(
+        AKL_compact_platform_TGDB_mapping, platforms.AKL_platforms,
+        platforms.get_AKL_platform_by_compact(platforms.PLATFORM_UNKNOWN_COMPACT), DEFAULT_PLAT_TGDB)
+
+
 # NOTE must take into account platform aliases.
 # '0' means any platform in TGDB and must be returned when there is no platform matching.
 def convert_AKL_platform_to_TheGamesDB(platform_long_name) -> int:
-    matching_platform = platforms.get_AKL_platform(platform_long_name)
-    if matching_platform.compact_name in AKL_compact_platform_TGDB_mapping:
-        return AKL_compact_platform_TGDB_mapping[matching_platform.compact_name]
-    
-    if matching_platform.aliasof is not None and matching_platform.aliasof in AKL_compact_platform_TGDB_mapping:
-        return AKL_compact_platform_TGDB_mapping[matching_platform.aliasof]
-        
-    # Platform not found.
-    return DEFAULT_PLAT_TGDB
+    return get_platform_index().get_tgdb_id(platform_long_name)
+
 
+# TGDB IDs of the AKL platform and its aliases, the ID of the platform itself first.
+# Empty when the platform is not found, which means any platform.
+def convert_AKL_platform_to_TheGamesDB_IDs(platform_long_name) -> tuple:
+    return get_platform_index().get_tgdb_ids(platform_long_name)
 
+
+# Comma separated value of filter[platform]. DEFAULT_PLAT_TGDB without platforms.
+def format_platform_filter(scraper_platforms: tuple) -> str:
+    if not scraper_platforms:
+        return str(DEFAULT_PLAT_TGDB)
+    return ','.join(str(scraper_platform) for scraper_platform in scraper_platforms)
+
+
+# Platforms sharing a TGDB ID resolve to the first one in AKL_compact_platform_TGDB_mapping.
 def convert_TheGamesDB_platform_to_AKL_platform(tgdb_platform: int) -> platforms.Platform:
-    if tgdb_platform in TGDB_AKL_compact_platform_mapping:
-        platform_compact_name = TGDB_AKL_compact_platform_mapping[tgdb_platform]
-        return platforms.get_AKL_platform_by_compact(platform_compact_name)
-        
-    return platforms.get_AKL_platform_by_compact(platforms.PLATFORM_UNKNOWN_COMPACT)
+    return get_platform_index().get_platform(tgdb_platform)
 
 
-AKL_compact_platform_TGDB_mapping = {
+# Platforms sharing a TGDB ID are listed with the primary platform first: msdos before windows,
+# n64 before n64dd, nds before ndsi, pce before sgx and msx before msx2.
+AKL_compact_platform_TGDB_mapping = MappingProxyType({
     '3do': 25,
     'cpc': 4914,
     'a2600': 22,
@@ -808,7 +1796,4 @@ AKL_compact_platform_TGDB_mapping = {
     'psvita': 39,
     'tigergame': 4940,
     'supervision': 4959
-}
-TGDB_AKL_compact_platform_mapping = {}
-for key, value in AKL_compact_platform_TGDB_mapping.items():
-    TGDB_AKL_compact_platform_mapping[value] = key
+})
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Cleanup of ROM names into TGDB search terms.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import re
+
+from resources.lib.matching import TAGS_REGEX
+
+# All the expressions are compiled once when the module is loaded.
+# "Sonic the Hedgehog.zip" -> "Sonic the Hedgehog". A space before the dot is not an extension,
+# like in "Dr. Mario", and extensions have at least one letter, unlike "v1.1".
+EXTENSION_REGEX = re.compile(r'(?<=\S)\.(?=[0-9]*[A-Za-z])[A-Za-z0-9]{1,4}$')
+# Disc and revision markers outside brackets: "Disc 1", "CD2", "Side B", "Rev A", "v1.1".
+DISC_REGEX = re.compile(r'\b(?:disc|disk|cd|side)(?:\s+|(?=\d))(?:\d+|[a-d])\b', re.IGNORECASE)
+REVISION_REGEX = re.compile(
+    r'\b(?:rev|revision)(?:\s+|(?=\d))[0-9a-z]{1,3}(?:\.\d+)*\b|\bv\d+(?:\.\d+)+\b', re.IGNORECASE)
+# Sort friendly titles: "Legend of Zelda, The - A Link to the Past"
+# -> "The Legend of Zelda - A Link to the Past".
+TRAILING_ARTICLE_REGEX = re.compile(r'^(.+?),\s*(the|a|an)((?:\s*:|\s+-\s).*)?$', re.IGNORECASE)
+LEADING_ARTICLE_REGEX = re.compile(r'^(?:the|a|an)\s+', re.IGNORECASE)
+# "Final Fantasy VII: Advent" or "Castlevania - Symphony of the Night".
+SUBTITLE_REGEX = re.compile(r'\s*(?::|\s-\s).*$')
+SEPARATORS_REGEX = re.compile(r'[_\s]+')
+DANGLING_REGEX = re.compile(r'^[\s,;:-]+|[\s,;:-]+$')
+
+
+# Search term without extension, tags, disc and revision markers.
+# "Final Fantasy VII (USA) (Disc 1).cue" -> "Final Fantasy VII"
+def clean_search_term(search_term: str) -> str:
+    term = EXTENSION_REGEX.sub('', search_term.strip())
+    term = TAGS_REGEX.sub(' ', term)
+    term = DISC_REGEX.sub(' ', term)
+    term = REVISION_REGEX.sub(' ', term)
+    term = DANGLING_REGEX.sub('', SEPARATORS_REGEX.sub(' ', term))
+    match = TRAILING_ARTICLE_REGEX.match(term)
+    if match:
+        term = '{} {}{}'.format(match.group(2), match.group(1), match.group(3) or '')
+    return term
+
+
+# Ordered list of search terms, from the strictest to the loosest:
+#   1. The cleaned search term.
+#   2. The cleaned search term without a leading article.
+#   3. The main title, without the subtitle.
+# Terms equal to a previous one are not repeated, so every term costs at most one search.
+def search_term_cascade(search_term: str) -> list:
+    cleaned = clean_search_term(search_term)
+    if not cleaned:
+        return [search_term]
+
+    without_article = LEADING_ARTICLE_REGEX.sub('', cleaned)
+    main_title = SUBTITLE_REGEX.sub('', without_article)
+
+    terms = []
+    for term in (cleaned, without_article, main_title):
+        if term and term.casefold() not in [known.casefold() for known in terms]:
+            terms.append(term)
+    return terms
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Request throttling shared by all the scraper worker threads.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Token bucket rate limiter, safe to share between threads.
+# Every API request takes one token. Tokens are refilled at a fixed rate up to the bucket
+# capacity, so short bursts are allowed but the long term request rate is bounded.
+#
+# The limiter is also aware of the TGDB allowance. Every response reports the remaining
+# allowance and every granted token consumes one unit of it, so workers stop before sending
+# requests that TGDB would reject anyway. Once stopped, all waiting and future acquire()
+# calls return False immediately.
+# ------------------------------------------------------------------------------------------------
+class RateLimiter(object):
+
+    def __init__(self, rate: float, capacity: int, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+
+        self.tokens = float(capacity)
+        self.last_refill = clock()
+        # None means the allowance is not known yet.
+        self.allowance = None
+
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    # Blocks until a token is available.
+    # Returns False if the limiter was stopped or the allowance is exhausted.
+    def acquire(self) -> bool:
+        while True:
+            with self.lock:
+                if self.stopped.is_set():
+                    return False
+                if self.allowance is not None and self.allowance <= 0:
+                    logger.debug('RateLimiter: allowance exhausted.')
+                    self.stopped.set()
+                    return False
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    if self.allowance is not None:
+                        self.allowance -= 1
+                    return True
+                wait_time = (1 - self.tokens) / self.rate
+            # Waiting on the event wakes up all the workers as soon as stop() is called.
+            if self.stopped.wait(wait_time):
+                return False
+
+    # Update the allowance with the value reported by TGDB in the last response.
+    # Responses of concurrent requests arrive out of order, so keep the lowest value seen.
+    def update_allowance(self, allowance: int):
+        with self.lock:
+            if self.allowance is None or allowance < self.allowance:
+                self.allowance = allowance
+
+    def stop(self):
+        self.stopped.set()
+
+    def is_stopped(self) -> bool:
+        return self.stopped.is_set()
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+# Advanced Kodi Launcher scraping engine for TGDB.
+# Persistent HTTP transport with connection pooling for the TGDB API and CDN.
+
+# Copyright (c) Chrisism <crizizz@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import json
+import threading
+import zlib
+import http.client
+
+from urllib.parse import urlsplit, urljoin
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# HTTP transport which keeps connections alive between requests.
+# Every scraper request to api.thegamesdb.net and cdn.thegamesdb.net goes through the same
+# transport, so the TCP and TLS handshakes are paid once per pooled connection instead of once
+# per request. The number of connections per host is bounded, callers wait for a free
+# connection when all of them are busy.
+#
+# get_JSON() and get_bytes() return a (data, http_code) tuple like net.get_URL(). On network
+# errors data and http_code are None.
+# ------------------------------------------------------------------------------------------------
+class HTTPTransport(object):
+    USER_AGENT = 'Mozilla/5.0 (compatible; AKL TGDB scraper)'
+    TIMEOUT = 30
+    MAX_REDIRECTS = 3
+    REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+    def __init__(self, max_connections_per_host: int = 4):
+        self.max_connections_per_host = max_connections_per_host
+        self.lock = threading.Lock()
+        # (scheme, host) -> list of idle connections
+        self.idle_connections = {}
+        # (scheme, host) -> semaphore bounding the connections in use
+        self.host_slots = {}
+        # Bytes received for the last request of every calling thread.
+        self.local = threading.local()
+        self.stats = {
+            'requests': 0,
+            'connections_opened': 0,
+            'connections_reused': 0,
+            'bytes_received': 0,
+            'bytes_decoded': 0,
+            'errors': 0
+        }
+
+    def get_JSON(self, url: str, url_log: str = None):
+        data, http_code = self._get(url, url_log, 'application/json')
+        if data is None:
+            return None, http_code
+        try:
+            return json.loads(data.decode('utf-8')), http_code
+        except ValueError as ex:
+            logger.error(f'HTTPTransport: invalid JSON from "{url_log or url}"', exc_info=ex)
+            return None, http_code
+
+    def get_bytes(self, url: str, url_log: str = None):
+        return self._get(url, url_log, '*/*')
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return dict(self.stats)
+
+    # Bytes received from the network by the last get_JSON() or get_bytes() call of the calling
+    # thread, redirects included, before decompression.
+    def get_last_bytes_received(self) -> int:
+        return getattr(self.local, 'bytes_received', 0)
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle_connections.values():
+                for conn in connections:
+                    conn.close()
+            self.idle_connections = {}
+
+    def _get(self, url: str, url_log: str, accept: str):
+        url_log = url_log if url_log else url
+        self.local.bytes_received = 0
+        for _ in range(HTTPTransport.MAX_REDIRECTS + 1):
+            response_data = self._request(url, url_log, accept)
+            if response_data is None:
+                return None, None
+            http_code, location, data = response_data
+            if http_code not in HTTPTransport.REDIRECT_CODES or not location:
+                return data, http_code
+            url = urljoin(url, location)
+            logger.debug(f'HTTPTransport: redirected to "{location}"')
+        logger.error(f'HTTPTransport: too many redirects for "{url_log}"')
+        return None, None
+
+    # Returns (http_code, location, data) or None on network errors and undecodable bodies.
+    def _request(self, url: str, url_log: str, accept: str):
+        parts = urlsplit(url)
+        host_key = (parts.scheme, parts.netloc)
+        path = parts.path if parts.path else '/'
+        if parts.query:
+            path = '{}?{}'.format(path, parts.query)
+        headers = {
+            'User-Agent': HTTPTransport.USER_AGENT,
+            'Accept': accept,
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        }
+
+        with self._host_slot(host_key):
+            self._count('requests')
+            # A pooled connection may have been closed by the server in the meantime. In that
+            # case retry once with a new connection.
+            for attempt in range(2):
+                conn, reused = self._checkout(host_key)
+                try:
+                    conn.request('GET', path, headers=headers)
+                    response = conn.getresponse()
+                    raw_data = response.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as ex:
+                    conn.close()
+                    if reused and attempt == 0:
+                        logger.debug(f'HTTPTransport: stale connection to {parts.netloc}. Retrying.')
+                        continue
+                    self._count('errors')
+                    logger.error(f'HTTPTransport: connection error for "{url_log}"', exc_info=ex)
+                    return None
+                except Exception as ex:
+                    conn.close()
+                    self._count('errors')
+                    logger.error(f'HTTPTransport: exception retrieving "{url_log}"', exc_info=ex)
+                    return None
+
+                if response.will_close:
+                    conn.close()
+                else:
+                    self._checkin(host_key, conn)
+                break
+
+        self._count('bytes_received', len(raw_data))
+        self.local.bytes_received += len(raw_data)
+        try:
+            data = self._decode(raw_data, response.getheader('Content-Encoding'))
+        except zlib.error as ex:
+            self._count('errors')
+            logger.error(f'HTTPTransport: cannot decode response of "{url_log}"', exc_info=ex)
+            return None
+        self._count('bytes_decoded', len(data))
+        logger.debug(f'HTTPTransport: HTTP {response.status} "{url_log}"')
+        return response.status, response.getheader('Location'), data
+
+    def _decode(self, raw_data: bytes, content_encoding: str) -> bytes:
+        if not content_encoding:
+            return raw_data
+        content_encoding = content_encoding.lower()
+        if content_encoding == 'gzip':
+            return zlib.decompress(raw_data, 16 + zlib.MAX_WBITS)
+        if content_encoding == 'deflate':
+            try:
+                return zlib.decompress(raw_data)
+            except zlib.error:
+                # Some servers send raw deflate data without the zlib header.
+                return zlib.decompress(raw_data, -zlib.MAX_WBITS)
+        return raw_data
+
+    def _host_slot(self, host_key):
+        with self.lock:
+            if host_key not in self.host_slots:
+                self.host_slots[host_key] = threading.BoundedSemaphore(self.max_connections_per_host)
+            return self.host_slots[host_key]
+
+    def _checkout(self, host_key):
+        with self.lock:
+            connections = self.idle_connections.get(host_key)
+            if connections:
+                self.stats['connections_reused'] += 1
+                return connections.pop(), True
+            self.stats['connections_opened'] += 1
+        scheme, netloc = host_key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=HTTPTransport.TIMEOUT), False
+        return http.client.HTTPConnection(netloc, timeout=HTTPTransport.TIMEOUT), False
+
+    def _checkin(self, host_key, conn):
+        with self.lock:
+            self.idle_connections.setdefault(host_key, []).append(conn)
+
+    def _count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.stats[name] += amount
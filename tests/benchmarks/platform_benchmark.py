@@ -0,0 +1,110 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Microbenchmark of the platform resolution for a TGDB result set.
+# Every search result is resolved from its TGDB platform ID to an AKL platform, and every
+# search resolves the AKL platform of the ROM to a TGDB ID. This compares the former scan of
+# the AKL platform list with the precomputed PlatformIndex.
+#
+# Usage: python -m tests.benchmarks.platform_benchmark [--candidates 10000] [--runs 5] [--output report.json]
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+from akl import platforms
+
+from resources.lib.scraper import AKL_compact_platform_TGDB_mapping, DEFAULT_PLAT_TGDB, get_platform_index
+
+DEFAULT_CANDIDATES = 10000
+# TGDB IDs without AKL platform, which resolve to the unknown platform.
+UNKNOWN_TGDB_IDS = [4950, 4951, 4952]
+
+
+# Resolution as it was done before the PlatformIndex, with the last mapped platform winning
+# for shared TGDB IDs.
+LEGACY_TGDB_AKL_mapping = {value: key for key, value in AKL_compact_platform_TGDB_mapping.items()}
+
+
+def legacy_AKL_platform_to_TheGamesDB(platform_long_name) -> int:
+    matching_platform = platforms.get_AKL_platform(platform_long_name)
+    if matching_platform.compact_name in AKL_compact_platform_TGDB_mapping:
+        return AKL_compact_platform_TGDB_mapping[matching_platform.compact_name]
+    if matching_platform.aliasof is not None and matching_platform.aliasof in AKL_compact_platform_TGDB_mapping:
+        return AKL_compact_platform_TGDB_mapping[matching_platform.aliasof]
+    return DEFAULT_PLAT_TGDB
+
+
+def legacy_TheGamesDB_platform_to_AKL_platform(tgdb_platform: int) -> platforms.Platform:
+    if tgdb_platform in LEGACY_TGDB_AKL_mapping:
+        return platforms.get_AKL_platform_by_compact(LEGACY_TGDB_AKL_mapping[tgdb_platform])
+    return platforms.get_AKL_platform_by_compact(platforms.PLATFORM_UNKNOWN_COMPACT)
+
+
+# Synthetic result set with the TGDB platform IDs of the mapping and a few unknown IDs.
+def build_result_set(size: int) -> tuple:
+    rng = random.Random(42)
+    tgdb_ids = sorted(set(AKL_compact_platform_TGDB_mapping.values())) + UNKNOWN_TGDB_IDS
+    long_names = [platform.long_name for platform in platforms.AKL_platforms]
+    return [rng.choice(tgdb_ids) for _ in range(size)], [rng.choice(long_names) for _ in range(size)]
+
+
+def time_ms(function, values: list, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for value in values:
+            function(value)
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def run_benchmark(size: int, runs: int) -> dict:
+    tgdb_ids, long_names = build_result_set(size)
+    build_start = time.perf_counter()
+    index = get_platform_index()
+    build_ms = round((time.perf_counter() - build_start) * 1000, 3)
+    changed = sorted({tgdb_id for tgdb_id in tgdb_ids
+                      if legacy_TheGamesDB_platform_to_AKL_platform(tgdb_id) is not index.get_platform(tgdb_id)})
+    return {
+        'candidates': size,
+        'runs': runs,
+        'index_build_ms': build_ms,
+        'tgdb_to_akl': {
+            'legacy_ms': time_ms(legacy_TheGamesDB_platform_to_AKL_platform, tgdb_ids, runs),
+            'index_ms': time_ms(index.get_platform, tgdb_ids, runs)
+        },
+        'akl_to_tgdb': {
+            'legacy_ms': time_ms(legacy_AKL_platform_to_TheGamesDB, long_names, runs),
+            'index_ms': time_ms(index.get_tgdb_id, long_names, runs)
+        },
+        # Shared TGDB IDs which now resolve to the primary platform instead of the last one.
+        'tgdb_ids_resolving_differently': changed
+    }
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the TGDB platform resolution.')
+    parser.add_argument('--candidates', type=int, default=DEFAULT_CANDIDATES, help='Size of the result set')
+    parser.add_argument('--runs', type=int, default=5, help='Runs, the median is reported')
+    parser.add_argument('--output', default=None, help='JSON report file')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.candidates, max(1, args.runs))
+    for direction in ['tgdb_to_akl', 'akl_to_tgdb']:
+        print('{}: legacy {} ms, index {} ms for {} candidates'.format(
+            direction, report[direction]['legacy_ms'], report[direction]['index_ms'], args.candidates))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
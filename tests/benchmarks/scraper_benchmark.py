@@ -0,0 +1,289 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the TGDB scraping hot path with recorded TGDB responses.
+# No network access is needed. The recorded responses in tests/assets are replayed for
+# synthetic ROM collections.
+#
+# Usage: python -m tests.benchmarks.scraper_benchmark [--sizes 100 1000 10000] [--output report.json]
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+import argparse
+import copy
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from akl.api import ROMObj
+from akl.utils import io, kodi
+
+from resources.lib.scraper import TheGamesDB
+from resources.lib.throttle import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+TEST_ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, 'assets'))
+DEFAULT_SIZES = [100, 1000, 10000]
+PLATFORM = 'Nintendo NES'
+TGDB_PLATFORM = 7
+# Every 5th ROM is the second disc of the previous game and every 10th ROM is unknown in TGDB.
+DISC_EVERY = 5
+UNKNOWN_EVERY = 10
+
+
+def read_fixture(filename: str) -> dict:
+    with open(os.path.join(TEST_ASSETS_DIR, filename), 'r', encoding='utf-8') as fixture_file:
+        return json.load(fixture_file)
+
+
+# ------------------------------------------------------------------------------------------------
+# Stand-in for HTTPTransport which answers with the recorded TGDB responses.
+# Searches return a single game with the searched title, unless the title is unknown. ByGameID
+# and Games/Images answer with the recorded game and images for every requested ID.
+# ------------------------------------------------------------------------------------------------
+class ReplayTransport(object):
+    ALLOWANCE = 10 ** 9
+
+    def __init__(self, games_by_title: dict):
+        self.games_by_title = games_by_title
+        self.search_template = read_fixture('thegamesdb_castlevania_list.json')
+        self.game_template = read_fixture('thegamesdb_castlevania.json')
+        self.images_template = read_fixture('thegamesdb_images.json')
+        self.fixtures = {
+            '/Genres': read_fixture('thegamesdb_genres.json'),
+            '/Developers': read_fixture('thegamesdb_developers.json'),
+            '/Publishers': read_fixture('thegamesdb_publishers.json'),
+            '/Platforms': read_fixture('thegamesdb_platforms.json')
+        }
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def get_last_bytes_received(self) -> int:
+        return 0
+
+    def get_JSON(self, url: str, url_log: str = None):
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        for endpoint, handler in [
+                ('/Games/ByGameName', self._search),
+                ('/Games/ByGameID', self._games),
+                ('/Games/Images', self._images)]:
+            if parts.path.endswith(endpoint):
+                self._count(endpoint)
+                return self._with_allowance(handler(query)), 200
+        for endpoint, fixture in self.fixtures.items():
+            if parts.path.endswith(endpoint):
+                self._count(endpoint)
+                return self._with_allowance(copy.deepcopy(fixture)), 200
+        self._count('unknown')
+        return {'code': 404, 'message': 'Not recorded'}, 404
+
+    def get_bytes(self, url: str, url_log: str = None):
+        self._count('images_cdn')
+        return b'image', 200
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return dict(self.calls)
+
+    def close(self):
+        pass
+
+    def _search(self, query: dict) -> dict:
+        title = query.get('name', [''])[0]
+        game_id = self.games_by_title.get(title.casefold())
+        games = [] if game_id is None else [self._game(self.search_template, game_id, title)]
+        return self._page(self.search_template, {'count': len(games), 'games': games})
+
+    def _games(self, query: dict) -> dict:
+        ids = [int(game_id) for game_id in query.get('id', [''])[0].split(',') if game_id]
+        games = [self._game(self.game_template, game_id, 'Benchmark Game {}'.format(game_id)) for game_id in ids]
+        return self._page(self.game_template, {'count': len(games), 'games': games})
+
+    def _images(self, query: dict) -> dict:
+        ids = [game_id for game_id in query.get('games_id', [''])[0].split(',') if game_id]
+        recorded_images = next(iter(self.images_template['data']['images'].values()))
+        images = {game_id: copy.deepcopy(recorded_images) for game_id in ids}
+        return self._page(self.images_template, {
+            'count': len(images),
+            'base_url': copy.deepcopy(self.images_template['data']['base_url']),
+            'images': images
+        })
+
+    def _game(self, template: dict, game_id: int, title: str) -> dict:
+        game = copy.deepcopy(template['data']['games'][0])
+        game['id'] = game_id
+        game['game_title'] = title
+        game['platform'] = TGDB_PLATFORM
+        return game
+
+    def _page(self, template: dict, data: dict) -> dict:
+        page = {key: copy.deepcopy(value) for key, value in template.items() if key not in ('data', 'pages')}
+        page['data'] = data
+        page['pages'] = {'previous': None, 'current': None, 'next': None}
+        return self._with_allowance(page)
+
+    def _with_allowance(self, json_data: dict) -> dict:
+        json_data['remaining_monthly_allowance'] = ReplayTransport.ALLOWANCE
+        json_data['extra_allowance'] = 0
+        return json_data
+
+    def _count(self, endpoint: str):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+
+# Synthetic collection of ROMs with discs of the same game and unknown games.
+# Returns the list of ROMs and a dictionary of casefolded title -> TGDB game ID.
+def build_collection(size: int):
+    roms = []
+    games_by_title = {}
+    for index in range(size):
+        if index % UNKNOWN_EVERY == UNKNOWN_EVERY - 1:
+            identifier = 'Unknown Homebrew {:05d} (PD)'.format(index)
+        elif index % DISC_EVERY == DISC_EVERY - 1:
+            identifier = 'Benchmark Game {:05d} (USA) (Disc 2)'.format(index - 1)
+        else:
+            identifier = 'Benchmark Game {:05d} (USA) (Disc 1)'.format(index)
+            games_by_title['benchmark game {:05d}'.format(index)] = 100000 + index
+        roms.append(ROMObj({
+            'id': 'rom{:05d}'.format(index),
+            'scanned_data': {'identifier': identifier, 'file': '/roms/{}.zip'.format(identifier)},
+            'platform': PLATFORM
+        }))
+    return roms, games_by_title
+
+
+# ------------------------------------------------------------------------------------------------
+# Times the phases of a scrape and records the peak memory of every phase.
+# ------------------------------------------------------------------------------------------------
+class PhaseTimer(object):
+
+    def __init__(self, transport: ReplayTransport):
+        self.transport = transport
+        self.phases = {}
+
+    def run(self, name: str, function):
+        calls_before = self.transport.get_stats()
+        tracemalloc.reset_peak()
+        start_time = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start_time
+        _, peak_memory = tracemalloc.get_traced_memory()
+        calls_after = self.transport.get_stats()
+        self.phases[name] = {
+            'seconds': round(elapsed, 6),
+            'calls': {endpoint: count - calls_before.get(endpoint, 0) for endpoint, count in calls_after.items()
+                      if count != calls_before.get(endpoint, 0)},
+            'peak_memory_bytes': peak_memory
+        }
+        return result
+
+
+def hit_rate(hits: int, misses: int) -> float:
+    return round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+
+def run_benchmark(size: int, work_dir: str) -> dict:
+    roms, games_by_title = build_collection(size)
+    transport = ReplayTransport(games_by_title)
+    cache_dir = os.path.join(work_dir, 'cache_{}'.format(size))
+    os.makedirs(cache_dir)
+
+    with patch('resources.lib.scraper.settings.getSetting', return_value=''), \
+            patch('resources.lib.scraper.settings.getSettingAsFilePath', return_value=io.FileName(cache_dir)), \
+            patch('akl.scrapers.kodi.getAddonDir', return_value=io.FileName(cache_dir)):
+        scraper = TheGamesDB()
+    scraper.transport = transport
+    scraper.rate_limiter = RateLimiter(rate=10 ** 9, capacity=10 ** 9)
+    timer = PhaseTimer(transport)
+    status_dic = kodi.new_status_dic('Benchmark was OK')
+    search_jobs = [(rom.get_identifier(), rom, rom.get_platform()) for rom in roms]
+
+    def resolve_candidates(candidate_lists):
+        candidates = {}
+        for rom, candidate_list in zip(roms, candidate_lists):
+            if candidate_list:
+                scraper.set_candidate(rom.get_identifier(), rom.get_platform(), candidate_list[0])
+                candidates[scraper.cache_key] = candidate_list[0]
+        return candidates
+
+    def scrape_all():
+        for rom in roms:
+            if not scraper.check_candidates_cache(rom.get_identifier(), rom.get_platform()):
+                continue
+            candidate = scraper.retrieve_from_candidates_cache(rom.get_identifier(), rom.get_platform())
+            scraper.set_candidate(rom.get_identifier(), rom.get_platform(), candidate)
+            scraper.get_metadata(status_dic)
+
+    tracemalloc.start()
+    try:
+        candidate_lists = timer.run('search', lambda: scraper.get_candidates_concurrently(search_jobs, status_dic))
+        candidates = timer.run('candidates', lambda: resolve_candidates(candidate_lists))
+        timer.run('prefetch_metadata', lambda: scraper.prefetch_metadata(candidates, status_dic))
+        timer.run('prefetch_assets', lambda: scraper.prefetch_assets(candidates, status_dic))
+        timer.run('scrape_metadata', scrape_all)
+        timer.run('search_warm', lambda: scraper.get_candidates_concurrently(search_jobs, status_dic))
+        timer.run('flush_disk_cache', scraper.flush_disk_cache)
+    finally:
+        tracemalloc.stop()
+
+    response_cache_stats = scraper.get_response_cache_stats()
+    search_stats = scraper.get_search_stats()
+    return {
+        'roms': size,
+        'status': status_dic['status'],
+        'resolved_candidates': len(candidates),
+        'total_seconds': round(sum(phase['seconds'] for phase in timer.phases.values()), 6),
+        'total_calls': transport.get_stats(),
+        'phases': timer.phases,
+        'response_cache': dict(response_cache_stats, hit_rate=hit_rate(
+            response_cache_stats['hits'], response_cache_stats['misses'])),
+        'search': search_stats,
+        'peak_memory_bytes': max(phase['peak_memory_bytes'] for phase in timer.phases.values())
+    }
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the TGDB scraper with recorded responses.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='ROM collection sizes')
+    parser.add_argument('--output', default='scraper_benchmark.json', help='JSON report file')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    work_dir = tempfile.mkdtemp(prefix='tgdb_benchmark_')
+    try:
+        results = []
+        for size in args.sizes:
+            print('Benchmarking {} ROMs ...'.format(size))
+            result = run_benchmark(size, work_dir)
+            print('  {} s, {} API calls, response cache hit rate {}'.format(
+                result['total_seconds'], sum(result['total_calls'].values()), result['response_cache']['hit_rate']))
+            results.append(result)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2)
+    print('Report written to "{}"'.format(args.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,104 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Import time benchmark of the plugin startup.
+# Kodi imports default.py for every command, also for light commands like update-settings.
+# This benchmark imports the modules default.py imports at module level in a fresh Python
+# process and reports their import time, compared with importing the whole scraper stack.
+#
+# Usage: python -m tests.benchmarks.startup_benchmark [--runs 5] [--budget-ms 300] [--output report.json]
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+DEFAULT_PY = os.path.join(ROOT_DIR, 'default.py')
+# Modules which must only be imported when a scrape runs.
+HEAVY_MODULES = ['akl.scrapers', 'akl.api', 'resources.lib.scraper']
+SCRAPER_IMPORTS = ['import akl.scrapers', 'import akl.api', 'import resources.lib.scraper']
+
+
+# Import statements at module level of default.py, without __future__ imports and imports
+# under "if TYPE_CHECKING:", which never run.
+def get_startup_imports(source_path: str = DEFAULT_PY) -> list:
+    with open(source_path, 'r', encoding='utf-8') as source_file:
+        tree = ast.parse(source_file.read())
+    imports = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            imports.extend('import {}'.format(alias.name) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module != '__future__':
+            for alias in node.names:
+                imports.append('from {} import {}'.format('.' * node.level + (node.module or ''), alias.name))
+    return imports
+
+
+# Imports statements in a fresh interpreter with -X importtime.
+# Returns the total import time in microseconds and the list of modules loaded.
+def measure_imports(statements: list) -> tuple:
+    code = '\n'.join(statements + ['import sys, json', 'print(json.dumps(sorted(sys.modules)))'])
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, _ = line[len('import time:'):].split('|', 2)
+        total_us += int(self_us)
+    return total_us, json.loads(result.stdout.splitlines()[-1])
+
+
+def run_benchmark(runs: int) -> dict:
+    startup_imports = get_startup_imports()
+    startup_times = []
+    scraper_times = []
+    for _ in range(runs):
+        startup_us, loaded_modules = measure_imports(startup_imports)
+        startup_times.append(startup_us)
+        scraper_us, _ = measure_imports(startup_imports + SCRAPER_IMPORTS)
+        scraper_times.append(scraper_us)
+    return {
+        'runs': runs,
+        'startup_imports': startup_imports,
+        'startup_ms': round(statistics.median(startup_times) / 1000, 3),
+        'with_scraper_ms': round(statistics.median(scraper_times) / 1000, 3),
+        'modules_loaded_at_startup': len(loaded_modules),
+        'heavy_modules_loaded_at_startup': [module for module in HEAVY_MODULES if module in loaded_modules]
+    }
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='Measure the import time of the plugin startup.')
+    parser.add_argument('--runs', type=int, default=5, help='Runs, the median is reported')
+    parser.add_argument('--budget-ms', type=float, default=None, help='Fail when the startup takes longer')
+    parser.add_argument('--output', default=None, help='JSON report file')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(max(1, args.runs))
+    print('Startup imports: {} ms ({} modules)'.format(report['startup_ms'], report['modules_loaded_at_startup']))
+    print('With scraper stack: {} ms'.format(report['with_scraper_ms']))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+
+    if report['heavy_modules_loaded_at_startup']:
+        print('Heavy modules loaded at startup: {}'.format(', '.join(report['heavy_modules_loaded_at_startup'])))
+        return 1
+    if args.budget_ms is not None and report['startup_ms'] > args.budget_ms:
+        print('Startup is over the budget of {} ms'.format(args.budget_ms))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
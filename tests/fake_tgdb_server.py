@@ -0,0 +1,326 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Local stand-in for the TGDB API and CDN, for load and failure testing without spending quota.
+# Serves /v1/Games/ByGameName, /v1/Games/ByGameID, /v1/Games/Images, /v1/Games/Updates, /v1/Genres,
+# /v1/Developers, /v1/Publishers and /v1/Platforms with the recorded data in tests/assets, and
+# images under /cdn/.
+#
+# Usage in tests:
+#   with FakeTGDBServer(latency=0.1) as server:
+#       TheGamesDB.set_API_URL(server.api_url)
+#       server.queue_errors(429, 503)
+#       ...
+#
+# Standalone: python -m tests.fake_tgdb_server [--port 8080] [--latency 0.2] [--errors 429,503]
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+import argparse
+import copy
+import json
+import os
+import sys
+import threading
+import time
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+TEST_ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'assets'))
+ERROR_MESSAGES = {
+    403: 'This API key has reached its allowance.',
+    429: 'Too many requests.',
+    500: 'Internal server error.',
+    502: 'Bad gateway.',
+    503: 'Service unavailable.'
+}
+
+
+def read_fixture(filename: str) -> dict:
+    with open(os.path.join(TEST_ASSETS_DIR, filename), 'r', encoding='utf-8') as fixture_file:
+        return json.load(fixture_file)
+
+
+def parse_ids(value: str) -> list:
+    return [int(id) for id in value.split(',') if id.strip()]
+
+
+# ------------------------------------------------------------------------------------------------
+# Fake TGDB server running in a background thread.
+#
+# Every API response decrements the allowance, like TGDB does. Requests are paged with
+# page_size items per page and pages.next links back to this server. Errors queued with
+# queue_errors() are returned, in order, by the next API requests. latency delays every API
+# response and image_latency every CDN response, in seconds. Games changed with edit_game()
+# are listed in the Games/Updates feed.
+# ------------------------------------------------------------------------------------------------
+class FakeTGDBServer(object):
+
+    def __init__(self, games: list = None, page_size: int = 20, monthly_allowance: int = 1000,
+                 extra_allowance: int = 0, latency: float = 0.0, image_latency: float = 0.0, port: int = 0):
+        self.games = {}
+        for game in games if games is not None else read_fixture('thegamesdb_castlevania_list.json')['data']['games']:
+            self.games[game['id']] = game
+        self.page_size = page_size
+        self.monthly_allowance = monthly_allowance
+        self.extra_allowance = extra_allowance
+        self.latency = latency
+        self.image_latency = image_latency
+
+        self.lock = threading.Lock()
+        self.queued_errors = []
+        self.request_counts = {}
+        self.lookup_fixtures = {}
+        self.updates = []
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), FakeTGDBHandler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.server_thread = None
+
+    @property
+    def base_url(self) -> str:
+        return 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    @property
+    def api_url(self) -> str:
+        return self.base_url + '/v1'
+
+    @property
+    def cdn_url(self) -> str:
+        return self.base_url + '/cdn/images/'
+
+    def start(self):
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def add_games(self, games: list):
+        with self.lock:
+            for game in games:
+                self.games[game['id']] = game
+
+    # Change a field of a game, like TGDB editors do, and add the edit to the updates feed.
+    def edit_game(self, game_id: int, field: str, value):
+        with self.lock:
+            self.games[game_id][field] = value
+            self.updates.append({
+                'edit_id': len(self.updates) + 1,
+                'game_id': game_id,
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()),
+                'type': field,
+                'value': value
+            })
+
+    def queue_errors(self, *http_codes):
+        with self.lock:
+            self.queued_errors.extend(http_codes)
+
+    def get_request_counts(self) -> dict:
+        with self.lock:
+            return dict(self.request_counts)
+
+    # --- Request handling -----------------------------------------------------------------------
+    # Returns (http_code, JSON data) of an API request.
+    def handle_API(self, path: str, query: dict):
+        time.sleep(self.latency)
+        endpoint = path[len('/v1'):]
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+            if self.queued_errors:
+                return self._error(self.queued_errors.pop(0))
+            if self.monthly_allowance + self.extra_allowance <= 0:
+                return self._error(403)
+            # Extra allowance is only spent when the monthly allowance is exhausted.
+            if self.monthly_allowance > 0:
+                self.monthly_allowance -= 1
+            else:
+                self.extra_allowance -= 1
+
+        page = int(query.get('page', ['1'])[0])
+        if endpoint == '/Games/ByGameName':
+            return 200, self._search(path, query, page)
+        if endpoint == '/Games/ByGameID':
+            return 200, self._games_by_id(path, query, page)
+        if endpoint == '/Games/Images':
+            return 200, self._images(path, query, page)
+        if endpoint == '/Games/Updates':
+            return 200, self._updates(path, query, page)
+        for lookup_endpoint, fixture, key in [
+                ('/Genres', 'thegamesdb_genres.json', 'genres'),
+                ('/Developers', 'thegamesdb_developers.json', 'developers'),
+                ('/Publishers', 'thegamesdb_publishers.json', 'publishers'),
+                ('/Platforms', 'thegamesdb_platforms.json', 'platforms')]:
+            if endpoint == lookup_endpoint:
+                return 200, self._lookup(fixture, key)
+        return self._error(404)
+
+    def handle_CDN(self, path: str) -> bytes:
+        time.sleep(self.image_latency)
+        with self.lock:
+            self.request_counts['/cdn'] = self.request_counts.get('/cdn', 0) + 1
+        return 'fake image {}'.format(path).encode('utf-8')
+
+    def _search(self, path: str, query: dict, page: int) -> dict:
+        words = query.get('name', [''])[0].casefold().split()
+        platforms = parse_ids(query.get('filter[platform]', ['0'])[0])
+        with self.lock:
+            games = [game for game in self.games.values()
+                     if all(word in game['game_title'].casefold() for word in words) and
+                     (platforms in ([], [0]) or game['platform'] in platforms)]
+        page_games = self._get_page(games, page)
+        return self._response(path, query, page, len(games), {'count': len(page_games), 'games': page_games})
+
+    def _games_by_id(self, path: str, query: dict, page: int) -> dict:
+        ids = parse_ids(query.get('id', [''])[0])
+        with self.lock:
+            games = [self.games[id] for id in ids if id in self.games]
+        page_games = self._get_page(games, page)
+        return self._response(path, query, page, len(games), {'count': len(page_games), 'games': page_games})
+
+    def _images(self, path: str, query: dict, page: int) -> dict:
+        ids = parse_ids(query.get('games_id', [''])[0])
+        with self.lock:
+            ids = [id for id in ids if id in self.games]
+        page_ids = self._get_page(ids, page)
+        images = {str(id): self._game_images(id) for id in page_ids}
+        base_url = {size: '{}{}/'.format(self.cdn_url, size)
+                    for size in ('original', 'small', 'thumb', 'cropped_center_thumb', 'medium', 'large')}
+        return self._response(path, query, page, len(ids), {'count': len(images), 'base_url': base_url, 'images': images})
+
+    # Edits after last_edit_id. time limits the edits to the last minutes.
+    def _updates(self, path: str, query: dict, page: int) -> dict:
+        last_edit_id = int(query.get('last_edit_id', ['0'])[0])
+        minutes = int(query.get('time', ['0'])[0])
+        since = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - minutes * 60)) if minutes else ''
+        with self.lock:
+            updates = [update for update in self.updates
+                       if update['edit_id'] > last_edit_id and update['timestamp'] >= since]
+        page_updates = self._get_page(updates, page)
+        return self._response(path, query, page, len(updates), {'count': len(page_updates), 'updates': page_updates})
+
+    def _game_images(self, id: int) -> list:
+        return [
+            {'id': id * 10 + 1, 'type': 'boxart', 'side': 'front', 'filename': 'boxart/front/{}-1.jpg'.format(id),
+             'resolution': '1000x1400'},
+            {'id': id * 10 + 2, 'type': 'boxart', 'side': 'back', 'filename': 'boxart/back/{}-1.jpg'.format(id),
+             'resolution': '1000x1400'},
+            {'id': id * 10 + 3, 'type': 'fanart', 'side': None, 'filename': 'fanart/{}-1.jpg'.format(id),
+             'resolution': '1920x1080'},
+            {'id': id * 10 + 4, 'type': 'banner', 'side': None, 'filename': 'graphical/{}-g.jpg'.format(id),
+             'resolution': None},
+            {'id': id * 10 + 5, 'type': 'screenshot', 'side': None, 'filename': 'screenshots/{}-1.jpg'.format(id),
+             'resolution': None},
+            {'id': id * 10 + 6, 'type': 'clearlogo', 'side': None, 'filename': 'clearlogo/{}.png'.format(id),
+             'resolution': None}
+        ]
+
+    def _lookup(self, fixture: str, key: str) -> dict:
+        with self.lock:
+            if fixture not in self.lookup_fixtures:
+                self.lookup_fixtures[fixture] = read_fixture(fixture)['data'][key]
+            items = self.lookup_fixtures[fixture]
+        return self._with_allowance({'code': 200, 'status': 'Success', 'data': {'count': len(items), key: items}})
+
+    def _get_page(self, items: list, page: int) -> list:
+        start = (page - 1) * self.page_size
+        return items[start:start + self.page_size]
+
+    def _response(self, path: str, query: dict, page: int, total: int, data: dict) -> dict:
+        def page_url(page_number):
+            page_query = {key: values[0] for key, values in query.items()}
+            page_query['page'] = page_number
+            return '{}{}?{}'.format(self.base_url, path, urlencode(page_query))
+
+        has_next = page * self.page_size < total
+        return self._with_allowance({
+            'code': 200,
+            'status': 'Success',
+            'data': data,
+            'pages': {
+                'previous': page_url(page - 1) if page > 1 else None,
+                'current': page_url(page),
+                'next': page_url(page + 1) if has_next else None
+            }
+        })
+
+    def _with_allowance(self, json_data: dict) -> dict:
+        with self.lock:
+            json_data['remaining_monthly_allowance'] = self.monthly_allowance
+            json_data['extra_allowance'] = self.extra_allowance
+        return copy.deepcopy(json_data)
+
+    def _error(self, http_code: int):
+        return http_code, {
+            'code': http_code,
+            'status': 'Error',
+            'message': ERROR_MESSAGES.get(http_code, 'Not found.'),
+            'remaining_monthly_allowance': self.monthly_allowance,
+            'extra_allowance': self.extra_allowance
+        }
+
+
+class FakeTGDBHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        fake = self.server.fake
+        if parts.path.startswith('/cdn/'):
+            self._send(200, fake.handle_CDN(parts.path), 'image/jpeg')
+            return
+        if parts.path.startswith('/v1/'):
+            http_code, json_data = fake.handle_API(parts.path, parse_qs(parts.query))
+        else:
+            http_code, json_data = fake._error(404)
+        headers = {'Retry-After': '1'} if http_code == 429 else {}
+        self._send(http_code, json.dumps(json_data).encode('utf-8'), 'application/json', headers)
+
+    def _send(self, http_code: int, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(http_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='Local stand-in for the TGDB API.')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='API response delay in seconds')
+    parser.add_argument('--image-latency', type=float, default=0.0, help='CDN response delay in seconds')
+    parser.add_argument('--allowance', type=int, default=1000, help='Monthly allowance')
+    parser.add_argument('--errors', default='', help='Comma separated HTTP codes of the first responses')
+    args = parser.parse_args(argv)
+
+    server = FakeTGDBServer(monthly_allowance=args.allowance, latency=args.latency,
+                            image_latency=args.image_latency, port=args.port)
+    server.queue_errors(*parse_ids(args.errors))
+    print('Fake TGDB API at {}'.format(server.api_url))
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
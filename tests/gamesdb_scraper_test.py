@@ -27,7 +27,7 @@ def read_file_as_json(path):
     file_data = read_file(path)
     return json.loads(file_data, encoding = 'utf-8')
 
-def mocked_gamesdb(url, url_clean=None, content_type=None):
+def mocked_gamesdb(url, url_clean=None):
 
     print(url)
     mocked_json_file = ''
@@ -52,6 +52,16 @@ def mocked_gamesdb(url, url_clean=None, content_type=None):
         print('reading fake image file')
         mocked_json_file = Test_gamesdb_scraper.TEST_ASSETS_DIR + "\\thegamesdb_images.json"
 
+    if '/Games/Updates' in url:
+        return {
+            'code': 200, 'status': 'Success',
+            'data': {'count': 2, 'updates': [
+                {'edit_id': 101, 'game_id': 23213, 'timestamp': '2022-01-01 10:00:00', 'type': 'overview', 'value': '-'},
+                {'edit_id': 102, 'game_id': 1, 'timestamp': '2022-01-01 10:05:00', 'type': 'players', 'value': '2'}]},
+            'pages': {'previous': None, 'current': url, 'next': None},
+            'remaining_monthly_allowance': 100, 'extra_allowance': 0
+        }, 200
+
     if 'cdn.thegamesdb.net/' in url:
         return read_file(Test_gamesdb_scraper.TEST_ASSETS_DIR + "\\test.jpg")
 
@@ -78,7 +88,7 @@ class Test_gamesdb_scraper(unittest.TestCase):
     
     @patch('akl.scrapers.kodi.getAddonDir', autospec=True, return_value=FakeFile("/test"))
     @patch('akl.scrapers.settings.getSettingAsFilePath', autospec=True, return_value=FakeFile("/test"))
-    @patch('resources.lib.scraper.net.get_URL', side_effect = mocked_gamesdb)
+    @patch('resources.lib.scraper.HTTPTransport.get_JSON', side_effect = mocked_gamesdb)
     @patch('akl.api.client_get_rom')
     def test_scraping_metadata_for_game(self, api_rom_mock: MagicMock, mock_json_downloader, cache_path_mock, addondir_mock):        
         # arrange
@@ -107,12 +117,13 @@ class Test_gamesdb_scraper(unittest.TestCase):
     # add actual gamesdb apikey above and comment out patch attributes to do live tests
     @patch('akl.scrapers.kodi.getAddonDir', autospec=True, return_value=FakeFile("/test"))
     @patch('akl.scrapers.settings.getSettingAsFilePath', autospec=True, return_value=FakeFile("/test"))
-    @patch('resources.lib.scraper.net.get_URL', side_effect = mocked_gamesdb)
-    @patch('resources.lib.scraper.net.download_img')
+    @patch('resources.lib.scraper.HTTPTransport.get_JSON', side_effect = mocked_gamesdb)
+    @patch('resources.lib.scraper.HTTPTransport.get_bytes', return_value=(b'image', 200))
+    @patch('resources.lib.scraper.io.FileName.writeAll', autospec=True)
     @patch('resources.lib.scraper.io.FileName.scanFilesInPath', autospec=True)
     @patch('akl.api.client_get_rom')
     def test_scraping_assets_for_game(self, api_rom_mock: MagicMock, 
-        scanner_mock, mock_img_downloader, mock_json_downloader, cache_path_mock, addondir_mock):        
+        scanner_mock, file_writer_mock, mock_img_downloader, mock_json_downloader, cache_path_mock, addondir_mock):        
         # arrange
         settings = ScraperSettings()
         settings.scrape_metadata_policy = constants.SCRAPE_ACTION_NONE
@@ -144,5 +155,78 @@ class Test_gamesdb_scraper(unittest.TestCase):
         self.assertTrue(actual.entity_data['assets'][constants.ASSET_BANNER_ID], 'No banner defined')
         self.assertTrue(actual.entity_data['assets'][constants.ASSET_FANART_ID], 'No fanart defined')
 
+    @patch('akl.scrapers.kodi.getAddonDir', autospec=True, return_value=FakeFile("/test"))
+    @patch('akl.scrapers.settings.getSettingAsFilePath', autospec=True, return_value=FakeFile("/test"))
+    @patch('resources.lib.scraper.HTTPTransport.get_JSON', side_effect = mocked_gamesdb)
+    @patch('akl.api.client_get_rom')
+    def test_refresh_marks_cached_metadata_of_updated_games_as_stale(self, api_rom_mock: MagicMock, mock_json_downloader, cache_path_mock, addondir_mock):
+        # arrange
+        settings = ScraperSettings()
+        settings.scrape_metadata_policy = constants.SCRAPE_POLICY_SCRAPE_ONLY
+        settings.scrape_assets_policy   = constants.SCRAPE_ACTION_NONE
+
+        rom_id = random_string(5)
+        rom = ROMObj({
+            'id': rom_id,
+            'scanned_data': { 'file':Test_gamesdb_scraper.TEST_ASSETS_DIR + '\\castlevania.zip'},
+            'platform': 'Nintendo NES'
+        })
+        api_rom_mock.return_value = rom
+        scraper = TheGamesDB()
+        ScrapeStrategy(None, 0, settings, scraper, FakeProgressDialog()).process_single_rom(rom_id)
+        cache_key = scraper.cache_key
+
+        # act
+        actual = scraper.refresh_from_updates({'status': True, 'msg': ''}, refetch=False)
+
+        # assert
+        self.assertEqual([cache_key], list(actual.keys()))
+        self.assertFalse(scraper._check_disk_cache(scraper.CACHE_METADATA, cache_key))
+        self.assertEqual(102, scraper.game_cache.get(TheGamesDB.GAME_CACHE_REFRESH, 'updates')['last_edit_id'])
+
+    @patch('akl.scrapers.kodi.getAddonDir', autospec=True, return_value=FakeFile("/test"))
+    @patch('akl.scrapers.settings.getSettingAsFilePath', autospec=True, return_value=FakeFile("/test"))
+    @patch('resources.lib.scraper.HTTPTransport.get_JSON', side_effect = mocked_gamesdb)
+    @patch('akl.api.client_get_rom')
+    def test_metadata_cache_is_written_in_batches_to_the_cache_store(self, api_rom_mock: MagicMock, mock_json_downloader, cache_path_mock, addondir_mock):
+        # arrange
+        settings = ScraperSettings()
+        settings.scrape_metadata_policy = constants.SCRAPE_POLICY_SCRAPE_ONLY
+        settings.scrape_assets_policy   = constants.SCRAPE_ACTION_NONE
+
+        rom_id = random_string(5)
+        rom = ROMObj({
+            'id': rom_id,
+            'scanned_data': { 'file':Test_gamesdb_scraper.TEST_ASSETS_DIR + '\\castlevania.zip'},
+            'platform': 'Nintendo NES'
+        })
+        api_rom_mock.return_value = rom
+        scraper = TheGamesDB()
+        ScrapeStrategy(None, 0, settings, scraper, FakeProgressDialog()).process_single_rom(rom_id)
+
+        # act
+        scraper.flush_disk_cache()
+
+        # assert
+        self.assertEqual(1, scraper.disk_cache_store.count(scraper.CACHE_METADATA))
+        self.assertTrue(scraper._check_disk_cache(scraper.CACHE_METADATA, scraper.cache_key))
+        self.assertEqual(1, scraper.get_disk_cache_stats()['batches'])
+
+    @patch('akl.scrapers.kodi.getAddonDir', autospec=True, return_value=FakeFile("/test"))
+    @patch('akl.scrapers.settings.getSettingAsFilePath', autospec=True, return_value=FakeFile("/test"))
+    @patch('resources.lib.scraper.TheGamesDB.SESSION_KEYS_MAX_ENTRIES', 2)
+    def test_indexed_roms_of_a_session_are_bounded(self, cache_path_mock, addondir_mock):
+        # arrange
+        scraper = TheGamesDB()
+        candidate = {'id': 23213, 'display_name': 'Castlevania'}
+
+        # act
+        for index in range(5):
+            scraper._index_game_rom('rom{}'.format(index), candidate)
+
+        # assert
+        self.assertLessEqual(len(scraper.indexed_roms), 2)
+        self.assertEqual(5, len(scraper.game_cache.get(TheGamesDB.GAME_CACHE_ROMS, '23213')))
+
 if __name__ == '__main__':
     unittest.main()
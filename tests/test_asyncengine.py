@@ -0,0 +1,185 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from unittest.mock import patch
+
+from akl import constants
+from akl.utils import io, kodi
+
+from resources.lib.asyncengine import AsyncScraper
+from resources.lib.scraper import TheGamesDB
+from tests.fake_tgdb_server import FakeTGDBServer
+
+
+class FakeROM(object):
+
+    def __init__(self, identifier: str):
+        self.identifier = identifier
+
+    def get_identifier(self):
+        return self.identifier
+
+    def get_platform(self):
+        return 'Nintendo NES'
+
+
+class FakeScraper(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _work(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+
+    def check_candidates_cache(self, identifier, platform):
+        return identifier == 'cached'
+
+    def retrieve_from_candidates_cache(self, identifier, platform):
+        return {'id': 1}
+
+    def get_candidates(self, search_term, rom, platform, status_dic):
+        self._work()
+        if search_term == 'broken':
+            status_dic['status'] = False
+            status_dic['msg'] = 'Network error'
+            return None
+        return [] if search_term == 'unknown' else [{'id': len(search_term)}]
+
+    def resolve_candidate(self, identifier, platform, candidate):
+        return '{}__{}'.format(identifier, platform)
+
+    def get_metadata_for(self, candidate, cache_key, status_dic):
+        self._work()
+        return {'title': cache_key}
+
+    def get_assets_for(self, candidate, cache_key, asset_info_id, status_dic):
+        self._work()
+        return [{'asset_ID': asset_info_id, 'url': 'http://cdn/{}'.format(candidate['id'])}]
+
+
+class Test_asyncengine(unittest.TestCase):
+
+    def setUp(self):
+        self.scraper = FakeScraper()
+        self.target = AsyncScraper(self.scraper, max_concurrency=3)
+
+    def tearDown(self):
+        self.target.close()
+
+    def test_roms_are_scraped_in_order(self):
+        # arrange
+        roms = [FakeROM('cached'), FakeROM('unknown'), FakeROM('metroid')]
+        status_dic = kodi.new_status_dic('Test was OK')
+
+        # act
+        actual = self.target.scrape_roms_sync(roms, ['fanart', 'banner'], status_dic)
+
+        # assert
+        self.assertTrue(status_dic['status'])
+        self.assertEqual(1, actual[0]['candidate']['id'])
+        self.assertIsNone(actual[1])
+        self.assertEqual('metroid__Nintendo NES', actual[2]['metadata']['title'])
+        self.assertEqual(['fanart', 'banner'], list(actual[2]['assets'].keys()))
+
+    def test_concurrency_is_limited(self):
+        # arrange
+        roms = [FakeROM('game {}'.format(index)) for index in range(12)]
+        status_dic = kodi.new_status_dic('Test was OK')
+
+        # act
+        self.target.scrape_roms_sync(roms, ['fanart'], status_dic)
+
+        # assert
+        self.assertLessEqual(self.scraper.max_in_flight, 3)
+        self.assertLess(1, self.scraper.max_in_flight)
+
+    def test_first_error_is_reported(self):
+        # arrange
+        roms = [FakeROM('metroid'), FakeROM('broken')]
+        status_dic = kodi.new_status_dic('Test was OK')
+
+        # act
+        actual = self.target.scrape_roms_sync(roms, [], status_dic)
+
+        # assert
+        self.assertFalse(status_dic['status'])
+        self.assertEqual('Network error', status_dic['msg'])
+        self.assertIsNotNone(actual[0])
+        self.assertIsNone(actual[1])
+
+
+class Test_asyncengine_with_TGDB(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.api_url = TheGamesDB.URL_API
+        self.server = FakeTGDBServer([{'id': 1, 'game_title': 'Castlevania', 'platform': 7, 'release_date': None}]).start()
+        TheGamesDB.set_API_URL(self.server.api_url)
+        with patch('resources.lib.scraper.settings.getSetting', return_value=''), \
+                patch('resources.lib.scraper.settings.getSettingAsFilePath', return_value=io.FileName(self.cache_dir)), \
+                patch('akl.scrapers.kodi.getAddonDir', return_value=io.FileName(self.cache_dir)):
+            self.scraper = TheGamesDB()
+        self.target = AsyncScraper(self.scraper, max_concurrency=3)
+
+    def tearDown(self):
+        self.target.close()
+        TheGamesDB.set_API_URL(self.api_url)
+        self.server.stop()
+        shutil.rmtree(self.cache_dir)
+
+    def test_assets_of_a_game_are_requested_once(self):
+        # arrange
+        asset_IDs = [constants.ASSET_BOXFRONT_ID, constants.ASSET_BOXBACK_ID, constants.ASSET_FANART_ID,
+                     constants.ASSET_SNAP_ID, constants.ASSET_TRAILER_ID]
+        status_dic = kodi.new_status_dic('Test was OK')
+
+        # act
+        actual = self.target.scrape_roms_sync([FakeROM('Castlevania')], asset_IDs, status_dic)
+
+        # assert
+        self.assertTrue(status_dic['status'])
+        self.assertEqual(1, self.server.get_request_counts()['/Games/Images'])
+        self.assertEqual(1, self.server.get_request_counts()['/Games/ByGameID'])
+        self.assertEqual(asset_IDs, list(actual[0]['assets'].keys()))
+        self.assertEqual(1, len(actual[0]['assets'][constants.ASSET_FANART_ID]))
+
+    def test_lookup_tables_are_requested_once_by_concurrent_scrapes(self):
+        # arrange
+        self.server.latency = 0.05
+        self.server.add_games([
+            {'id': id, 'game_title': 'Metroid {}'.format(id), 'platform': 7, 'release_date': None,
+             'genres': [1], 'developers': [7979]} for id in range(2, 8)])
+        candidates = [{'id': id, 'scraper_platform': 7} for id in range(2, 8)]
+        status_dic = kodi.new_status_dic('Test was OK')
+
+        async def scrape_all():
+            return await asyncio.gather(*[
+                self.target.get_metadata(candidate, 'metroid_{}'.format(candidate['id']), status_dic)
+                for candidate in candidates])
+
+        # act
+        actual = asyncio.run(scrape_all())
+
+        # assert
+        self.assertTrue(status_dic['status'])
+        self.assertEqual(6, len([gamedata for gamedata in actual if gamedata]))
+        # Publishers are not part of the scraped metadata.
+        request_counts = self.server.get_request_counts()
+        for endpoint in ['/Genres', '/Developers']:
+            self.assertEqual(1, request_counts[endpoint], endpoint)
+        self.assertNotIn('/Publishers', request_counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
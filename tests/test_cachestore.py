@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from resources.lib.cachestore import CacheStore
+
+
+class Test_cachestore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'TGDB_games.db')
+        self.target = CacheStore(self.db_path)
+
+    def tearDown(self):
+        self.target.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_put_and_get_by_cache_type(self):
+        # arrange
+        self.target.put('game_metadata', '7/1', {'title': 'Super Mario Bros.'})
+
+        # act
+        actual = self.target.get('game_metadata', '7/1')
+        other_type = self.target.get('game_assets', '7/1')
+
+        # assert
+        self.assertEqual({'title': 'Super Mario Bros.'}, actual)
+        self.assertIsNone(other_type)
+        self.assertTrue(self.target.contains('game_metadata', '7/1'))
+        self.assertFalse(self.target.contains('game_assets', '7/1'))
+
+    def test_put_replaces_and_delete_removes(self):
+        # arrange
+        self.target.put('game_assets', '7/1', [1])
+        self.target.put('game_assets', '7/1', [1, 2])
+
+        # act
+        replaced = self.target.get('game_assets', '7/1')
+        self.target.delete('game_assets', '7/1')
+
+        # assert
+        self.assertEqual([1, 2], replaced)
+        self.assertFalse(self.target.contains('game_assets', '7/1'))
+
+    def test_keys_of_a_cache_type(self):
+        # arrange
+        self.target.put('stale_entries', 'metadata/abc', True)
+        self.target.put('stale_entries', 'internal/abc', True)
+        self.target.put('game_roms', '1', {})
+
+        # act
+        actual = self.target.keys('stale_entries')
+
+        # assert
+        self.assertEqual(['internal/abc', 'metadata/abc'], sorted(actual))
+
+    def test_put_many_and_compact(self):
+        # arrange
+        self.target.put_many('metadata', (('rom{}'.format(i), {'title': str(i)}) for i in range(100)))
+        self.target.put('metadata', 'rom1', {'title': 'replaced'})
+
+        # act
+        self.target.compact()
+
+        # assert
+        self.assertEqual(100, self.target.count('metadata'))
+        self.assertEqual({'title': 'replaced'}, self.target.get('metadata', 'rom1'))
+        self.assertEqual({'title': '99'}, self.target.get('metadata', 'rom99'))
+
+    def test_entries_older_than_max_age_are_missing(self):
+        # arrange
+        self.target.put('search_no_results', '7/some homebrew', [])
+
+        # act
+        fresh = self.target.contains('search_no_results', '7/some homebrew', max_age=3600)
+        expired = self.target.contains('search_no_results', '7/some homebrew', max_age=-1)
+
+        # assert
+        self.assertTrue(fresh)
+        self.assertFalse(expired)
+        self.assertIsNone(self.target.get('search_no_results', '7/some homebrew', max_age=-1))
+
+    def test_entries_persist_after_reopen(self):
+        # arrange
+        self.target.put('game_metadata', '7/1', {'year': '1985'})
+        self.target.close()
+
+        # act
+        self.target = CacheStore(self.db_path)
+
+        # assert
+        self.assertEqual({'year': '1985'}, self.target.get('game_metadata', '7/1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
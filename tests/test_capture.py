@@ -0,0 +1,77 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from resources.lib.capture import DebugCapture
+
+
+def read_capture(path: str) -> list:
+    with gzip.open(path, 'rt', encoding='utf-8') as capture_file:
+        return [json.loads(line) for line in capture_file]
+
+
+class Test_capture(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_responses_are_sampled_evenly(self):
+        # arrange
+        target = DebugCapture(self.temp_dir, sample_rate=0.25)
+
+        # act
+        for i in range(20):
+            target.capture('TGDB_get_metadata.json', {'page': i})
+        target.close()
+
+        # assert
+        actual = read_capture(target.get_path())
+        self.assertEqual([3, 7, 11, 15, 19], [line['data']['page'] for line in actual])
+        self.assertEqual('TGDB_get_metadata.json', actual[0]['name'])
+        self.assertEqual(15, target.get_stats()['skipped'])
+
+    def test_flushed_capture_is_readable_while_open(self):
+        # arrange
+        target = DebugCapture(self.temp_dir)
+        target.capture('TGDB_get_genres.json', {'genres': 1})
+
+        # act
+        target.flush()
+        with open(target.get_path(), 'rb') as raw_file:
+            decompressor = gzip.zlib.decompressobj(16 + gzip.zlib.MAX_WBITS)
+            actual = decompressor.decompress(raw_file.read())
+        target.close()
+
+        # assert
+        self.assertEqual({'genres': 1}, json.loads(actual)['data'])
+
+    def test_capture_files_are_rotated_within_the_size_cap(self):
+        # arrange
+        target = DebugCapture(self.temp_dir, max_bytes=3 * 2048, backup_count=2)
+
+        # act
+        for i in range(300):
+            target.capture('TGDB_get_candidates.json', {'page': i, 'noise': os.urandom(64).hex()})
+            # Stay below the queue size, responses are dropped when the writer cannot keep up.
+            if i % 100 == 99:
+                target.flush()
+        target.close()
+
+        # assert
+        files = sorted(os.listdir(self.temp_dir))
+        self.assertEqual(['TGDB_capture.1.jsonl.gz', 'TGDB_capture.2.jsonl.gz'], files[:2])
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.temp_dir, name)) for name in files), 2 * 3 * 2048)
+        self.assertGreater(target.get_stats()['rotations'], 2)
+        self.assertEqual(0, target.get_stats()['dropped'])
+        newest = [line['data']['page'] for index in [1, 0] if os.path.exists(target.get_path(index))
+                  for line in read_capture(target.get_path(index))]
+        self.assertEqual(299, newest[-1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import os
+import tempfile
+
+from resources.lib.downloads import AssetDownloader
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.requested = []
+
+    def get_bytes(self, url, url_log=None):
+        self.requested.append(url)
+        if 'missing' in url:
+            return None, 404
+        return url.encode('utf-8'), 200
+
+
+class Test_downloads(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store_dir = os.path.join(self.temp_dir.name, 'TGDB_images')
+        self.transport = FakeTransport()
+        self.target = AssetDownloader(self.transport, self.store_dir, max_workers=2)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_same_image_is_downloaded_once_for_many_roms(self):
+        # arrange
+        url = 'https://cdn.thegamesdb.net/images/original/boxart/front/338-1.jpg'
+        targets = [os.path.join(self.temp_dir.name, 'boxfronts', f'ff7_disc{disc}.jpg') for disc in range(1, 4)]
+        for target_path in targets:
+            self.target.queue(url, target_path)
+
+        # act
+        actual = self.target.run()
+
+        # assert
+        self.assertEqual([url], self.transport.requested)
+        self.assertTrue(actual[url].startswith(self.store_dir))
+        for target_path in targets:
+            with open(target_path, 'rb') as image_file:
+                self.assertEqual(url.encode('utf-8'), image_file.read())
+        stats = self.target.get_stats()
+        self.assertEqual(1, stats['downloaded'])
+        self.assertEqual(3, stats['copied'])
+
+    def test_stored_images_are_not_downloaded_again(self):
+        # arrange
+        url = 'https://cdn.thegamesdb.net/images/original/fanart/338-1.jpg'
+        self.target.fetch(url)
+
+        # act
+        actual = self.target.fetch(url)
+
+        # assert
+        self.assertEqual(1, len(self.transport.requested))
+        self.assertEqual(self.target.get_store_path(url), actual)
+        self.assertEqual(1, self.target.get_stats()['store_hits'])
+
+    def test_changing_an_asset_keeps_the_stored_image(self):
+        # arrange
+        url = 'https://cdn.thegamesdb.net/images/original/boxart/front/338-1.jpg'
+        target_path = os.path.join(self.temp_dir.name, 'boxfronts', 'ff7_disc1.jpg')
+        self.target.queue(url, target_path)
+        store_path = self.target.run()[url]
+
+        # act
+        with open(target_path, 'wb') as image_file:
+            image_file.write(b'edited')
+
+        # assert
+        with open(store_path, 'rb') as image_file:
+            self.assertEqual(url.encode('utf-8'), image_file.read())
+
+    def test_store_is_pruned_to_its_size_cap_least_recently_used_first(self):
+        # arrange
+        self.target.max_bytes = 2 * len('https://cdn.thegamesdb.net/images/original/fanart/1-1.jpg')
+        urls = ['https://cdn.thegamesdb.net/images/original/fanart/{}-1.jpg'.format(index) for index in range(1, 4)]
+        for mtime, url in enumerate(urls[:2]):
+            store_path = self.target.fetch(url)
+            os.utime(store_path, (1000 + mtime, 1000 + mtime))
+        self.target.get_stored_path(urls[0])
+
+        # act
+        self.target.queue(urls[2])
+        self.target.run()
+
+        # assert
+        self.assertIsNotNone(self.target.get_stored_path(urls[0]))
+        self.assertIsNone(self.target.get_stored_path(urls[1]))
+        self.assertIsNotNone(self.target.get_stored_path(urls[2]))
+        self.assertEqual(1, self.target.get_stats()['evicted'])
+
+    def test_image_sizes_are_stored_separately(self):
+        original = self.target.get_store_path('https://cdn.thegamesdb.net/images/original/fanart/338-1.jpg')
+        thumb = self.target.get_store_path('https://cdn.thegamesdb.net/images/thumb/fanart/338-1.jpg')
+        self.assertNotEqual(original, thumb)
+        self.assertTrue(original.endswith('.jpg'))
+
+    def test_failed_downloads_are_not_copied(self):
+        # arrange
+        url = 'https://cdn.thegamesdb.net/images/original/missing.png'
+        target_path = os.path.join(self.temp_dir.name, 'missing.png')
+        self.target.queue(url, target_path)
+
+        # act
+        actual = self.target.run()
+
+        # assert
+        self.assertIsNone(actual[url])
+        self.assertFalse(os.path.exists(target_path))
+        self.assertEqual(1, self.target.get_stats()['failed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
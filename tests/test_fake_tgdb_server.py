@@ -0,0 +1,94 @@
+import time
+import unittest
+
+from resources.lib.transport import HTTPTransport
+from tests.fake_tgdb_server import FakeTGDBServer
+
+
+def fake_game(id: int, title: str, platform: int = 7) -> dict:
+    return {'id': id, 'game_title': title, 'platform': platform, 'release_date': None}
+
+
+class Test_fake_tgdb_server(unittest.TestCase):
+
+    def setUp(self):
+        games = [fake_game(id, 'Castlevania {}'.format(id)) for id in range(1, 46)]
+        games.append(fake_game(100, 'Castlevania Bloodlines', platform=18))
+        self.server = FakeTGDBServer(games, page_size=20, monthly_allowance=10).start()
+        self.transport = HTTPTransport()
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def test_searches_are_paged_with_next_links(self):
+        # act
+        titles = []
+        url = self.server.api_url + '/Games/ByGameName?apikey=123&name=castlevania&filter[platform]=7'
+        while url:
+            json_data, http_code = self.transport.get_JSON(url)
+            self.assertEqual(200, http_code)
+            titles.extend(game['game_title'] for game in json_data['data']['games'])
+            url = json_data['pages']['next']
+
+        # assert
+        self.assertEqual(45, len(titles))
+        self.assertEqual(3, self.server.get_request_counts()['/Games/ByGameName'])
+
+    def test_allowance_decrements_until_forbidden(self):
+        # act
+        allowances = []
+        for _ in range(10):
+            json_data, _ = self.transport.get_JSON(self.server.api_url + '/Games/ByGameID?id=1')
+            allowances.append(json_data['remaining_monthly_allowance'])
+        json_data, http_code = self.transport.get_JSON(self.server.api_url + '/Games/ByGameID?id=1')
+
+        # assert
+        self.assertEqual(list(range(9, -1, -1)), allowances)
+        self.assertEqual(403, http_code)
+
+    def test_updates_feed_lists_edits_after_the_last_edit_id(self):
+        # arrange
+        self.server.edit_game(1, 'game_title', 'Castlevania I')
+        self.server.edit_game(2, 'players', 2)
+        self.server.edit_game(1, 'overview', 'Vampire hunting.')
+
+        # act
+        json_data, http_code = self.transport.get_JSON(self.server.api_url + '/Games/Updates?last_edit_id=1')
+
+        # assert
+        self.assertEqual(200, http_code)
+        self.assertEqual([(2, 2), (3, 1)], [(update['edit_id'], update['game_id'])
+                                            for update in json_data['data']['updates']])
+
+    def test_queued_errors_are_returned_in_order(self):
+        # arrange
+        self.server.queue_errors(429, 503)
+        url = self.server.api_url + '/Genres?apikey=123'
+
+        # act
+        http_codes = [self.transport.get_JSON(url)[1] for _ in range(3)]
+
+        # assert
+        self.assertEqual([429, 503, 200], http_codes)
+
+    def test_images_link_to_the_fake_cdn(self):
+        # arrange
+        self.server.image_latency = 0.05
+        json_data, _ = self.transport.get_JSON(self.server.api_url + '/Games/Images?games_id=1%2C2')
+        images = json_data['data']['images']
+        image_url = json_data['data']['base_url']['original'] + images['1'][0]['filename']
+
+        # act
+        start_time = time.monotonic()
+        image_data, http_code = self.transport.get_bytes(image_url)
+
+        # assert
+        self.assertEqual(['1', '2'], sorted(images.keys()))
+        self.assertEqual(200, http_code)
+        self.assertTrue(image_data)
+        self.assertLessEqual(0.05, time.monotonic() - start_time)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+
+from resources.lib.httpcache import ResponseCache
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Test_httpcache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.target = ResponseCache(':memory:', max_bytes=100, clock=self.clock)
+
+    def tearDown(self):
+        self.target.close()
+
+    def test_hit_and_miss(self):
+        # arrange
+        self.target.put('https://api.thegamesdb.net/v1/Genres?', b'{"genres": 1}')
+
+        # act
+        hit = self.target.get('https://api.thegamesdb.net/v1/Genres?', ttl=60)
+        miss = self.target.get('https://api.thegamesdb.net/v1/Developers?', ttl=60)
+
+        # assert
+        self.assertEqual(b'{"genres": 1}', hit)
+        self.assertIsNone(miss)
+        stats = self.target.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(13, stats['bytes_read'])
+
+    def test_entries_expire_after_ttl(self):
+        # arrange
+        self.target.put('search', b'data')
+
+        # act
+        self.clock.now += 61
+        actual = self.target.get('search', ttl=60)
+
+        # assert
+        self.assertIsNone(actual)
+        self.assertEqual(1, self.target.get_stats()['expired'])
+        self.assertEqual(0, self.target.get_stats()['total_bytes'])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        # arrange
+        self.target.put('a', b'x' * 40)
+        self.clock.now += 1
+        self.target.put('b', b'x' * 40)
+        self.clock.now += 1
+        self.target.get('a', ttl=60)
+        self.clock.now += 1
+
+        # act
+        self.target.put('c', b'x' * 40)
+
+        # assert
+        self.assertIsNotNone(self.target.get('a', ttl=60))
+        self.assertIsNone(self.target.get('b', ttl=60))
+        self.assertIsNotNone(self.target.get('c', ttl=60))
+        self.assertEqual(1, self.target.get_stats()['evictions'])
+        self.assertEqual(80, self.target.get_stats()['total_bytes'])
+
+    def test_access_times_are_kept_when_reopened(self):
+        # arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, 'responses.db')
+            target = ResponseCache(db_path, max_bytes=100, clock=self.clock)
+            target.put('a', b'x' * 40)
+            self.clock.now += 1
+            target.put('b', b'x' * 40)
+            self.clock.now += 1
+            target.get('a', ttl=60)
+            target.close()
+
+            # act
+            target = ResponseCache(db_path, max_bytes=100, clock=self.clock)
+            target.put('c', b'x' * 40)
+
+            # assert
+            self.assertIsNotNone(target.get('a', ttl=60))
+            self.assertIsNone(target.get('b', ttl=60))
+            target.close()
+
+    def test_replacing_an_entry_keeps_size_accounting(self):
+        # act
+        self.target.put('a', b'x' * 40)
+        self.target.put('a', b'x' * 10)
+
+        # assert
+        self.assertEqual(10, self.target.get_stats()['total_bytes'])
+
+    def test_keys_containing_an_endpoint(self):
+        # arrange
+        self.target.put('https://api.thegamesdb.net/v1/Games/ByGameID?id=1%2C2', b'1')
+        self.target.put('https://api.thegamesdb.net/Games/ByGameID?id=3&page=2', b'2')
+        self.target.put('https://api.thegamesdb.net/v1/Games/Images?games_id=1', b'3')
+
+        # act
+        actual = self.target.get_keys('/Games/ByGameID?')
+
+        # assert
+        self.assertEqual(2, len(actual))
+        self.assertTrue(all('/Games/ByGameID?' in key for key in actual))
+
+    def test_too_large_entries_are_not_cached(self):
+        # act
+        self.target.put('a', b'x' * 101)
+
+        # assert
+        self.assertIsNone(self.target.get('a', ttl=60))
+
+
+if __name__ == '__main__':
+    unittest.main()
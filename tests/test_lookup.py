@@ -0,0 +1,65 @@
+import unittest
+import os
+import tempfile
+
+from resources.lib.lookup import CompactLookupTable
+
+developers = {
+    '7979': 'Konami',
+    '1389': 'Bungie',
+    '6037': 'Nintendo EAD',
+    '42': 'Dæmon Software'
+}
+
+
+class Test_lookup(unittest.TestCase):
+
+    def test_lookup_by_integer_or_string_id(self):
+        # arrange
+        target = CompactLookupTable.from_mapping(developers)
+
+        # act / assert
+        self.assertEqual('Konami', target.get(7979))
+        self.assertEqual('Bungie', target['1389'])
+        self.assertEqual('Dæmon Software', target[42])
+        self.assertEqual(4, len(target))
+
+    def test_unknown_ids(self):
+        # arrange
+        target = CompactLookupTable.from_mapping(developers)
+
+        # act / assert
+        self.assertIsNone(target.get(1))
+        self.assertIsNone(target.get(99999))
+        self.assertNotIn(5000, target)
+        with self.assertRaises(KeyError):
+            target[1]
+
+    def test_saved_table_is_loaded_with_mmap(self):
+        # arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            table_path = os.path.join(temp_dir, 'TGDB_developers.tbl')
+            CompactLookupTable.save(table_path, developers)
+
+            # act
+            target = CompactLookupTable.load(table_path)
+
+            # assert
+            for id, name in developers.items():
+                self.assertEqual(name, target[int(id)])
+
+    def test_empty_table(self):
+        # arrange
+        target = CompactLookupTable.from_mapping({})
+
+        # act / assert
+        self.assertEqual(0, len(target))
+        self.assertIsNone(target.get(1))
+
+    def test_invalid_data_is_rejected(self):
+        with self.assertRaises(ValueError):
+            CompactLookupTable(b'JSON' + bytes(8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from resources.lib.manifest import read_manifest
+
+
+class Test_manifest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_manifest(self, filename: str, contents: str) -> str:
+        manifest_path = os.path.join(self.temp_dir, filename)
+        with open(manifest_path, 'w', encoding='utf-8') as manifest_file:
+            manifest_file.write(contents)
+        return manifest_path
+
+    def test_csv_manifest(self):
+        # arrange
+        manifest_path = self.write_manifest('roms.csv', (
+            'Filename,Platform\n'
+            '/roms/nes/Castlevania (USA).zip,Nintendo NES\n'
+            '"/roms/md/Sonic the Hedgehog, The (Europe).zip",Sega Mega Drive\n'))
+
+        # act
+        actual = list(read_manifest(manifest_path))
+
+        # assert
+        self.assertEqual(2, len(actual))
+        self.assertEqual('Castlevania (USA)', actual[0].identifier)
+        self.assertEqual('Nintendo NES', actual[0].platform)
+        self.assertEqual('Sonic the Hedgehog, The (Europe)', actual[1].identifier)
+        self.assertEqual(1, actual[1].index)
+
+    def test_jsonl_manifest_skips_invalid_entries(self):
+        # arrange
+        manifest_path = self.write_manifest('roms.jsonl', (
+            '{"file": "C:\\\\roms\\\\Metroid.nes", "platform": "Nintendo NES"}\n'
+            '\n'
+            'not json\n'
+            '{"file": "Chakan.zip"}\n'
+            '{"path": "Chakan.zip", "platform": "Sega Mega Drive"}\n'))
+
+        # act
+        actual = list(read_manifest(manifest_path))
+
+        # assert
+        self.assertEqual(['Metroid', 'Chakan'], [entry.identifier for entry in actual])
+        self.assertEqual([0, 1], [entry.index for entry in actual])
+
+
+if __name__ == '__main__':
+    unittest.main()
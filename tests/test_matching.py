@@ -0,0 +1,51 @@
+import unittest
+
+from resources.lib.matching import TitleMatcher, normalize_title
+
+
+class Test_matching(unittest.TestCase):
+
+    def test_normalize_title_removes_tags_case_and_punctuation(self):
+        self.assertEqual('sonic the hedgehog', normalize_title('Sonic The Hedgehog (USA, Europe) [!]'))
+        self.assertEqual('castlevania the lecarde chronicles',
+                         normalize_title('Castlevania - The Lecarde Chronicles'))
+
+    def test_same_normalized_title_is_full_confidence(self):
+        # arrange
+        target = TitleMatcher('Sonic The Hedgehog')
+
+        # act
+        actual = target.score('Sonic the Hedgehog (USA, Europe)')
+
+        # assert
+        self.assertEqual(1.0, actual)
+
+    def test_near_misses_rank_above_unrelated_titles(self):
+        # arrange
+        target = TitleMatcher('Sonic the Hedgehog')
+        titles = ['Knuckles Chaotix', 'Sonic the Hedgehog 2', 'Sonic the Hedgehog', 'Sonic Spinball']
+
+        # act
+        actual = sorted(titles, key=target.score, reverse=True)
+
+        # assert
+        self.assertEqual(['Sonic the Hedgehog', 'Sonic the Hedgehog 2', 'Sonic Spinball', 'Knuckles Chaotix'], actual)
+
+    def test_only_exact_match_reaches_full_confidence(self):
+        # arrange
+        target = TitleMatcher('Final Fantasy VII')
+
+        # act
+        actual = target.score('Final Fantasy VIII')
+
+        # assert
+        self.assertLess(actual, 1.0)
+        self.assertGreater(actual, 0.5)
+
+    def test_empty_titles_have_no_confidence(self):
+        self.assertEqual(0.0, TitleMatcher('').score('Metroid'))
+        self.assertEqual(0.0, TitleMatcher('Metroid').score('(USA)'))
+
+
+if __name__ == '__main__':
+    unittest.main()
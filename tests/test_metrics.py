@@ -0,0 +1,72 @@
+import unittest
+
+from resources.lib.metrics import ScrapeMetrics
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Test_metrics(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.target = ScrapeMetrics(clock=self.clock)
+
+    def test_requests_are_recorded_per_endpoint(self):
+        # arrange
+        self.target.record_request('/Games/ByGameName', 0.04, 100, 200, 500)
+        self.target.record_request('/Games/ByGameName', 0.3, 300, 200, 499)
+        self.target.record_request('/Games/ByGameName', 9.0, 0, None)
+        self.target.record_request('/Genres', 0.1, 50, 429, 498)
+        self.clock.now += 12
+
+        # act
+        report = self.target.get_report()
+
+        # assert
+        search = report['endpoints']['/Games/ByGameName']
+        self.assertEqual(3, search['requests'])
+        self.assertEqual(400, search['bytes'])
+        self.assertEqual([1, 0, 0, 1, 0, 0, 0, 1], search['latency_histogram'])
+        self.assertEqual({'network': 1}, search['errors'])
+        self.assertAlmostEqual(9.0, search['max_seconds'])
+        self.assertEqual({'429': 1}, report['endpoints']['/Genres']['errors'])
+        self.assertEqual(498, report['remaining_allowance'])
+        self.assertEqual(12, report['duration_seconds'])
+
+    def test_cache_hit_rates_per_tier(self):
+        # arrange
+        for hit in [True, True, True, False]:
+            self.target.record_cache('metadata', hit)
+        self.target.record_cache('responses', False)
+
+        # act
+        report = self.target.get_report()
+
+        # assert
+        self.assertEqual({'hits': 3, 'misses': 1, 'hit_rate': 0.75}, report['caches']['metadata'])
+        self.assertEqual(0.0, report['caches']['responses']['hit_rate'])
+
+    def test_describe_summarizes_the_report(self):
+        # arrange
+        self.target.record_request('/Games/ByGameID', 0.2, 10, 200, 42)
+        self.target.record_cache('metadata', True)
+
+        # act
+        actual = self.target.describe()
+
+        # assert
+        self.assertIn('TGDB requests: 1 (0 errors', actual)
+        self.assertIn('/Games/ByGameID: 1 requests, 200 ms mean', actual)
+        self.assertIn('Cache metadata: 100% hits of 1', actual)
+        self.assertIn('Remaining allowance: 42', actual)
+
+
+if __name__ == '__main__':
+    unittest.main()
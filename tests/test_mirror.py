@@ -0,0 +1,119 @@
+import unittest
+
+from unittest.mock import patch
+
+from resources.lib.mirror import TGDBMirror
+
+dump = {
+    'code': 200,
+    'data': {
+        'count': 3,
+        'games': [
+            {'id': 1, 'game_title': 'Sonic the Hedgehog', 'platform': 36, 'players': 1, 'genres': [15]},
+            {'id': 2, 'game_title': 'Sonic the Hedgehog 2', 'platform': 36, 'players': 2, 'genres': [15]},
+            {'id': 3, 'game_title': 'Sonic the Hedgehog', 'platform': 20, 'players': 1, 'genres': [15]}
+        ]
+    },
+    'include': {
+        'boxart': {
+            'base_url': {
+                'original': 'https://cdn.thegamesdb.net/images/original/',
+                'thumb': 'https://cdn.thegamesdb.net/images/thumb/'
+            },
+            'data': {
+                '1': [{'id': 10, 'type': 'boxart', 'side': 'front', 'filename': 'boxart/front/1-1.jpg'}]
+            }
+        }
+    }
+}
+
+
+class Test_mirror(unittest.TestCase):
+
+    def setUp(self):
+        self.target = TGDBMirror(':memory:')
+        self.target.import_dump(dump)
+
+    def tearDown(self):
+        self.target.close()
+
+    def test_search_matches_all_words_on_any_platform(self):
+        # act
+        actual = self.target.search('sonic hedgehog', 0)
+
+        # assert
+        self.assertEqual([1, 2, 3], sorted([game['id'] for game in actual]))
+
+    def test_search_filters_on_platform(self):
+        # act
+        actual = self.target.search('Sonic the Hedgehog', 20)
+
+        # assert
+        self.assertEqual([3], [game['id'] for game in actual])
+
+    def test_search_filters_on_several_platforms(self):
+        # act
+        actual = self.target.search('Sonic the Hedgehog', (20, 4955))
+
+        # assert
+        self.assertEqual([3], [game['id'] for game in actual])
+        self.assertEqual([1, 2, 3], sorted([game['id'] for game in self.target.search('Sonic', (36, 20))]))
+
+    def test_search_without_words_returns_nothing(self):
+        self.assertEqual([], self.target.search(' - ', 0))
+
+    def test_get_game_returns_API_shaped_data(self):
+        # act
+        actual = self.target.get_game(2)
+
+        # assert
+        self.assertEqual('Sonic the Hedgehog 2', actual['game_title'])
+        self.assertEqual(2, actual['players'])
+        self.assertIsNone(self.target.get_game(99))
+
+    def test_get_images_page_returns_API_shaped_data(self):
+        # act
+        actual = self.target.get_images_page(1)
+
+        # assert
+        self.assertEqual('boxart/front/1-1.jpg', actual['data']['images']['1'][0]['filename'])
+        self.assertIn('original', actual['data']['base_url'])
+        self.assertIsNone(actual['pages']['next'])
+        self.assertIsNone(self.target.get_images_page(2))
+
+    @patch.object(TGDBMirror, 'SEARCH_LIMIT', 1)
+    def test_search_returns_exact_title_before_the_limit(self):
+        # arrange
+        self.target.import_dump({'data': {'games': [{'id': 4, 'game_title': 'Sonic', 'platform': 36}]}})
+
+        # act
+        actual = self.target.search('Sonic', 36)
+
+        # assert
+        self.assertEqual([4], [game['id'] for game in actual])
+
+    @patch.object(TGDBMirror, 'SEARCH_LIMIT', 1)
+    def test_search_without_FTS_returns_exact_title_before_the_limit(self):
+        # arrange
+        self.target.has_fts = False
+        self.target.import_dump({'data': {'games': [{'id': 4, 'game_title': 'Sonic', 'platform': 36}]}})
+
+        # act
+        actual = self.target.search('sonic', 36)
+
+        # assert
+        self.assertEqual([4], [game['id'] for game in actual])
+
+    def test_search_without_FTS(self):
+        # arrange
+        self.target.has_fts = False
+
+        # act
+        actual = self.target.search('hedgehog 2', 36)
+
+        # assert
+        self.assertEqual([2], [game['id'] for game in actual])
+
+
+if __name__ == '__main__':
+    unittest.main()
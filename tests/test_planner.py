@@ -0,0 +1,117 @@
+import unittest
+
+from resources.lib.planner import QuotaPlan
+
+
+class Test_planner(unittest.TestCase):
+
+    def test_batched_calls_are_counted_per_distinct_game(self):
+        # arrange
+        target = QuotaPlan(allowance=100, metadata_batch_size=20, images_batch_size=20)
+
+        # act
+        for disc in range(4):
+            target.add_rom(f'ff7_disc{disc}', 0, '338', True, True)
+        target.add_rom('castlevania', 1, 'NES/castlevania', True, True)
+        target.add_lookup_table()
+
+        # assert
+        self.assertEqual(1, target.search_calls)
+        self.assertEqual(1, target.metadata_calls)
+        self.assertEqual(1, target.images_calls)
+        self.assertEqual(4, target.total_calls)
+        self.assertTrue(target.fits_allowance())
+
+    def test_cached_roms_cost_nothing(self):
+        # arrange
+        target = QuotaPlan(allowance=0)
+
+        # act
+        target.add_rom('metroid', 0, '1', False, False)
+
+        # assert
+        self.assertEqual(0, target.total_calls)
+        self.assertEqual(1, target.num_cached_roms)
+        self.assertTrue(target.fits_allowance())
+
+    def test_skipped_roms_are_not_counted_as_cached(self):
+        # arrange
+        target = QuotaPlan(allowance=10)
+
+        # act
+        target.add_rom('metroid', 0, '1', False, False)
+        target.add_rom('homebrew', 0, None, False, False, skipped=True)
+        target.add_rom('prototype', 0, None, False, False, skipped=True)
+
+        # assert
+        self.assertEqual(1, target.num_cached_roms)
+        self.assertEqual(2, target.num_skipped_roms)
+        self.assertEqual(0, target.total_calls)
+        self.assertIn('ROMs in batch: 3 (1 fully cached)', target.describe())
+        self.assertIn('2 ROMs will not be scraped', target.describe())
+
+    def test_roms_are_trimmed_cheapest_first(self):
+        # arrange
+        target = QuotaPlan(allowance=2)
+        target.add_rom('search_a', 1, 'a', True, False)
+        target.add_rom('cached', 0, 'b', False, False)
+        target.add_rom('metadata_only', 0, 'c', True, False)
+        target.add_rom('search_d', 1, 'd', True, False)
+
+        # act
+        actual = target.roms_within_allowance()
+
+        # assert
+        self.assertFalse(target.fits_allowance())
+        self.assertEqual(['cached', 'metadata_only'], actual)
+        self.assertIn('Only about 2 ROMs fit', target.describe())
+
+    def test_searches_are_estimated_per_search_term(self):
+        # arrange
+        target = QuotaPlan(allowance=10)
+
+        # act
+        target.add_rom('the_legend_of_zelda', 3, 'a', False, False, 30)
+        target.add_rom('metroid', 1, 'b', False, False, 10)
+
+        # assert
+        self.assertEqual(4, target.search_calls)
+        self.assertEqual(40, target.max_search_calls)
+        self.assertTrue(target.fits_allowance())
+        self.assertIn('Searches: 4 (at most 40)', target.describe())
+
+    def test_only_plans_using_a_large_share_of_the_allowance_are_confirmed(self):
+        # arrange
+        small = QuotaPlan(allowance=100)
+        large = QuotaPlan(allowance=100)
+        unknown = QuotaPlan()
+
+        # act
+        for index in range(10):
+            small.add_rom(f'small_{index}', 1, str(index), False, False)
+            unknown.add_rom(f'unknown_{index}', 1, str(index), False, False)
+        for index in range(60):
+            large.add_rom(f'large_{index}', 1, str(index), False, False)
+
+        # assert
+        self.assertFalse(small.needs_confirmation())
+        self.assertTrue(large.needs_confirmation())
+        self.assertFalse(unknown.needs_confirmation())
+        self.assertFalse(QuotaPlan(allowance=0).needs_confirmation())
+
+    def test_unknown_allowance_keeps_all_roms(self):
+        # arrange
+        target = QuotaPlan()
+        target.add_rom('search_a', 1, 'a', False, False)
+        target.add_rom('cached', 0, 'b', False, False)
+
+        # act
+        actual = target.roms_within_allowance()
+
+        # assert
+        self.assertEqual(['cached', 'search_a'], actual)
+        self.assertIn('Remaining allowance: unknown', target.describe())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from collections import namedtuple
+
+from resources.lib.platformindex import PlatformIndex
+
+Platform = namedtuple('Platform', ['long_name', 'compact_name', 'aliasof'])
+
+unknown = Platform('Unknown', 'unknown', None)
+akl_platforms = [
+    Platform('Microsoft MS-DOS', 'msdos', None),
+    Platform('Microsoft Windows', 'windows', None),
+    Platform('Nintendo DS', 'nds', None),
+    Platform('Nintendo DSi', 'ndsi', None),
+    Platform('Sega Mega Drive', 'megadrive', None),
+    Platform('Sega Genesis', 'genesis', 'megadrive'),
+    Platform('Nintendo NES', 'nes', None),
+    Platform('NEC PC Engine', 'pce', None),
+    Platform('NEC PC Engine CDROM2', 'pcecd', 'pce'),
+    Platform('NEC SuperGrafx', 'sgx', 'pce'),
+    unknown
+]
+mapping = {
+    'msdos': 1,
+    'nds': 8,
+    'ndsi': 8,
+    'windows': 1,
+    'megadrive': 36,
+    'nes': 7,
+    'pce': 34,
+    'pcecd': 4955,
+    'sgx': 34,
+    'not_in_akl': 4999
+}
+
+
+class Test_platformindex(unittest.TestCase):
+
+    def test_AKL_platforms_and_aliases_to_TGDB(self):
+        # arrange
+        target = PlatformIndex(mapping, akl_platforms, unknown)
+
+        # act / assert
+        self.assertEqual(1, target.get_tgdb_id('Microsoft Windows'))
+        self.assertEqual(8, target.get_tgdb_id('Nintendo DSi'))
+        self.assertEqual(36, target.get_tgdb_id('Sega Genesis'))
+        self.assertEqual(0, target.get_tgdb_id('Unknown'))
+        self.assertEqual(0, target.get_tgdb_id('Not a platform'))
+
+    def test_shared_TGDB_ids_resolve_to_the_first_mapped_platform(self):
+        # arrange
+        target = PlatformIndex(mapping, akl_platforms, unknown)
+
+        # act / assert
+        self.assertEqual('msdos', target.get_platform(1).compact_name)
+        self.assertEqual('nds', target.get_platform(8).compact_name)
+        self.assertEqual(['msdos', 'windows'], [p.compact_name for p in target.get_platform_group(1)])
+        self.assertEqual(['megadrive', 'genesis'], [p.compact_name for p in target.get_platform_group(36)])
+
+    def test_search_ids_of_alias_families(self):
+        # arrange
+        target = PlatformIndex(mapping, akl_platforms, unknown)
+
+        # act / assert
+        self.assertEqual((34, 4955), target.get_tgdb_ids('NEC PC Engine'))
+        self.assertEqual((4955, 34), target.get_tgdb_ids('NEC PC Engine CDROM2'))
+        self.assertEqual((34, 4955), target.get_tgdb_ids('NEC SuperGrafx'))
+        self.assertEqual((36,), target.get_tgdb_ids('Sega Genesis'))
+        self.assertEqual((1,), target.get_tgdb_ids('Microsoft Windows'))
+        self.assertEqual((), target.get_tgdb_ids('Not a platform'))
+
+    def test_unknown_TGDB_ids(self):
+        # arrange
+        target = PlatformIndex(mapping, akl_platforms, unknown)
+
+        # act / assert
+        self.assertIs(unknown, target.get_platform(4999))
+        self.assertIs(unknown, target.get_platform(123456))
+        self.assertEqual((), target.get_platform_group(123456))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from resources.lib.searchterms import clean_search_term, search_term_cascade
+
+
+class Test_searchterms(unittest.TestCase):
+
+    def test_no_intro_tags_and_extension_are_removed(self):
+        self.assertEqual('Sonic the Hedgehog', clean_search_term('Sonic the Hedgehog (USA, Europe).zip'))
+
+    def test_redump_disc_markers_are_removed(self):
+        self.assertEqual('Final Fantasy VII', clean_search_term('Final Fantasy VII (USA) (Disc 1)'))
+        self.assertEqual('The Oregon Trail', clean_search_term('The Oregon Trail Disk 2'))
+
+    def test_tosec_tags_and_revisions_are_removed(self):
+        self.assertEqual('Street Fighter II', clean_search_term('Street Fighter II v1.1 (1991)(Capcom)[!]'))
+        self.assertEqual('Metroid', clean_search_term('Metroid (Rev A)'))
+
+    def test_titles_looking_like_markers_are_kept(self):
+        self.assertEqual('Revolution X', clean_search_term('Revolution X'))
+        self.assertEqual('Sonic CD', clean_search_term('Sonic CD'))
+        self.assertEqual('Dr. Mario', clean_search_term('Dr. Mario'))
+
+    def test_trailing_article_is_moved_to_the_front(self):
+        self.assertEqual(
+            'The Legend of Zelda - A Link to the Past',
+            clean_search_term('Legend of Zelda, The - A Link to the Past (USA)'))
+
+    def test_cascade_goes_from_strict_to_loose(self):
+        # act
+        actual = search_term_cascade('Legend of Zelda, The - A Link to the Past (USA) (Rev 1)')
+
+        # assert
+        self.assertEqual([
+            'The Legend of Zelda - A Link to the Past',
+            'Legend of Zelda - A Link to the Past',
+            'Legend of Zelda'
+        ], actual)
+
+    def test_cascade_has_no_duplicate_terms(self):
+        self.assertEqual(['Sonic the Hedgehog'], search_term_cascade('Sonic the Hedgehog (USA, Europe)'))
+
+    def test_cascade_keeps_terms_which_are_only_tags(self):
+        self.assertEqual(['(USA)'], search_term_cascade('(USA)'))
+
+
+if __name__ == '__main__':
+    unittest.main()
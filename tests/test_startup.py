@@ -0,0 +1,22 @@
+import unittest
+
+from tests.benchmarks.startup_benchmark import HEAVY_MODULES, get_startup_imports
+
+
+class Test_startup(unittest.TestCase):
+
+    def test_default_does_not_import_the_scraper_stack_at_startup(self):
+        # act
+        actual = get_startup_imports()
+
+        # assert
+        self.assertIn('import xbmcaddon', actual)
+        for statement in actual:
+            for heavy_module in HEAVY_MODULES:
+                self.assertNotIn(heavy_module, statement)
+            self.assertNotIn('import api', statement)
+            self.assertNotIn('import ScraperSettings', statement)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import threading
+
+from resources.lib.throttle import RateLimiter
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Test_throttle(unittest.TestCase):
+
+    def test_burst_is_limited_to_capacity(self):
+        # arrange
+        clock = FakeClock()
+        target = RateLimiter(rate=1000, capacity=3, clock=clock)
+
+        # act
+        for _ in range(3):
+            self.assertTrue(target.acquire())
+
+        # assert
+        self.assertLess(target.tokens, 1)
+
+    def test_tokens_are_refilled_over_time(self):
+        # arrange
+        clock = FakeClock()
+        target = RateLimiter(rate=2, capacity=2, clock=clock)
+        target.acquire()
+        target.acquire()
+
+        # act
+        clock.now = 1.0
+        target._refill()
+
+        # assert
+        self.assertEqual(2, target.tokens)
+
+    def test_exhausted_allowance_stops_limiter(self):
+        # arrange
+        target = RateLimiter(rate=1000, capacity=10)
+        target.update_allowance(2)
+
+        # act
+        actual = [target.acquire() for _ in range(3)]
+
+        # assert
+        self.assertEqual([True, True, False], actual)
+        self.assertTrue(target.is_stopped())
+
+    def test_lowest_allowance_is_kept(self):
+        # arrange
+        target = RateLimiter(rate=1000, capacity=10)
+
+        # act
+        target.update_allowance(50)
+        target.update_allowance(80)
+
+        # assert
+        self.assertEqual(50, target.allowance)
+
+    def test_stop_wakes_up_waiting_workers(self):
+        # arrange
+        target = RateLimiter(rate=0.01, capacity=1)
+        target.acquire()
+        results = []
+        worker = threading.Thread(target=lambda: results.append(target.acquire()))
+        worker.start()
+
+        # act
+        target.stop()
+        worker.join(timeout=5)
+
+        # assert
+        self.assertFalse(worker.is_alive())
+        self.assertEqual([False], results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import gzip
+import json
+import threading
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from resources.lib.transport import HTTPTransport
+
+
+class FakeTGDBHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.startswith('/corrupt'):
+            body = b'not gzip data'
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path.startswith('/redirect'):
+            self.send_response(302)
+            self.send_header('Location', '/v1/Genres')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'code': 200, 'path': self.path}).encode('utf-8')
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Test_transport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), FakeTGDBHandler)
+        cls.base_url = 'http://127.0.0.1:{}'.format(cls.server.server_address[1])
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connections_are_reused(self):
+        # arrange
+        target = HTTPTransport()
+
+        # act
+        for _ in range(3):
+            data, http_code = target.get_JSON(self.base_url + '/v1/Genres?apikey=123')
+            self.assertEqual(200, http_code)
+        target.close()
+
+        # assert
+        stats = target.get_stats()
+        self.assertEqual(3, stats['requests'])
+        self.assertEqual(1, stats['connections_opened'])
+        self.assertEqual(2, stats['connections_reused'])
+
+    def test_gzip_responses_are_decoded(self):
+        # arrange
+        target = HTTPTransport()
+
+        # act
+        data, http_code = target.get_JSON(self.base_url + '/v1/Developers')
+        target.close()
+
+        # assert
+        self.assertEqual('/v1/Developers', data['path'])
+        stats = target.get_stats()
+        self.assertLess(0, stats['bytes_received'])
+        self.assertNotEqual(stats['bytes_received'], stats['bytes_decoded'])
+        self.assertEqual(stats['bytes_received'], target.get_last_bytes_received())
+
+    def test_redirects_are_followed(self):
+        # arrange
+        target = HTTPTransport()
+
+        # act
+        data, http_code = target.get_JSON(self.base_url + '/redirect')
+        target.close()
+
+        # assert
+        self.assertEqual(200, http_code)
+        self.assertEqual('/v1/Genres', data['path'])
+
+    def test_corrupt_compressed_responses_return_no_http_code(self):
+        # arrange
+        target = HTTPTransport()
+
+        # act
+        data, http_code = target.get_JSON(self.base_url + '/corrupt')
+        target.close()
+
+        # assert
+        self.assertIsNone(data)
+        self.assertIsNone(http_code)
+        self.assertEqual(1, target.get_stats()['errors'])
+
+    def test_network_errors_return_no_http_code(self):
+        # arrange
+        target = HTTPTransport()
+
+        # act
+        data, http_code = target.get_bytes('http://127.0.0.1:1/images/original/boxart.jpg')
+
+        # assert
+        self.assertIsNone(data)
+        self.assertIsNone(http_code)
+        self.assertEqual(1, target.get_stats()['errors'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Imports the TGDB public JSON database dump into an offline mirror database.
+# Usage, from the repository root: python -m tools.import_TGDB_dump database-latest.json TGDB_mirror.db
+#
+# --- Information about the dump ---
+# https://cdn.thegamesdb.net/json/database-latest.json
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+import sys
+import json
+
+import logging
+
+from resources.lib.mirror import TGDBMirror
+
+
+logging.basicConfig(format='%(asctime)s %(module)s %(levelname)s: %(message)s',
+                    datefmt='%m/%d/%Y %I:%M:%S %p',
+                    level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# --- main ---------------------------------------------------------------------------------------
+if len(sys.argv) != 3:
+    print('Usage: python -m tools.import_TGDB_dump <dump JSON file> <mirror database file>')
+    sys.exit(1)
+dump_fname = sys.argv[1]
+mirror_fname = sys.argv[2]
+
+print('Reading dump "{}"'.format(dump_fname))
+with open(dump_fname, 'r', encoding='utf-8') as dump_file:
+    dump_data = json.load(dump_file)
+
+print('Writing mirror "{}"'.format(mirror_fname))
+mirror = TGDBMirror(mirror_fname)
+mirror.import_dump(dump_data)
+print('Mirror contains {} games'.format(mirror.count_games()))
+mirror.close()
+sys.exit(0)
@@ -0,0 +1,164 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Headless batch scraper. Reads a ROM manifest and writes one JSON line per ROM with the
+# candidates, metadata and asset URLs found in TGDB, as soon as the ROM is scraped.
+# Usage, from the repository root: python -m tools.scrape_batch roms.csv --output results.jsonl [--cache-dir DIR] [--apikey KEY]
+#
+# The manifest is a CSV file with filename and platform columns, or a JSONL file with
+# objects with filename and platform keys. Platforms are AKL platform names, like "Nintendo NES".
+# Results are written in completion order. Every line contains the manifest index of the ROM.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+import argparse
+import asyncio
+import json
+import sys
+
+import logging
+
+from akl import constants
+from akl.api import ROMObj
+from akl.utils import io, kodi
+
+from resources.lib.asyncengine import AsyncScraper
+from resources.lib.capture import DebugCapture
+from resources.lib.manifest import read_manifest
+from resources.lib.scraper import TheGamesDB
+
+
+logging.basicConfig(format='%(asctime)s %(module)s %(levelname)s: %(message)s',
+                    datefmt='%m/%d/%Y %I:%M:%S %p',
+                    level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+DEFAULT_ASSETS = [constants.ASSET_BOXFRONT_ID, constants.ASSET_FANART_ID, constants.ASSET_SNAP_ID]
+# Write the disk caches to disk every FLUSH_EVERY ROMs.
+FLUSH_EVERY = 500
+MAX_CANDIDATES_IN_RECORD = 5
+
+
+def new_rom(entry) -> ROMObj:
+    return ROMObj({
+        'id': str(entry.index),
+        'scanned_data': {'identifier': entry.identifier, 'file': entry.filename},
+        'platform': entry.platform
+    })
+
+
+def candidate_summary(candidate: dict) -> dict:
+    return {
+        'id': candidate['id'],
+        'display_name': candidate['display_name'],
+        'scraper_platform': candidate.get('scraper_platform'),
+        'confidence': candidate.get('confidence')
+    }
+
+
+def new_record(entry, scraped_rom: dict, status_dic) -> dict:
+    record = {
+        'index': entry.index,
+        'file': entry.filename,
+        'platform': entry.platform,
+        'identifier': entry.identifier
+    }
+    if not status_dic['status']:
+        record['status'] = 'error'
+        record['message'] = status_dic['msg']
+    elif scraped_rom is None:
+        record['status'] = 'not_found'
+    else:
+        record['status'] = 'ok'
+        record['candidates'] = [candidate_summary(candidate)
+                                for candidate in scraped_rom['candidates'][:MAX_CANDIDATES_IN_RECORD]]
+        record['candidate'] = candidate_summary(scraped_rom['candidate'])
+        record['metadata'] = scraped_rom['metadata']
+        record['assets'] = {asset_ID: [asset['url'] for asset in asset_list or []]
+                            for asset_ID, asset_list in scraped_rom['assets'].items()}
+    return record
+
+
+# Scrape the manifest entries with at most max_concurrency ROMs in flight. Entries are read
+# from the manifest only when there is room for them, so memory does not grow with the
+# manifest size.
+async def scrape_manifest(engine: AsyncScraper, manifest_path: str, asset_IDs: list, output_file) -> dict:
+    counts = {'ok': 0, 'not_found': 0, 'error': 0}
+
+    async def scrape_entry(entry):
+        status_dic = kodi.new_status_dic('Scraping was OK')
+        try:
+            scraped_rom = await engine.scrape_rom(new_rom(entry), asset_IDs, status_dic)
+        except Exception as ex:
+            logger.error(f'Exception scraping "{entry.filename}"', exc_info=ex)
+            status_dic['status'] = False
+            status_dic['msg'] = str(ex)
+            scraped_rom = None
+        return new_record(entry, scraped_rom, status_dic)
+
+    def write_records(tasks):
+        for task in tasks:
+            record = task.result()
+            output_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            counts[record['status']] += 1
+        output_file.flush()
+        num_written = sum(counts.values())
+        if num_written // FLUSH_EVERY != (num_written - len(tasks)) // FLUSH_EVERY:
+            engine.scraper.flush_disk_cache()
+            print('{} ROMs scraped'.format(num_written), file=sys.stderr)
+
+    pending = set()
+    for entry in read_manifest(manifest_path):
+        if len(pending) >= engine.max_concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            write_records(done)
+        pending.add(asyncio.ensure_future(scrape_entry(entry)))
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        write_records(done)
+    return counts
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(prog='python -m tools.scrape_batch',
+                                     description='Scrape a ROM manifest with TGDB and write JSONL results.')
+    parser.add_argument('manifest', help='CSV or JSONL manifest with filename and platform')
+    parser.add_argument('--output', default='-', help='JSONL results file, - for stdout')
+    parser.add_argument('--cache-dir', help='Directory for the scraper caches')
+    parser.add_argument('--apikey', help='TGDB API key. The public key is used by default')
+    parser.add_argument('--assets', default=','.join(DEFAULT_ASSETS), help='Comma separated asset IDs')
+    parser.add_argument('--concurrency', type=int, default=4, help='ROMs scraped at the same time')
+    parser.add_argument('--capture-dir', help='Capture a sample of the TGDB responses in this directory')
+    parser.add_argument('--capture-percent', type=int, default=10, help='Percentage of the responses captured')
+    args = parser.parse_args(argv)
+
+    asset_IDs = [asset_ID.strip() for asset_ID in args.assets.split(',') if asset_ID.strip()]
+    unsupported = [asset_ID for asset_ID in asset_IDs if asset_ID not in TheGamesDB.supported_asset_list]
+    if unsupported:
+        print('Unsupported asset IDs: {}'.format(', '.join(unsupported)), file=sys.stderr)
+        return 1
+
+    scraper = TheGamesDB(io.FileName(args.cache_dir, isdir=True) if args.cache_dir else None)
+    if args.apikey:
+        scraper.api_key = args.apikey
+    if args.capture_dir:
+        scraper.close_debug_capture()
+        scraper.debug_capture = DebugCapture(args.capture_dir, min(max(args.capture_percent, 0), 100) / 100)
+    engine = AsyncScraper(scraper, max(1, args.concurrency))
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        counts = asyncio.run(scrape_manifest(engine, args.manifest, asset_IDs, output_file))
+    finally:
+        engine.close()
+        scraper.flush_disk_cache()
+        scraper.close_debug_capture()
+        if output_file is not sys.stdout:
+            output_file.close()
+    print('Scraped {} ROMs: {} found, {} not found, {} errors'.format(
+        sum(counts.values()), counts['ok'], counts['not_found'], counts['error']), file=sys.stderr)
+    return 0 if counts['error'] == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))